@@ -0,0 +1,86 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import numpy as np
+
+from convergenceCalculationService import ConvergenceCalculationService
+
+
+class AngularBoundTracker:
+    """
+    Tracks Hamerly style bounds of the angular distances |data angle - centroid angle|
+    of a clustering job between its iterations.
+
+    Per data point we keep an upper bound of the distance to its assigned centroid
+    and a lower bound of the distance to all the other centroids. When the centroids
+    move, the bounds are loosened by their angular movements. A data point can only
+    change its centroid if its upper bound exceeds its lower bound and half the
+    distance of its centroid to the closest other centroid, i.e. only these data
+    points have to be compared with the centroids again.
+    """
+
+    def __init__(self, amount_of_data, k):
+        self.upper = np.full(amount_of_data, np.inf)
+        self.lower = np.zeros(amount_of_data)
+        self.assignment = np.zeros(amount_of_data, dtype=int)
+        self.centroid_angles = None
+        self.k = k
+
+    def select_points(self, centroid_angles):
+        """
+        Moves the bounds by the movements of the given new centroid angles and
+        returns the indices of the data points whose assignment could change.
+        In the first iteration, all the data points are selected.
+        """
+
+        centroid_angles = np.asarray(centroid_angles, dtype=float)
+
+        if self.centroid_angles is None:
+            self.centroid_angles = centroid_angles
+            return np.arange(self.upper.shape[0])
+
+        movements = ConvergenceCalculationService.calculate_angular_movements(self.centroid_angles,
+                                                                               centroid_angles)
+        self.centroid_angles = centroid_angles
+
+        # the upper bound grows with the movement of the assigned centroid, the lower
+        # bound shrinks with the largest movement of all the other centroids
+        order = np.argsort(movements)[::-1]
+        largest_other_movement = np.full(self.k, movements[order[0]])
+        if self.k > 1:
+            largest_other_movement[order[0]] = movements[order[1]]
+
+        self.upper += movements[self.assignment]
+        self.lower = np.maximum(self.lower - largest_other_movement[self.assignment], 0)
+
+        # half the distance of each centroid to its closest other centroid
+        centroid_distances = np.abs(centroid_angles[:, np.newaxis] - centroid_angles[np.newaxis, :])
+        np.fill_diagonal(centroid_distances, np.inf)
+        half_separation = np.min(centroid_distances, axis=1) / 2
+
+        candidates = self.upper > np.maximum(self.lower, half_separation[self.assignment])
+
+        return np.nonzero(candidates)[0]
+
+    def update(self, point_indices, distances):
+        """
+        Updates the assignment and the bounds of the given data points
+        from their (estimated) angular distances to all the centroids,
+        given as np.array with shape = (amount of points, k).
+        """
+
+        distances = np.asarray(distances, dtype=float).reshape(-1, self.k)
+        sorted_distances = np.sort(distances, axis=1)
+
+        self.assignment[point_indices] = np.argmin(distances, axis=1)
+        self.upper[point_indices] = sorted_distances[:, 0]
+        self.lower[point_indices] = sorted_distances[:, 1] if self.k > 1 else np.inf
+
+    def get_cluster_mapping(self):
+        """
+        Returns the current cluster mapping of all the data points.
+        """
+
+        return self.assignment.astype(float)
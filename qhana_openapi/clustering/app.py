@@ -6,4 +6,7 @@ logging.basicConfig(level=logging.INFO)
 app = connexion.App(__name__, specification_dir="openapi/")
 app.add_api('clustering-api.yaml',
             arguments={'title': 'QHana Clustering Microservice'})
-app.run(host='0.0.0.0', port=5001, debug=True)
+
+# the simulation workers are spawned and import this module again, i.e. they must not start the server
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,222 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import numpy as np
+from qiskit.circuit import Gate, ParameterExpression
+
+
+class BlockSeparableSimulator:
+    """
+    A shot simulator for circuits which are tensor products of small independent
+    blocks of qubits, like the clustering circuits of ClusteringCircuitGenerator:
+    the negative rotation clustering consists of 1 qubit blocks, the destructive
+    interference and state preparation clustering of 2 qubit blocks.
+
+    Instead of one dense statevector of 2^n amplitudes, every block is simulated
+    on its own statevector and its measured outcomes are sampled from the block
+    probabilities. As the blocks are independent, sampling them one by one gives
+    the same distribution of histograms as sampling the whole circuit, i.e. the
+    memory and time grow linearly with the amount of qubits.
+
+    A reset detaches the qubit from its block, i.e. the reused qubits of the
+    next round start a new block, see QubitPackingPlanner. Circuits with
+    larger blocks, gates on a measured qubit without reset,
+    conditional gates or gates without a matrix are not block separable.
+    """
+
+    max_block_qubits = 2
+
+    @classmethod
+    def decompose(cls, qc):
+        """
+        Decomposes the circuit into its independent blocks or returns None if the
+        circuit is not block separable. Every block is a dictionary with its amount
+        of local 'qubits', its 'gates' as list of (gate, local qubits) and its
+        'measurements' as list of (local qubit, classical bit).
+        """
+
+        qubit_indices = {qubit: i for i, qubit in enumerate(qc.qubits)}
+        clbit_indices = {clbit: i for i, clbit in enumerate(qc.clbits)}
+
+        blocks = []
+        # the block and local qubit every qubit currently belongs to, None for a qubit in |0>
+        current_blocks = [None] * qc.num_qubits
+        measured_clbits = set()
+
+        def create_block(qubit):
+            block = {'qubits': 1, 'locals': {qubit: 0}, 'gates': [], 'measurements': [], 'measured': set()}
+            blocks.append(block)
+            current_blocks[qubit] = block
+            return block
+
+        for instruction, qargs, cargs in qc.data:
+            qubits = [qubit_indices[qarg] for qarg in qargs]
+
+            if getattr(instruction, 'condition', None) is not None:
+                return None
+
+            if instruction.name == 'barrier':
+                continue
+
+            elif instruction.name == 'measure':
+                clbit = clbit_indices[cargs[0]]
+                if clbit in measured_clbits:
+                    return None
+                measured_clbits.add(clbit)
+
+                block = current_blocks[qubits[0]] or create_block(qubits[0])
+                block['measurements'].append((block['locals'][qubits[0]], clbit))
+                block['measured'].add(qubits[0])
+
+            elif instruction.name == 'reset':
+                block = current_blocks[qubits[0]]
+                if block is not None:
+                    # the qubit keeps its local qubit, which is not touched anymore, i.e. it is
+                    # traced out, and continues in |0> outside of the block
+                    del block['locals'][qubits[0]]
+                    block['measured'].discard(qubits[0])
+                    current_blocks[qubits[0]] = None
+
+            elif isinstance(instruction, Gate) and hasattr(instruction, '__array__'):
+                # merge the blocks of all the qubits of the gate
+                block = None
+                for qubit in qubits:
+                    qubit_block = current_blocks[qubit] or create_block(qubit)
+                    if qubit in qubit_block['measured']:
+                        return None
+                    if block is None:
+                        block = qubit_block
+                    elif qubit_block is not block:
+                        offset = block['qubits']
+                        block['qubits'] += qubit_block['qubits']
+                        block['locals'].update((q, offset + local) for q, local in qubit_block['locals'].items())
+                        block['gates'].extend((gate, [offset + local for local in local_qubits])
+                                              for gate, local_qubits in qubit_block['gates'])
+                        block['measurements'].extend((offset + local, clbit)
+                                                     for local, clbit in qubit_block['measurements'])
+                        block['measured'].update(qubit_block['measured'])
+                        qubit_block['merged'] = True
+                        for q in qubit_block['locals']:
+                            current_blocks[q] = block
+
+                if block['qubits'] > cls.max_block_qubits:
+                    return None
+                block['gates'].append((instruction, [block['locals'][qubit] for qubit in qubits]))
+
+            else:
+                return None
+
+        # merged blocks are part of another block and blocks without
+        # measurements do not influence the histogram
+        return [block for block in blocks if not block.get('merged') and len(block['measurements']) > 0]
+
+    @classmethod
+    def calculate_gate_matrix(cls, gate, parameter_bind=None):
+        """
+        Returns the matrix of the gate, its parameters are bound
+        with the given dictionary {parameter: value} first.
+        """
+
+        if parameter_bind is not None and any(isinstance(param, ParameterExpression) for param in gate.params):
+            gate = gate.copy()
+            gate.params = [float(param.bind({parameter: parameter_bind[parameter] for parameter in param.parameters}))
+                           if isinstance(param, ParameterExpression) else param
+                           for param in gate.params]
+
+        return np.asarray(gate.to_matrix(), dtype=complex)
+
+    @classmethod
+    def calculate_block_probabilities(cls, block, parameter_bind=None):
+        """
+        Simulates the statevector of the block and returns the probabilities of its
+        basis states, with local qubit 0 being the most significant bit of the index.
+        """
+
+        amount_of_qubits = block['qubits']
+        state = np.zeros((2,) * amount_of_qubits, dtype=complex)
+        state[(0,) * amount_of_qubits] = 1
+
+        for gate, local_qubits in block['gates']:
+            # the matrix index of a gate has its first qubit as least significant bit,
+            # i.e. its tensor axes are [out_m-1, ..., out_0, in_m-1, ..., in_0]
+            m = len(local_qubits)
+            matrix = cls.calculate_gate_matrix(gate, parameter_bind).reshape((2,) * (2 * m))
+            axes = local_qubits[::-1]
+            state = np.tensordot(matrix, state, axes=(list(range(m, 2 * m)), axes))
+            state = np.moveaxis(state, list(range(m)), axes)
+
+        probabilities = np.square(np.abs(state)).ravel()
+        return probabilities / np.sum(probabilities)
+
+    @classmethod
+    def create_histogram(cls, qc, bits):
+        """
+        Creates the histogram of the sampled classical bits, given as np.array with
+        shape = (shots, amount of classical bits), in the format of the Aer simulators,
+        i.e. classical bit 0 is the rightmost bit and the registers are separated by spaces.
+        """
+
+        if bits.shape[1] == 0:
+            return {'': bits.shape[0]}
+
+        # view the characters of every shot as one bytestring, which are much faster to count than rows
+        characters = np.ascontiguousarray(bits[:, ::-1] + np.uint8(ord('0')))
+        basis_states, counts = np.unique(characters.view('S' + str(bits.shape[1])).ravel(), return_counts=True)
+
+        # the register created last is the leftmost one
+        boundaries = np.cumsum([creg.size for creg in qc.cregs[::-1]])[:-1]
+
+        histogram = {}
+        for basis_state, count in zip(basis_states, counts):
+            basis_state = basis_state.decode('ascii')
+            if len(boundaries) > 0:
+                basis_state = ' '.join(basis_state[start:end] for start, end in
+                                       zip(np.concatenate(([0], boundaries)), np.append(boundaries, bits.shape[1])))
+            histogram[basis_state] = int(count)
+
+        return histogram
+
+    @classmethod
+    def sample_histogram(cls, qc, blocks, shots, parameter_bind=None):
+        """
+        Samples the histogram of the decomposed circuit block by block.
+        """
+
+        bits = np.zeros((shots, qc.num_clbits), dtype=np.uint8)
+
+        for block in blocks:
+            probabilities = cls.calculate_block_probabilities(block, parameter_bind)
+            outcomes = np.random.choice(probabilities.shape[0], size=shots, p=probabilities)
+
+            amount_of_qubits = block['qubits']
+            for local_qubit, clbit in block['measurements']:
+                bits[:, clbit] = (outcomes >> (amount_of_qubits - 1 - local_qubit)) & 1
+
+        return cls.create_histogram(qc, bits)
+
+    @classmethod
+    def execute_circuits(cls, circuits, shots_per_circuit, parameter_binds=None):
+        """
+        Simulates the given circuits block by block and returns their histograms
+        in the same order, or None if any of them is not block separable.
+        If parameter_binds is given, circuits is a list with one parameterized
+        template which is decomposed once and sampled once per bind.
+        """
+
+        if parameter_binds is not None:
+            blocks = cls.decompose(circuits[0])
+            if blocks is None:
+                return None
+            return [cls.sample_histogram(circuits[0], blocks, shots_per_circuit, parameter_bind)
+                    for parameter_bind in parameter_binds]
+
+        decompositions = []
+        for qc in circuits:
+            blocks = cls.decompose(qc)
+            if blocks is None:
+                return None
+            decompositions.append(blocks)
+
+        return [cls.sample_histogram(qc, blocks, shots_per_circuit) for qc, blocks in zip(circuits, decompositions)]
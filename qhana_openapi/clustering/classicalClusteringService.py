@@ -0,0 +1,55 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import time
+
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+
+class ClassicalClusteringService:
+    """
+    A service class for running a whole classical k-means clustering
+    as reference for the quantum clustering algorithms.
+
+    The clustering runs until convergence within one call. sklearn
+    parallelizes the assignment step of KMeans over all cores.
+    """
+
+    @classmethod
+    def perform_clustering(cls, data, k, centroids=None, max_iterations=300, eps=1e-4,
+                           mini_batch_threshold=0, batch_size=1024):
+        """
+        Performs a k-means clustering of the data with k clusters, starting from
+        the given centroids or from k-means++ initialized ones if no centroids are given.
+        If 0 < mini_batch_threshold <= amount of data, a MiniBatchKMeans with
+        mini batches of batch_size data points is used instead of a KMeans.
+
+        We return the cluster mapping, the centroids, the amount of iterations,
+        the name of the used algorithm and the duration of the fit in seconds.
+        """
+
+        if centroids is None:
+            init = 'k-means++'
+            n_init = 10
+        else:
+            init = centroids
+            n_init = 1
+
+        if 0 < mini_batch_threshold <= data.shape[0]:
+            kmeans_algorithm = MiniBatchKMeans(n_clusters=k, init=init, n_init=n_init, max_iter=max_iterations,
+                                               tol=eps, batch_size=batch_size, random_state=0)
+        else:
+            kmeans_algorithm = KMeans(n_clusters=k, init=init, n_init=n_init, max_iter=max_iterations,
+                                      tol=eps, random_state=0)
+
+        start = time.perf_counter()
+        kmeans_algorithm.fit(data)
+        duration = time.perf_counter() - start
+
+        cluster_mapping = kmeans_algorithm.labels_.astype(float)
+        iterations = int(getattr(kmeans_algorithm, 'n_iter_', max_iterations))
+
+        return cluster_mapping, kmeans_algorithm.cluster_centers_, iterations, \
+            type(kmeans_algorithm).__name__, duration
@@ -0,0 +1,164 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import hashlib
+import threading
+import time
+
+import numpy as np
+from clusteringCircuitExecutor import ClusteringCircuitExecutor
+from clusteringCircuitGenerator import ClusteringCircuitGenerator
+from qubitPackingPlanner import QubitPackingPlanner
+
+
+class ClusteringCircuitBatcher:
+    """
+    A batching layer which packs the pairs of data points and centroids of
+    concurrent clustering jobs into shared circuits, i.e. the partially filled
+    last circuit of one job is filled up with the pairs of the other jobs
+    and all jobs together submit fewer circuits to the backend.
+
+    The first job of a batch becomes its leader: it waits batch_window seconds
+    for further jobs with the same backend, account, algorithm, max_qubits, shots
+    and max_rounds, executes the pairs of all of them at once and routes the hits
+    of each job back to it. The other jobs wait until their hits are set.
+    The batches are kept per process, i.e. the jobs have to be served by the
+    same process, e.g. by the threads of one server.
+
+    The leader executes all the circuits of a batch on its own backend, i.e. with
+    its credentials. Hence, the jobs on a remote backend are only batched with the
+    jobs of the same account, i.e. with the same token, hub, group and project.
+    The jobs on backends whose account cannot be identified are executed on
+    their own without waiting.
+    """
+
+    batches = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def get_account(cls, backend):
+        """
+        Returns the identity of the account the given backend is used with, i.e.
+        a hash of the token together with the hub, group and project of its IBMQ
+        provider, an empty tuple for the local simulators, which need no account,
+        or None if the account cannot be identified.
+        """
+
+        if backend.name() in ClusteringCircuitExecutor.local_simulators:
+            return ()
+
+        provider = backend.provider() if hasattr(backend, 'provider') else None
+        credentials = getattr(provider, 'credentials', None)
+        if credentials is None or not credentials.token:
+            return None
+
+        # the token is only kept as hash in the keys of the batches
+        token_hash = hashlib.sha256(credentials.token.encode('utf-8')).hexdigest()
+        return token_hash, credentials.hub, credentials.group, credentials.project
+
+    @classmethod
+    def create_key(cls, backend, account, algorithm, max_qubits, shots_per_circuit, max_rounds):
+        """
+        Creates the key of the batch a job can join, i.e. the jobs of a batch
+        share the circuits, the shots and the account executing them.
+        """
+
+        return backend.name(), account, algorithm, max_qubits, shots_per_circuit, max_rounds
+
+    @classmethod
+    def execute_pair_hits(cls, algorithm, pair_data_angles, pair_centroid_angles, backend, max_qubits,
+                          shots_per_circuit, batch_window, max_workers=1, worker_timings=None, max_rounds=1,
+                          circuit_batches=None):
+        """
+        Executes the given pairs together with the pairs of all the jobs joining
+        the same batch within batch_window seconds, or on their own if the account
+        of the backend cannot be identified, and returns the hits of the given
+        pairs as 1D np.array, see ClusteringCircuitExecutor.execute_clustering_template_hits.
+        The batch is appended to circuit_batches as dictionary with the amount of
+        jobs, pairs and circuits it consists of.
+        """
+
+        request = {'data_angles': np.asarray(pair_data_angles, dtype=float),
+                   'centroid_angles': np.asarray(pair_centroid_angles, dtype=float),
+                   'done': threading.Event(),
+                   'hits': None,
+                   'error': None,
+                   'batch': None}
+
+        account = cls.get_account(backend)
+        if account is None:
+            # a batch of its own, i.e. there is nothing to wait for
+            cls.execute_batch(algorithm, [request], backend, max_qubits, shots_per_circuit, max_workers,
+                              worker_timings, max_rounds)
+        else:
+            key = cls.create_key(backend, account, algorithm, max_qubits, shots_per_circuit, max_rounds)
+            with cls.lock:
+                batch = cls.batches.get(key)
+                leader = batch is None
+                if leader:
+                    batch = []
+                    cls.batches[key] = batch
+                batch.append(request)
+
+            if leader:
+                # collect the jobs of the time window, later jobs start a new batch
+                time.sleep(batch_window)
+                with cls.lock:
+                    cls.batches.pop(key, None)
+
+                cls.execute_batch(algorithm, batch, backend, max_qubits, shots_per_circuit, max_workers,
+                                  worker_timings, max_rounds)
+            else:
+                request['done'].wait()
+
+        if request['error'] is not None:
+            raise Exception('Batched circuit execution failed: ' + request['error'])
+
+        if circuit_batches is not None:
+            circuit_batches.append(request['batch'])
+
+        return request['hits']
+
+    @classmethod
+    def execute_batch(cls, algorithm, batch, backend, max_qubits, shots_per_circuit, max_workers=1,
+                      worker_timings=None, max_rounds=1):
+        """
+        Executes the pairs of all the requests of the batch in shared circuits and
+        sets the hits of each request, or the error if the execution failed.
+        The waiting requests are released in any case.
+        """
+
+        try:
+            pair_data_angles = np.concatenate([request['data_angles'] for request in batch])
+            pair_centroid_angles = np.concatenate([request['centroid_angles'] for request in batch])
+
+            plan = QubitPackingPlanner.plan(algorithm, max_qubits, pair_data_angles.shape[0], max_rounds)
+            parameter_table = ClusteringCircuitGenerator.generate_pair_parameters(algorithm,
+                                                                                   max_qubits,
+                                                                                   pair_data_angles,
+                                                                                   pair_centroid_angles,
+                                                                                   max_rounds)
+            hits = ClusteringCircuitExecutor.execute_clustering_template_hits(algorithm,
+                                                                              parameter_table,
+                                                                              backend,
+                                                                              shots_per_circuit,
+                                                                              max_workers,
+                                                                              worker_timings,
+                                                                              plan['rounds'])
+
+            # route the slice of the hits of each request back to it
+            offsets = np.cumsum([request['data_angles'].shape[0] for request in batch])[:-1]
+            statistics = {'jobs': len(batch), 'pairs': int(pair_data_angles.shape[0]), 'circuits': plan['circuits']}
+            for request, request_hits in zip(batch, np.split(hits, offsets)):
+                request['hits'] = request_hits
+                request['batch'] = statistics
+
+        except Exception as ex:
+            for request in batch:
+                request['error'] = str(ex)
+
+        finally:
+            for request in batch:
+                request['done'].set()
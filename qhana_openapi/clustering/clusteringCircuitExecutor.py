@@ -3,10 +3,40 @@ Author: Daniel Fink
 Email: daniel-fink@outlook.com
 """
 
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 from qiskit import *
+from blockSeparableSimulator import BlockSeparableSimulator
+from clusteringCircuitGenerator import ClusteringCircuitGenerator
+from couplingMapLayoutPlanner import CouplingMapLayoutPlanner
 from dataProcessingService import DataProcessingService
+from quantumBackendFactory import QuantumBackendFactory
 from quantumPostProcessingService import QuantumPostProcessingService
+from qubitPackingPlanner import QubitPackingPlanner
+from transpiledCircuitCache import TranspiledCircuitCache
+
+
+def execute_circuit_chunk(circuits, backend_name, shots_per_circuit, parameter_binds=None, transpiled=False,
+                          statevector=False):
+    """
+    Simulates a chunk of circuits on a local Aer simulator within a worker process.
+    We return the histograms (or statevectors) together with the id of the worker
+    process and the time the simulation took.
+    """
+
+    start = time.perf_counter()
+    backend = Aer.get_backend(backend_name)
+    histograms = ClusteringCircuitExecutor.execute_circuits(circuits, backend, shots_per_circuit,
+                                                            parameter_binds=parameter_binds,
+                                                            transpiled=transpiled,
+                                                            statevector=statevector)
+
+    return histograms, os.getpid(), time.perf_counter() - start
 
 
 class ClusteringCircuitExecutor:
@@ -14,18 +44,179 @@ class ClusteringCircuitExecutor:
     A class for executing clustering quantum circuits.
     """
 
+    # the process pool for the parallel simulation, shared by all executions
+    process_pool = None
+    process_pool_lock = threading.Lock()
+
+    local_simulators = ['qasm_simulator', 'statevector_simulator']
+
+    # the transpiled templates of all executions within this process
+    transpiled_circuit_cache = TranspiledCircuitCache()
+
+    @classmethod
+    def get_max_workers(cls, max_workers):
+        """
+        Clamps the requested amount of workers to the amount of cpus.
+        """
+
+        return max(1, min(max_workers, os.cpu_count() or 1))
+
+    @classmethod
+    def get_process_pool(cls):
+        """
+        Returns the process pool shared by all executions, with one worker per cpu,
+        i.e. the amount of processes is bounded regardless of the requested workers.
+        The pool is created on first use and reused afterwards.
+        We spawn the workers instead of forking them, as forking a process
+        whose simulator thread pools are already running may deadlock.
+        """
+
+        with cls.process_pool_lock:
+            if cls.process_pool is None:
+                cls.process_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                       mp_context=multiprocessing.get_context('spawn'))
+            return cls.process_pool
+
     @classmethod
-    def execute_negative_rotation_clustering(cls, circuits, k, backend, shots_per_circuit):
+    def execute_circuits(cls, circuits, backend, shots_per_circuit, max_workers=1, worker_timings=None,
+                         parameter_binds=None, transpiled=False, statevector=False, initial_layouts=None):
+        """
+        Executes all the given circuits and returns their histograms in the same order.
+        If statevector, the final statevectors of the circuits are returned as np.arrays
+        instead, which requires a statevector simulator and circuits without measurements.
+
+        Instead of one job per circuit, the circuits are submitted as multi experiment
+        jobs. If the backend limits the amount of experiments per job, the circuits
+        are split into chunks of max_experiments many circuits. All chunks are
+        submitted before waiting for the first result, i.e. their queue times overlap.
+
+        If parameter_binds is given, circuits is a list with one parameterized template
+        and we execute it once per dictionary {parameter: value} in parameter_binds,
+        i.e. the template is only transpiled once and bound in bulk.
+        If transpiled, the circuits are already transpiled for the backend and are
+        only assembled and run. Otherwise initial_layouts can give the physical
+        qubits of every circuit, see CouplingMapLayoutPlanner.plan_layouts.
+
+        On the local qasm simulator, circuits which are tensor products of small
+        independent blocks are sampled block by block, see BlockSeparableSimulator.
+        Otherwise, they are simulated as one dense statevector.
+
+        If max_workers > 1 and the backend is a local Aer simulator, the circuits
+        are split into chunks which are simulated in parallel by a process pool.
+        The amount of workers is clamped to the amount of cpus.
+        Then a dictionary per chunk with the worker process id, the amount of
+        circuits and the simulation time in seconds is appended to worker_timings.
+        """
+
+        if QuantumBackendFactory.is_analytic_backend(backend):
+            raise Exception('The analytic backend cannot execute circuits, '
+                            'it needs the data and centroid angles instead.')
+
+        max_workers = cls.get_max_workers(max_workers)
+        if max_workers > 1 and backend.name() in cls.local_simulators:
+            return cls.execute_circuits_in_parallel(circuits, backend, shots_per_circuit, max_workers,
+                                                    worker_timings, parameter_binds, transpiled, statevector)
+
+        # the local qasm simulator samples block separable circuits block by block,
+        # which also works beyond the amount of qubits of a dense simulation
+        if not statevector and QuantumBackendFactory.is_qasm_simulator_backend(backend):
+            histograms = BlockSeparableSimulator.execute_circuits(circuits, shots_per_circuit, parameter_binds)
+            if histograms is not None:
+                return histograms
+
+        # the experiments are either the circuits or the bindings of the template
+        experiments = circuits if parameter_binds is None else parameter_binds
+
+        max_experiments = getattr(backend.configuration(), 'max_experiments', None)
+        if not max_experiments:
+            max_experiments = len(experiments)
+
+        # submit all the chunks
+        jobs = []
+        for chunk_start in range(0, len(experiments), max_experiments):
+            chunk = experiments[chunk_start:chunk_start + max_experiments]
+            if parameter_binds is None:
+                circuits_chunk, parameter_binds_chunk = chunk, None
+            else:
+                circuits_chunk, parameter_binds_chunk = circuits, chunk
+
+            initial_layouts_chunk = None
+            if initial_layouts is not None and parameter_binds is None:
+                initial_layouts_chunk = initial_layouts[chunk_start:chunk_start + max_experiments]
+
+            if transpiled:
+                qobj = assemble(circuits_chunk, backend, shots=shots_per_circuit, parameter_binds=parameter_binds_chunk)
+                job = backend.run(qobj)
+            else:
+                job = execute(circuits_chunk, backend, shots=shots_per_circuit, parameter_binds=parameter_binds_chunk,
+                              initial_layout=initial_layouts_chunk)
+            jobs.append((job, len(chunk)))
+
+        # demultiplex the results into one histogram per circuit
+        histograms = []
+        for job, chunk_length in jobs:
+            result = job.result()
+            for i in range(0, chunk_length):
+                if statevector:
+                    histograms.append(np.asarray(result.get_statevector(i)))
+                else:
+                    histograms.append(result.get_counts(i))
+
+        return histograms
+
+    @classmethod
+    def execute_circuits_in_parallel(cls, circuits, backend, shots_per_circuit, max_workers, worker_timings=None,
+                                     parameter_binds=None, transpiled=False, statevector=False):
+        """
+        Simulates the given circuits in max_workers many chunks on the shared process
+        pool and merges their histograms in the order of the circuits.
+        """
+
+        experiments = circuits if parameter_binds is None else parameter_binds
+        chunk_size = -(-len(experiments) // max_workers)
+        process_pool = cls.get_process_pool()
+
+        futures = []
+        for chunk_start in range(0, len(experiments), chunk_size):
+            chunk = experiments[chunk_start:chunk_start + chunk_size]
+            if parameter_binds is None:
+                future = process_pool.submit(execute_circuit_chunk, chunk, backend.name(), shots_per_circuit,
+                                             None, transpiled, statevector)
+            else:
+                future = process_pool.submit(execute_circuit_chunk, circuits, backend.name(), shots_per_circuit,
+                                             chunk, transpiled, statevector)
+            futures.append((future, len(chunk)))
+
+        histograms = []
+        for future, chunk_length in futures:
+            chunk_histograms, worker, duration = future.result()
+            histograms.extend(chunk_histograms)
+
+            if worker_timings is not None:
+                worker_timings.append({'worker': worker, 'circuits': chunk_length, 'seconds': duration})
+
+        return histograms
+
+    @classmethod
+    def execute_negative_rotation_clustering(cls, circuits, k, backend, shots_per_circuit,
+                                             max_workers=1, worker_timings=None):
         """
         Executes the given circuits for performing a negative rotation clustering.
+        The circuits are simulated by max_workers many processes if the
+        backend is a local simulator, see execute_circuits.
+        On a statevector simulator, the exact probabilities are used instead of hits.
         """
 
-        # this is the amount of qubits that are needed in total
+        if QuantumBackendFactory.is_statevector_backend(backend):
+            return cls.execute_statevector_clustering('negative-rotation', circuits, k, backend, max_workers, worker_timings)
+
+        # this is the amount of measured qubits, i.e. of classical bits,
         # and also the amount of distances, i.e. every data point
-        # to every centroid
+        # to every centroid, note that the qubits can be reused within
+        # a circuit, see QubitPackingPlanner
         global_work_amount = 0
         for quantum_circuit in circuits:
-            global_work_amount += quantum_circuit.num_qubits
+            global_work_amount += quantum_circuit.num_clbits
 
         # store some general information about the data
         amount_of_data = int(global_work_amount / k)
@@ -38,15 +229,16 @@ class ClusteringCircuitExecutor:
         # this is the index to iterate over all parameter pairs in the queue (parameters list)
         index = 0
 
-        for quantum_circuit in circuits:
-            # track the parameter pairs we will check within each circuit
-            index += quantum_circuit.num_qubits
+        # execute all circuits at once on the backend
+        initial_layouts = CouplingMapLayoutPlanner.plan_layouts('negative-rotation', backend, circuits)
+        histograms = cls.execute_circuits(circuits, backend, shots_per_circuit, max_workers, worker_timings,
+                                          initial_layouts=initial_layouts)
 
-            # execute on IBMQ backend
-            job = execute(quantum_circuit, backend, shots=shots_per_circuit)
+        for quantum_circuit, histogram in zip(circuits, histograms):
+            # track the parameter pairs we will check within each circuit
+            index += quantum_circuit.num_clbits
 
             # store the result for this sub circuit run
-            histogram = job.result().get_counts()
             hits = QuantumPostProcessingService.calculate_qubits_0_hits(histogram)
 
             # We will assign the data point to the centroid
@@ -61,7 +253,7 @@ class ClusteringCircuitExecutor:
             # will assign to the centroid with minimal distance.
             safe_delta = 50
             for i in range(0, hits.shape[0]):
-                distances[index - quantum_circuit.num_qubits + i] = 1.0 / (hits[i] + safe_delta)
+                distances[index - quantum_circuit.num_clbits + i] = 1.0 / (hits[i] + safe_delta)
 
         # calculate the new cluster mapping
         cluster_mapping = DataProcessingService.calculate_cluster_mapping(amount_of_data, k, distances)
@@ -69,20 +261,28 @@ class ClusteringCircuitExecutor:
         return cluster_mapping
 
     @classmethod
-    def execute_destructive_interference_clustering(cls, circuits, k, backend, shots_per_circuit):
+    def execute_destructive_interference_clustering(cls, circuits, k, backend, shots_per_circuit,
+                                                    max_workers=1, worker_timings=None):
         """
         Executes the given circuits for performing a destructive interference clustering.
+        The circuits are simulated by max_workers many processes if the
+        backend is a local simulator, see execute_circuits.
+        On a statevector simulator, the exact probabilities are used instead of hits.
         """
 
-        # this is the amount of qubits that are needed in total
+        if QuantumBackendFactory.is_statevector_backend(backend):
+            return cls.execute_statevector_clustering('destructive-interference', circuits, k, backend, max_workers, worker_timings)
+
+        # this is the amount of measured qubits, i.e. of classical bits,
         # and also the amount of distances, i.e. every data point
-        # to every centroid
+        # to every centroid, note that the qubits can be reused within
+        # a circuit, see QubitPackingPlanner
         global_work_amount = 0
         for quantum_circuit in circuits:
-            global_work_amount += quantum_circuit.num_qubits
+            global_work_amount += quantum_circuit.num_clbits
 
         # store some general information about the data
-        amount_of_data = int(global_work_amount / (2 + k))
+        amount_of_data = int(global_work_amount / (2 * k))
 
         # we store the distances as [(t1,c1), (t1,c2), ..., (t1,cn), (t2,c1), ..., (tm,cn)]
         # while each (ti,cj) stands for one distance, i.e. (ti,cj) = distance data point i
@@ -92,15 +292,16 @@ class ClusteringCircuitExecutor:
         # this is the index to iterate over all parameter pairs in the queue (parameters list)
         index = 0
 
-        for quantum_circuit in circuits:
-            # track the parameter pairs we will check within each circuit
-            index += int(quantum_circuit.num_qubits / 2)
+        # execute all circuits at once on the backend
+        initial_layouts = CouplingMapLayoutPlanner.plan_layouts('destructive-interference', backend, circuits)
+        histograms = cls.execute_circuits(circuits, backend, shots_per_circuit, max_workers, worker_timings,
+                                          initial_layouts=initial_layouts)
 
-            # execute on IBMQ backend
-            job = execute(quantum_circuit, backend, shots=shots_per_circuit)
+        for quantum_circuit, histogram in zip(circuits, histograms):
+            # track the parameter pairs we will check within each circuit
+            index += int(quantum_circuit.num_clbits / 2)
 
             # store the result for this sub circuit run
-            histogram = job.result().get_counts()
             hits = QuantumPostProcessingService.calculate_even_qubits_1_hits(histogram)
 
             # the amount of hits for the |1> state is proportional
@@ -108,7 +309,7 @@ class ClusteringCircuitExecutor:
             # i.e. 2 qubits, P|11> + P|10> is proportional to the
             # distance (but not normed).
             for i in range(0, hits.shape[0]):
-                distances[index - int(quantum_circuit.num_qubits / 2) + i] = hits[i]
+                distances[index - int(quantum_circuit.num_clbits / 2) + i] = hits[i]
 
         # calculate the new cluster mapping
         cluster_mapping = DataProcessingService.calculate_cluster_mapping(amount_of_data, k, distances)
@@ -116,20 +317,28 @@ class ClusteringCircuitExecutor:
         return cluster_mapping
 
     @classmethod
-    def execute_state_preparation_clustering(cls, circuits, k, backend, shots_per_circuit):
+    def execute_state_preparation_clustering(cls, circuits, k, backend, shots_per_circuit,
+                                             max_workers=1, worker_timings=None):
         """
         Executes the given circuits for performing a state preparation clustering.
+        The circuits are simulated by max_workers many processes if the
+        backend is a local simulator, see execute_circuits.
+        On a statevector simulator, the exact probabilities are used instead of hits.
         """
 
-        # this is the amount of qubits that are needed in total
+        if QuantumBackendFactory.is_statevector_backend(backend):
+            return cls.execute_statevector_clustering('state-preparation', circuits, k, backend, max_workers, worker_timings)
+
+        # this is the amount of measured qubits, i.e. of classical bits,
         # and also the amount of distances, i.e. every data point
-        # to every centroid
+        # to every centroid, note that the qubits can be reused within
+        # a circuit, see QubitPackingPlanner
         global_work_amount = 0
         for quantum_circuit in circuits:
-            global_work_amount += quantum_circuit.num_qubits
+            global_work_amount += quantum_circuit.num_clbits
 
         # store some general information about the data
-        amount_of_data = int(global_work_amount / (2 + k))
+        amount_of_data = int(global_work_amount / (2 * k))
 
         # we store the distances as [(t1,c1), (t1,c2), ..., (t1,cn), (t2,c1), ..., (tm,cn)]
         # while each (ti,cj) stands for one distance, i.e. (ti,cj) = distance data point i
@@ -139,15 +348,16 @@ class ClusteringCircuitExecutor:
         # this is the index to iterate over all parameter pairs in the queue (parameters list)
         index = 0
 
-        for quantum_circuit in circuits:
-            # track the parameter pairs we will check within each circuit
-            index += int(quantum_circuit.num_qubits / 2)
+        # execute all circuits at once on the backend
+        initial_layouts = CouplingMapLayoutPlanner.plan_layouts('state-preparation', backend, circuits)
+        histograms = cls.execute_circuits(circuits, backend, shots_per_circuit, max_workers, worker_timings,
+                                          initial_layouts=initial_layouts)
 
-            # execute on IBMQ backend
-            job = execute(quantum_circuit, backend, shots=shots_per_circuit)
+        for quantum_circuit, histogram in zip(circuits, histograms):
+            # track the parameter pairs we will check within each circuit
+            index += int(quantum_circuit.num_clbits / 2)
 
             # store the result for this sub circuit run
-            histogram = job.result().get_counts()
             hits = QuantumPostProcessingService.calculate_even_qubits_0_hits(histogram)
 
             # the final state is entangled, i.e. P|00> = P|0X> = P|X0>
@@ -161,9 +371,454 @@ class ClusteringCircuitExecutor:
             # calculate the centroid mapping according to the
             # minus distances.
             for i in range(0, hits.shape[0]):
-                distances[index - int(quantum_circuit.num_qubits / 2) + i] = - hits[i]
+                distances[index - int(quantum_circuit.num_clbits / 2) + i] = - hits[i]
 
         # calculate the new cluster mapping
         cluster_mapping = DataProcessingService.calculate_cluster_mapping(amount_of_data, k, distances)
 
         return cluster_mapping
+
+    @classmethod
+    def calculate_analytic_hit_probabilities(cls, algorithm, data_angles, centroid_angles):
+        """
+        Calculates the exact probabilities of the outcomes the executors count as hits
+        for every pair of data point and centroid, without building or simulating
+        any quantum circuit. We return a np.array with shape = (amount of data, k).
+
+        With d = data angle - centroid angle the circuits result in:
+        negative rotation:        P(|0>) = cos^2(d / 2)
+        destructive interference: P(|1>) = sin^2(d / 2) on the even (data) qubit
+        state preparation:        P(|0>) = cos^2(d / 2) on the even (data) qubit
+        """
+
+        # the N x k matrix of the relative angular differences
+        differences = data_angles[:, np.newaxis] - centroid_angles[np.newaxis, :]
+
+        if algorithm == 'negative-rotation' or algorithm == 'state-preparation':
+            return np.square(np.cos(differences / 2))
+        elif algorithm == 'destructive-interference':
+            return np.square(np.sin(differences / 2))
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+    @classmethod
+    def execute_analytic_clustering(cls, algorithm, data_angles, centroid_angles):
+        """
+        Calculates the cluster mapping of the given rotational clustering
+        algorithm from the exact outcome probabilities.
+        """
+
+        hit_probabilities = cls.calculate_analytic_hit_probabilities(algorithm, data_angles, centroid_angles)
+        distances = cls.calculate_probability_distances(algorithm, hit_probabilities)
+
+        return DataProcessingService.calculate_cluster_mapping(data_angles.shape[0],
+                                                               centroid_angles.shape[0],
+                                                               distances.flatten())
+
+    @classmethod
+    def calculate_probability_distances(cls, algorithm, hit_probabilities):
+        """
+        Calculates the distances from the exact probabilities of the outcomes counted
+        as hits, i.e. without any smoothing like the safe_delta of the hit counts.
+        """
+
+        # the destructive interference hits are proportional to the
+        # distance, the others are anti proportional to it
+        if algorithm == 'destructive-interference':
+            return hit_probabilities
+        elif algorithm == 'negative-rotation' or algorithm == 'state-preparation':
+            return - hit_probabilities
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+    @classmethod
+    def calculate_probabilities(cls, algorithm, statevectors):
+        """
+        Calculates the exact probabilities of the outcomes counted as hits per compared
+        pair of data point and centroid from the final statevectors of the circuits,
+        like calculate_hits does from the histograms.
+        We return a list with one np.array of pair probabilities per statevector.
+        """
+
+        probabilities = []
+        for statevector in statevectors:
+            qubit_probabilities = QuantumPostProcessingService.calculate_qubit_probabilities(statevector)
+            if algorithm == 'negative-rotation':
+                probabilities.append(qubit_probabilities[:, 0])
+            elif algorithm == 'destructive-interference':
+                probabilities.append(QuantumPostProcessingService.select_even_qubits(qubit_probabilities)[:, 1])
+            elif algorithm == 'state-preparation':
+                probabilities.append(QuantumPostProcessingService.select_even_qubits(qubit_probabilities)[:, 0])
+            else:
+                raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+        return probabilities
+
+    @classmethod
+    def execute_statevector_probabilities(cls, algorithm, circuits, backend, max_workers=1, worker_timings=None,
+                                          parameter_binds=None, transpiled=False):
+        """
+        Simulates the given circuits without their final measurements on a statevector
+        simulator and returns the exact hit probabilities of their pairs, see
+        calculate_probabilities. The qubits must not be reused, i.e. the circuits
+        must not contain resets.
+        """
+
+        stripped_circuits = []
+        for circuit in circuits:
+            if 'reset' in circuit.count_ops():
+                raise Exception('Circuits with reused qubits cannot be simulated as statevector.')
+            stripped_circuits.append(circuit.remove_final_measurements(inplace=False))
+
+        statevectors = cls.execute_circuits(stripped_circuits, backend, 1, max_workers, worker_timings,
+                                            parameter_binds, transpiled, statevector=True)
+
+        return cls.calculate_probabilities(algorithm, statevectors)
+
+    @classmethod
+    def execute_statevector_clustering(cls, algorithm, circuits, k, backend, max_workers=1, worker_timings=None):
+        """
+        Executes the given concrete circuits of a rotational clustering on a statevector
+        simulator and calculates the cluster mapping from the exact probabilities.
+        """
+
+        probabilities = np.concatenate(cls.execute_statevector_probabilities(algorithm, circuits, backend,
+                                                                             max_workers, worker_timings))
+        distances = cls.calculate_probability_distances(algorithm, probabilities)
+
+        amount_of_data = int(probabilities.shape[0] / k)
+        return DataProcessingService.calculate_cluster_mapping(amount_of_data, k, distances)
+
+    @classmethod
+    def calculate_hits(cls, algorithm, histograms):
+        """
+        Calculates the hits per compared pair of data point and centroid from the
+        histograms of the given rotational clustering algorithm, i.e. the |0> hits
+        of all qubits for the negative rotation clustering, the |1> hits of the even
+        qubits for the destructive interference clustering and the |0> hits of the
+        even qubits for the state preparation clustering.
+        We return an np.array with shape = (amount of histograms, pairs per circuit).
+        """
+
+        hits = []
+        for histogram in histograms:
+            if algorithm == 'negative-rotation':
+                hits.append(QuantumPostProcessingService.calculate_qubits_0_hits(histogram))
+            elif algorithm == 'destructive-interference':
+                hits.append(QuantumPostProcessingService.calculate_even_qubits_1_hits(histogram))
+            elif algorithm == 'state-preparation':
+                hits.append(QuantumPostProcessingService.calculate_even_qubits_0_hits(histogram))
+            else:
+                raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+        return np.array(hits)
+
+    @classmethod
+    def calculate_distances(cls, algorithm, hits):
+        """
+        Calculates the distances from the hits of the given rotational clustering
+        algorithm like the execute_*_clustering functions do, i.e. the negative
+        rotation hits are inverted, the state preparation hits are negated and the
+        destructive interference hits are proportional to the distance already.
+        """
+
+        if algorithm == 'negative-rotation':
+            safe_delta = 50
+            return 1.0 / (hits + safe_delta)
+        elif algorithm == 'destructive-interference':
+            return hits
+        elif algorithm == 'state-preparation':
+            return - hits
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+    @classmethod
+    def execute_clustering_template_hits(cls, algorithm, parameter_table, backend, shots_per_circuit,
+                                         max_workers=1, worker_timings=None, rounds=1):
+        """
+        Executes the bound circuit templates of the given parameter table, see
+        execute_clustering_template, and returns the hits of all the used pairs
+        in the order of the parameter table as 1D np.array.
+        """
+
+        parameter_table = np.atleast_2d(parameter_table)
+        pairs = int(parameter_table.shape[1] / 2)
+        template, parameters = ClusteringCircuitGenerator.generate_clustering_template(algorithm, pairs, rounds)
+
+        # the local qasm simulator samples the blocks of the template directly, i.e. it is
+        # not transpiled, as the transpilation fails beyond the qubits of a dense simulation
+        transpiled = not QuantumBackendFactory.is_qasm_simulator_backend(backend)
+        if transpiled:
+            template, parameters = cls.transpiled_circuit_cache.get_transpiled_circuit(backend,
+                                                                                       algorithm,
+                                                                                       template,
+                                                                                       parameters)
+        parameter_binds, used = cls.bind_clustering_parameters(algorithm, parameter_table, parameters)
+
+        histograms = cls.execute_circuits([template], backend, shots_per_circuit, max_workers, worker_timings,
+                                          parameter_binds, transpiled=transpiled)
+
+        # the classical bits of the pairs are ordered round by round and slot by slot
+        # and the pairs are ordered row by row, i.e. like the concrete circuits
+        return cls.calculate_hits(algorithm, histograms)[used]
+
+    @classmethod
+    def execute_clustering_template_probabilities(cls, algorithm, parameter_table, backend,
+                                                  max_workers=1, worker_timings=None):
+        """
+        Executes the bound circuit templates of the given parameter table without their
+        final measurements on a statevector simulator and returns the exact hit
+        probabilities of all the used pairs in the order of the parameter table as 1D np.array.
+        The statevector cannot be read per round, i.e. the parameter table has to be
+        planned with one round per circuit.
+        """
+
+        parameter_table = np.atleast_2d(parameter_table)
+        pairs = int(parameter_table.shape[1] / 2)
+        template, parameters = ClusteringCircuitGenerator.generate_clustering_template(algorithm, pairs)
+        template = template.remove_final_measurements(inplace=False)
+        template, parameters = cls.transpiled_circuit_cache.get_transpiled_circuit(backend,
+                                                                                   algorithm,
+                                                                                   template,
+                                                                                   parameters)
+        parameter_binds, used = cls.bind_clustering_parameters(algorithm, parameter_table, parameters)
+
+        statevectors = cls.execute_circuits([template], backend, 1, max_workers, worker_timings,
+                                            parameter_binds, transpiled=True, statevector=True)
+
+        return np.array(cls.calculate_probabilities(algorithm, statevectors))[used]
+
+    @classmethod
+    def bind_clustering_parameters(cls, algorithm, parameter_table, parameters):
+        """
+        Creates one parameter bind per row of the parameter table for the given
+        template parameters. The unused pairs of the last circuit are nan and
+        get bound to 0, i.e. we also return a boolean np.array of the used pairs.
+        """
+
+        data_angles = parameter_table[:, 0::2]
+        centroid_angles = parameter_table[:, 1::2]
+        used = ~np.isnan(data_angles)
+
+        if algorithm == 'destructive-interference':
+            values = np.abs(data_angles - centroid_angles)
+        else:
+            values = parameter_table
+        values = np.nan_to_num(values)
+
+        return [dict(zip(parameters, row)) for row in values.tolist()], used
+
+    @classmethod
+    def execute_clustering_template(cls, algorithm, parameter_table, k, backend, shots_per_circuit,
+                                    max_workers=1, worker_timings=None, rounds=1):
+        """
+        Executes a rotational clustering given the parameter table generated by
+        ClusteringCircuitGenerator.generate_clustering_parameters.
+
+        We build the parameterized template of the algorithm once and bind it in bulk
+        with the angles of every row instead of executing concrete circuits.
+        The transpiled templates are cached per backend, see TranspiledCircuitCache.
+        The pairs of each row are spread over rounds many rounds of reused qubits,
+        i.e. rounds has to be the one the parameter table has been planned with.
+        On a statevector simulator, the exact probabilities are used instead of hits.
+        """
+
+        if QuantumBackendFactory.is_statevector_backend(backend):
+            if rounds > 1:
+                raise Exception('Circuits with reused qubits cannot be simulated as statevector.')
+            probabilities = cls.execute_clustering_template_probabilities(algorithm, parameter_table, backend,
+                                                                          max_workers, worker_timings)
+            distances = cls.calculate_probability_distances(algorithm, probabilities)
+            amount_of_data = int(probabilities.shape[0] / k)
+            return DataProcessingService.calculate_cluster_mapping(amount_of_data, k, distances)
+
+        hits = cls.execute_clustering_template_hits(algorithm, parameter_table, backend, shots_per_circuit,
+                                                    max_workers, worker_timings, rounds)
+        distances = cls.calculate_distances(algorithm, hits)
+
+        # calculate the new cluster mapping
+        amount_of_data = int(hits.shape[0] / k)
+        cluster_mapping = DataProcessingService.calculate_cluster_mapping(amount_of_data, k, distances)
+
+        return cluster_mapping
+
+    @classmethod
+    def calculate_angular_distances(cls, algorithm, hits, shots_per_circuit):
+        """
+        Estimates the angular distances |data angle - centroid angle| of the pairs
+        from their hits by inverting the outcome probabilities, see
+        calculate_analytic_hit_probabilities, i.e. d = 2 * arccos(sqrt(P(|0>)))
+        for the negative rotation and state preparation clustering and
+        d = 2 * arcsin(sqrt(P(|1>))) for the destructive interference clustering.
+        """
+
+        hit_ratios = np.clip(hits / shots_per_circuit, 0, 1)
+
+        if algorithm == 'negative-rotation' or algorithm == 'state-preparation':
+            return 2 * np.arccos(np.sqrt(hit_ratios))
+        elif algorithm == 'destructive-interference':
+            return 2 * np.arcsin(np.sqrt(hit_ratios))
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+    @classmethod
+    def execute_angular_distances(cls, algorithm, data_angles, centroid_angles, backend, max_qubits,
+                                  shots_per_circuit, max_workers=1, worker_timings=None, max_rounds=1):
+        """
+        Estimates the angular distances of all the given data points to all the
+        given centroids by executing the bound circuit templates, or calculates
+        them exactly if the backend is analytic. On a statevector simulator,
+        the distances are inverted from the exact probabilities, i.e. without
+        any shot noise, and every circuit executes one round.
+        We return an np.array with shape = (amount of data, k).
+        """
+
+        if QuantumBackendFactory.is_analytic_backend(backend):
+            return np.abs(data_angles[:, np.newaxis] - centroid_angles[np.newaxis, :])
+
+        if QuantumBackendFactory.is_statevector_backend(backend):
+            parameter_table = ClusteringCircuitGenerator.generate_clustering_parameters(algorithm,
+                                                                                         max_qubits,
+                                                                                         data_angles,
+                                                                                         centroid_angles)
+            probabilities = cls.execute_clustering_template_probabilities(algorithm, parameter_table, backend,
+                                                                          max_workers, worker_timings)
+            return cls.calculate_angular_distances(algorithm, probabilities, 1).reshape(data_angles.shape[0],
+                                                                                         centroid_angles.shape[0])
+
+        plan = QubitPackingPlanner.plan(algorithm, max_qubits, data_angles.shape[0] * centroid_angles.shape[0],
+                                        max_rounds)
+        parameter_table = ClusteringCircuitGenerator.generate_clustering_parameters(algorithm,
+                                                                                     max_qubits,
+                                                                                     data_angles,
+                                                                                     centroid_angles,
+                                                                                     max_rounds)
+        hits = cls.execute_clustering_template_hits(algorithm, parameter_table, backend, shots_per_circuit,
+                                                    max_workers, worker_timings, plan['rounds'])
+
+        return cls.calculate_angular_distances(algorithm, hits, shots_per_circuit).reshape(data_angles.shape[0],
+                                                                                            centroid_angles.shape[0])
+
+    @classmethod
+    def calculate_closeness_intervals(cls, algorithm, hits, shots, z=2.576):
+        """
+        Calculates the closeness of data points and centroids from the hits and the
+        shots of their pairs, i.e. the ratio of the outcome which is more likely the
+        closer the pair is: the hit ratio of the negative rotation and state
+        preparation clustering and 1 - hit ratio of the destructive interference
+        clustering.
+
+        We return the closeness together with the lower and upper bound of its Wilson
+        score confidence interval for the normal quantile z (2.576 = 99%).
+        """
+
+        if algorithm == 'destructive-interference':
+            successes = shots - hits
+        elif algorithm == 'negative-rotation' or algorithm == 'state-preparation':
+            successes = hits
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+        closeness = successes / shots
+        center = (successes + z * z / 2) / (shots + z * z)
+        half_width = z * np.sqrt(successes * (shots - successes) / shots + z * z / 4) / (shots + z * z)
+
+        return closeness, center - half_width, center + half_width
+
+    @classmethod
+    def select_undecided_pairs(cls, closeness, lower, upper):
+        """
+        Selects the pairs which have to be executed again to decide the closest
+        centroid of each data point, i.e. the closest centroid of a data point is
+        decided if the lower bound of its closeness is above the upper bounds of
+        all the other centroids. Otherwise we select the centroids whose interval
+        overlaps the one of the closest centroid, including the closest one.
+
+        We return a boolean np.array with shape = (amount of data, k).
+        """
+
+        closest = np.argmax(closeness, axis=1)
+        closest_lower = lower[np.arange(closeness.shape[0]), closest][:, np.newaxis]
+
+        # the centroids which still could be the closest one
+        candidates = upper >= closest_lower
+        candidates[np.arange(closeness.shape[0]), closest] = True
+
+        undecided = np.count_nonzero(candidates, axis=1) > 1
+
+        return candidates & undecided[:, np.newaxis]
+
+    @classmethod
+    def execute_adaptive_clustering(cls, algorithm, data_angles, centroid_angles, backend, max_qubits,
+                                    shots_per_circuit, shot_budget, max_workers=1, worker_timings=None,
+                                    max_rounds=1, shot_rounds=None):
+        """
+        Executes a rotational clustering with adaptive shot allocation.
+
+        All the pairs of data points and centroids are executed with shots_per_circuit
+        shots first. Afterwards, only the pairs of data points whose closest centroid
+        is undecided, see select_undecided_pairs, are executed again until all the
+        data points are decided or the rest of shot_budget cannot execute the
+        circuits of another round with at least shots_per_circuit shots each.
+        Every follow-up round doubles the shots of the
+        previous one (up to the maximum shots of the backend), i.e. the amount of
+        rounds only grows logarithmically with the shots a pair needs.
+        The data points are assigned to the centroid with the highest closeness
+        estimated from all the shots, see calculate_closeness_intervals.
+        For every round of shots a dictionary {'pairs', 'circuits', 'shots'} is
+        appended to shot_rounds.
+        """
+
+        amount_of_data = data_angles.shape[0]
+        k = centroid_angles.shape[0]
+
+        hits = np.zeros((amount_of_data, k))
+        shots = np.zeros((amount_of_data, k))
+
+        # the first round executes all the pairs
+        selected = np.ones((amount_of_data, k), dtype=bool)
+        remaining_shots = shot_budget
+        next_shots = shots_per_circuit
+        max_shots = getattr(backend.configuration(), 'max_shots', None) or next_shots
+
+        while selected.any():
+            data_indices, centroid_indices = np.nonzero(selected)
+            plan = QubitPackingPlanner.plan(algorithm, max_qubits, data_indices.shape[0], max_rounds)
+            round_shots = min(next_shots, int(remaining_shots / plan['circuits']))
+            next_shots = min(2 * next_shots, max(max_shots, shots_per_circuit))
+
+            if round_shots < 1 and not shots.any():
+                raise Exception('The shot budget is too small to execute every pair once.')
+
+            # a follow-up round with fewer shots than the first one can hardly narrow the
+            # intervals, i.e. the rest of the budget is not worth another job
+            if round_shots < 1 or (shots.any() and round_shots < shots_per_circuit):
+                break
+
+            parameter_table = ClusteringCircuitGenerator.generate_pair_parameters(algorithm,
+                                                                                  max_qubits,
+                                                                                  data_angles[data_indices],
+                                                                                  centroid_angles[centroid_indices],
+                                                                                  max_rounds)
+            hits[selected] += cls.execute_clustering_template_hits(algorithm,
+                                                                   parameter_table,
+                                                                   backend,
+                                                                   round_shots,
+                                                                   max_workers,
+                                                                   worker_timings,
+                                                                   plan['rounds'])
+            shots[selected] += round_shots
+            remaining_shots -= round_shots * plan['circuits']
+
+            if shot_rounds is not None:
+                shot_rounds.append({'pairs': int(data_indices.shape[0]),
+                                    'circuits': plan['circuits'],
+                                    'shots': round_shots})
+
+            closeness, lower, upper = cls.calculate_closeness_intervals(algorithm, hits, shots)
+            selected = cls.select_undecided_pairs(closeness, lower, upper)
+
+        closeness = cls.calculate_closeness_intervals(algorithm, hits, shots)[0]
+
+        # the closer, the lower the distance
+        return DataProcessingService.calculate_cluster_mapping(amount_of_data, k, - closeness.flatten())
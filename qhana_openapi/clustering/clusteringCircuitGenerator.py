@@ -5,6 +5,10 @@ Email: daniel-fink@outlook.com
 
 import numpy as np
 from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter, ParameterExpression
+from qiskit.circuit.library import RYGate
+
+from qubitPackingPlanner import QubitPackingPlanner
 
 
 class ClusteringCircuitGenerator:
@@ -13,217 +17,321 @@ class ClusteringCircuitGenerator:
     """
 
     @classmethod
-    def generate_negative_rotation_clustering(cls, max_qubits, data_angles, centroid_angles):
+    def append_clustering_pair(cls, qc, algorithm, qubit, clbit, angles):
+        """
+        Appends the comparison of one data point with one centroid to the given
+        circuit, starting at the given qubit and measuring into the classical
+        bits starting at clbit. The angles are [data angle, centroid angle]
+        resp. [relative angular difference] for the destructive interference
+        clustering, either as floats or as circuit parameters.
         """
-        Generate the circuits for performing a negative rotation clustering.
-        We take data and the centroid angles and generate Qiskit quantum
-        circuits under consideration of the maximum amount of qubits.
 
-        The data need to be in 1D cartesian representation in an
-        np.array of shape = (amount) while the length of centroid angles
-        is k.
+        if algorithm == 'negative-rotation':
+            # test_angle rotation
+            qc.ry(angles[0], qubit)
 
-        We return a list of Qiskit Quantum Circuits with each having at maximum
-        max_qubits Qubits.
-        """
+            # negative centroid_angle rotation
+            qc.ry(-angles[1], qubit)
 
-        # store a list of quantum circuits
-        circuits = []
+            # measure
+            qc.measure(qubit, clbit)
 
-        # this is also the amount of qubits that are needed in total
-        # note that this is not necessarily in parallel, also sequential
-        # is possible here
-        global_work_amount = centroid_angles.shape[0] * data_angles.shape[0]
+        elif algorithm == 'destructive-interference':
+            relative_angular = angles[0]
 
-        # create tuples of parameters corresponding for each qubit,
-        # i.e. create [[t1,c1], [t1,c2], ..., [t1,cn], [t2,c1], ..., [tm,cn]]
-        # now with ti = data_angle_i and cj = centroid_angle_j
-        parameters = []
-        for i in range(0, data_angles.shape[0]):
-            for j in range(0, centroid_angles.shape[0]):
-                parameters.append((data_angles[i], centroid_angles[j]))
+            qc.h(qubit)
+            qc.cx(qubit, qubit+1)
 
-        # this is the index to iterate over all parameter pairs in the queue (parameters list)
-        index = 0
-        queue_not_empty = True
+            # relative angular difference rotation
+            qc.ry(-relative_angular, qubit+1)
 
-        # create the circuit(s)
-        while queue_not_empty:
-            max_qubits_for_circuit = global_work_amount - index
+            qc.cx(qubit, qubit+1)
 
-            if max_qubits < max_qubits_for_circuit:
-                qubits_for_circuit = max_qubits
-            else:
-                qubits_for_circuit = max_qubits_for_circuit
+            # relative angular difference rotation
+            qc.ry(relative_angular, qubit+1)
 
-            qc = QuantumCircuit(qubits_for_circuit, qubits_for_circuit)
+            qc.h(qubit)
+            qc.measure(qubit, clbit)
+            qc.measure(qubit+1, clbit+1)
 
-            for i in range(0, qubits_for_circuit):
-                # test_angle rotation
-                qc.ry(parameters[index][0], i)
+        elif algorithm == 'state-preparation':
+            qc.h(qubit)
+            qc.cx(qubit, qubit+1)
 
-                # negative centroid_angle rotation
-                qc.ry(-parameters[index][1], i)
+            # angle for data point
+            qc.ry(angles[0], qubit)
 
-                # measure
-                qc.measure(i, i)
+            # angle for centroid
+            qc.ry(angles[1], qubit+1)
 
-                index += 1
-                if index == global_work_amount:
-                    queue_not_empty = False
-                    break
+            qc.cx(qubit, qubit+1)
+            qc.h(qubit)
 
-            circuits.append(qc)
+            qc.measure(qubit, clbit)
+            qc.measure(qubit+1, clbit+1)
 
-        return circuits
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+    @classmethod
+    def generate_packed_circuit(cls, algorithm, slots, pair_angles):
+        """
+        Generate one circuit which compares all the pairs of the given angles
+        on at most slots many slots, see QubitPackingPlanner. The pair p is placed
+        into slot p % slots in round p // slots, the qubits of a slot are reset
+        before they are reused in the next round. The qubits of pair p are
+        measured into the classical bits starting at qubits_per_pair * p.
+        """
+
+        qubits_per_pair = QubitPackingPlanner.get_qubits_per_pair(algorithm)
+        used_slots = min(slots, len(pair_angles))
+
+        qc = QuantumCircuit(used_slots * qubits_per_pair, len(pair_angles) * qubits_per_pair)
+
+        for p in range(0, len(pair_angles)):
+            qubit = (p % slots) * qubits_per_pair
+
+            # reuse the qubits of the slot measured in the previous round
+            if p >= slots:
+                for i in range(qubit, qubit + qubits_per_pair):
+                    qc.reset(i)
+
+            cls.append_clustering_pair(qc, algorithm, qubit, p * qubits_per_pair, pair_angles[p])
+
+        return qc
 
     @classmethod
-    def generate_destructive_interference_clustering(cls, max_qubits, data_angles, centroid_angles):
+    def generate_clustering_circuits(cls, algorithm, max_qubits, data_angles, centroid_angles, max_rounds=1):
         """
-        Generate the circuits for performing a destructive interference clustering.
+        Generate the circuits for performing the given rotational clustering.
         We take data and the centroid angles and generate Qiskit quantum
-        circuits under consideration of the maximum amount of qubits.
+        circuits under consideration of the maximum amount of qubits and
+        the maximum amount of rounds the qubits are reused within a circuit.
 
         The data need to be in 1D cartesian representation in an
         np.array of shape = (amount) while the length of centroid angles
         is k.
 
         We return a list of Qiskit Quantum Circuits with each having at maximum
-        max_qubits Qubits.
+        max_qubits Qubits. The pairs are ordered like
+        [(t1,c1), (t1,c2), ..., (t1,cn), (t2,c1), ..., (tm,cn)].
         """
 
+        # create all pairs [t_i, c_j] together with their circuit parameters
+        parameter_table = cls.generate_clustering_parameters(algorithm, max_qubits, data_angles,
+                                                             centroid_angles, max_rounds)
+        plan = QubitPackingPlanner.plan(algorithm, max_qubits, centroid_angles.shape[0] * data_angles.shape[0],
+                                        max_rounds)
+
         # store a list of quantum circuits
         circuits = []
 
-        # this is also the amount of qubits that are needed in total
-        # note that this is not necessarily in parallel, also sequential
-        # is possible here
-        global_work_amount = centroid_angles.shape[0] * data_angles.shape[0]
-
-        # create tuples of parameters corresponding for each qubit,
-        # i.e. create [[t1,c1], [t1,c2], ..., [t1,cn], [t2,c1], ..., [tm,cn]]
-        # now with ti = data_angle_i and cj = centroid_angle_j
-        parameters = []
-        for i in range(0, data_angles.shape[0]):
-            for j in range(0, centroid_angles.shape[0]):
-                parameters.append((data_angles[i], centroid_angles[j]))
+        for row in parameter_table:
+            pairs = row.reshape(-1, 2)
+            pairs = pairs[~np.isnan(pairs[:, 0])]
 
-        # this is the index to iterate over all parameter pairs in the queue (parameters list)
-        index = 0
-        queue_not_empty = True
-
-        # create the circuit(s)
-        while queue_not_empty:
-            max_qubits_for_circuit = (global_work_amount - index) * 2
-
-            if max_qubits < max_qubits_for_circuit:
-                qubits_for_circuit = max_qubits
+            if algorithm == 'destructive-interference':
+                pair_angles = [[abs(data_angle - centroid_angle)] for data_angle, centroid_angle in pairs.tolist()]
             else:
-                qubits_for_circuit = max_qubits_for_circuit
+                pair_angles = pairs.tolist()
 
-            if qubits_for_circuit % 2 != 0:
-                qubits_for_circuit -= 1
+            circuits.append(cls.generate_packed_circuit(algorithm, plan['slots'], pair_angles))
 
-            qc = QuantumCircuit(qubits_for_circuit, qubits_for_circuit)
-
-            for i in range(0, qubits_for_circuit, 2):
-                qc.h(i)
-                qc.cx(i, i+1)
+        return circuits
 
-                relative_angular = abs(parameters[index][0] - parameters[index][1])
+    @classmethod
+    def generate_negative_rotation_clustering(cls, max_qubits, data_angles, centroid_angles, max_rounds=1):
+        """
+        Generate the circuits for performing a negative rotation clustering,
+        see generate_clustering_circuits. Every qubit compares one data point
+        with one centroid.
+        """
 
-                # relative angular difference rotation
-                qc.ry(-relative_angular, i+1)
+        return cls.generate_clustering_circuits('negative-rotation', max_qubits, data_angles,
+                                                centroid_angles, max_rounds)
 
-                qc.cx(i, i+1)
+    @classmethod
+    def generate_destructive_interference_clustering(cls, max_qubits, data_angles, centroid_angles, max_rounds=1):
+        """
+        Generate the circuits for performing a destructive interference clustering,
+        see generate_clustering_circuits. Every two qubits compare one data point
+        with one centroid, an odd last qubit stays idle.
+        """
 
-                # relative angular difference rotation
-                qc.ry(relative_angular, i+1)
+        return cls.generate_clustering_circuits('destructive-interference', max_qubits, data_angles,
+                                                centroid_angles, max_rounds)
 
-                qc.h(i)
-                qc.measure(i, i)
-                qc.measure(i+1, i+1)
+    @classmethod
+    def generate_state_preparation_clustering(cls, max_qubits, data_angles, centroid_angles, max_rounds=1):
+        """
+        Generate the circuits for performing a state preparation clustering,
+        see generate_clustering_circuits. Every two qubits compare one data point
+        with one centroid, an odd last qubit stays idle.
+        """
 
-                index += 1
-                if index == global_work_amount:
-                    queue_not_empty = False
-                    break
+        return cls.generate_clustering_circuits('state-preparation', max_qubits, data_angles,
+                                                centroid_angles, max_rounds)
 
-            circuits.append(qc)
+    @classmethod
+    def is_zero_angle(cls, angle):
+        """
+        Checks whether the given rotation angle is a number close to 0,
+        i.e. unbound parameters are never treated as 0.
+        """
 
-        return circuits
+        if isinstance(angle, ParameterExpression) and len(angle.parameters) > 0:
+            return False
+        return abs(float(angle)) < 1e-12
 
     @classmethod
-    def generate_state_preparation_clustering(cls, max_qubits, data_angles, centroid_angles):
+    def simplify_circuit(cls, qc):
+        """
+        Simplifies the given circuit by a peephole pass over its gates, i.e.
+        consecutive ry rotations of a qubit are fused into one (ry(a) ry(b) = ry(a + b)),
+        ry rotations by 0 are removed and adjacent self inverse gates cancel out,
+        i.e. h h on a qubit and cx cx on the same control and target.
+        Removing gates can make further gates adjacent, e.g. h cx ry(0) cx h vanishes.
+
+        We return a new circuit with the same registers, the measurements and
+        resets stay in place.
         """
-        Generate the circuits for performing a state preparation clustering.
-        We take data and the centroid angles and generate Qiskit quantum
-        circuits under consideration of the maximum amount of qubits.
 
-        The data need to be in 1D cartesian representation in an
-        np.array of shape = (amount) while the length of centroid angles
-        is k.
+        # the remaining instructions and per qubit a stack of the
+        # indices of the remaining instructions acting on it
+        instructions = []
+        stacks = {qubit: [] for qubit in qc.qubits}
+
+        def top(qubit):
+            stack = stacks[qubit]
+            return stack[-1] if len(stack) > 0 else None
+
+        def remove(index):
+            for qubit in instructions[index][1]:
+                stacks[qubit].pop()
+            instructions[index] = None
+
+        for instruction, qargs, cargs in qc.data:
+            name = instruction.name
+            index = top(qargs[0])
+
+            if name == 'ry':
+                angle = instruction.params[0]
+                if index is not None and instructions[index][0].name == 'ry':
+                    # fuse with the previous rotation of the qubit
+                    angle = instructions[index][0].params[0] + angle
+                    remove(index)
+                if cls.is_zero_angle(angle):
+                    continue
+                instruction = RYGate(angle)
+
+            elif name == 'h' and index is not None and instructions[index][0].name == 'h':
+                remove(index)
+                continue
+
+            elif name == 'cx' and index is not None and index == top(qargs[1]) \
+                    and instructions[index][0].name == 'cx' and list(instructions[index][1]) == list(qargs):
+                remove(index)
+                continue
+
+            instructions.append((instruction, qargs, cargs))
+            for qubit in qargs:
+                stacks[qubit].append(len(instructions) - 1)
+
+        simplified = QuantumCircuit(*qc.qregs, *qc.cregs, name=qc.name)
+        for entry in instructions:
+            if entry is not None:
+                simplified.append(*entry)
+
+        return simplified
 
-        We return a list of Qiskit Quantum Circuits with each having at maximum
-        max_qubits Qubits.
+    @classmethod
+    def simplify_circuits(cls, circuits):
         """
+        Simplifies all the given circuits, see simplify_circuit.
 
-        # store a list of quantum circuits
-        circuits = []
+        We return the simplified circuits and a dictionary with the total amount of
+        gates and the maximum depth of the circuits before and after the simplification.
+        The gates include the measurements and resets.
+        """
 
-        # this is also the amount of qubits that are needed in total
-        # note that this is not necessarily in parallel, also sequential
-        # is possible here
-        global_work_amount = centroid_angles.shape[0] * data_angles.shape[0]
+        simplified = [cls.simplify_circuit(qc) for qc in circuits]
 
-        # create tuples of parameters corresponding for each qubit,
-        # i.e. create [[t1,c1], [t1,c2], ..., [t1,cn], [t2,c1], ..., [tm,cn]]
-        # now with ti = data_angle_i and cj = centroid_angle_j
-        parameters = []
-        for i in range(0, data_angles.shape[0]):
-            for j in range(0, centroid_angles.shape[0]):
-                parameters.append((data_angles[i], centroid_angles[j]))
+        return simplified, {'gates_before': int(sum(qc.size() for qc in circuits)),
+                            'gates_after': int(sum(qc.size() for qc in simplified)),
+                            'depth_before': int(max([qc.depth() for qc in circuits], default=0)),
+                            'depth_after': int(max([qc.depth() for qc in simplified], default=0))}
 
-        # this is the index to iterate over all parameter pairs in the queue (parameters list)
-        index = 0
-        queue_not_empty = True
+    @classmethod
+    def generate_clustering_template(cls, algorithm, pairs, rounds=1):
+        """
+        Generate one parameterized circuit of the given rotational clustering
+        algorithm which compares pairs many data points with centroids at once.
+        The negative rotation clustering needs one qubit per pair, the
+        destructive interference and state preparation clustering need two.
+        The pairs are spread over rounds many rounds, i.e. the qubits are
+        reset and reused rounds - 1 times, see generate_packed_circuit.
+
+        We return the template and the list of its parameters in the order
+        [data_0, centroid_0, data_1, centroid_1, ...] resp. [difference_0,
+        difference_1, ...] for the destructive interference clustering, which
+        only depends on the relative angular difference of each pair.
+        """
 
-        # create the circuit(s)
-        while queue_not_empty:
-            max_qubits_for_circuit = (global_work_amount - index) * 2
+        parameters = []
+        pair_angles = []
 
-            if max_qubits < max_qubits_for_circuit:
-                qubits_for_circuit = max_qubits
+        for i in range(0, pairs):
+            if algorithm == 'destructive-interference':
+                angles = [Parameter('difference_' + str(i))]
             else:
-                qubits_for_circuit = max_qubits_for_circuit
-
-            if qubits_for_circuit % 2 != 0:
-                qubits_for_circuit -= 1
+                angles = [Parameter('data_' + str(i)), Parameter('centroid_' + str(i))]
+            parameters.extend(angles)
+            pair_angles.append(angles)
 
-            qc = QuantumCircuit(qubits_for_circuit, qubits_for_circuit)
+        slots = -(-pairs // rounds)
+        qc = cls.generate_packed_circuit(algorithm, slots, pair_angles)
 
-            for i in range(0, qubits_for_circuit, 2):
-                qc.h(i)
-                qc.cx(i, i+1)
+        return qc, parameters
 
-                # angle for data point
-                qc.ry(parameters[index][0], i)
-
-                # angle for centroid
-                qc.ry(parameters[index][1], i+1)
+    @classmethod
+    def generate_clustering_parameters(cls, algorithm, max_qubits, data_angles, centroid_angles, max_rounds=1):
+        """
+        Generate the parameter table for performing a rotational clustering with
+        the template of generate_clustering_template, i.e. instead of one concrete
+        circuit per row we only store the angles of the pairs the circuit compares.
+        The pairs per circuit are planned by QubitPackingPlanner, i.e. they are
+        spread over up to max_rounds rounds of reused qubits.
+
+        We return an np.array of shape = (amount of circuits, 2 * pairs per circuit)
+        with the row format [data angle 0, centroid angle 0, data angle 1, ...].
+        The pairs are ordered like in the concrete circuits, i.e.
+        [(t1,c1), (t1,c2), ..., (t1,cn), (t2,c1), ..., (tm,cn)].
+        The unused pairs of the last circuit are filled with nan.
+        """
 
-                qc.cx(i, i+1)
-                qc.h(i)
+        # create all pairs [t_i, c_j] at once
+        pair_data_angles = np.repeat(data_angles, centroid_angles.shape[0])
+        pair_centroid_angles = np.tile(centroid_angles, data_angles.shape[0])
 
-                qc.measure(i, i)
-                qc.measure(i+1, i+1)
+        return cls.generate_pair_parameters(algorithm, max_qubits, pair_data_angles, pair_centroid_angles, max_rounds)
 
-                index += 1
+    @classmethod
+    def generate_pair_parameters(cls, algorithm, max_qubits, pair_data_angles, pair_centroid_angles, max_rounds=1):
+        """
+        Generate the parameter table like generate_clustering_parameters, but for
+        the given pairs only, i.e. the pair i compares the data angle
+        pair_data_angles[i] with the centroid angle pair_centroid_angles[i].
+        """
 
-                if index == global_work_amount:
-                    queue_not_empty = False
-                    break
+        # the amount of pairs is also the amount of comparisons in total
+        global_work_amount = pair_data_angles.shape[0]
+        plan = QubitPackingPlanner.plan(algorithm, max_qubits, global_work_amount, max_rounds)
+        pairs = plan['pairs_per_circuit']
+        amount_of_circuits = plan['circuits']
 
-            circuits.append(qc)
+        # store the pairs, padded to full circuits
+        parameters = np.full((amount_of_circuits * pairs, 2), np.nan)
+        parameters[:global_work_amount, 0] = pair_data_angles
+        parameters[:global_work_amount, 1] = pair_centroid_angles
 
-        return circuits
+        return parameters.reshape(amount_of_circuits, pairs * 2)
@@ -0,0 +1,41 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import numpy as np
+from sklearn.metrics import silhouette_score
+
+
+class ClusteringEvaluationService:
+    """
+    A service class for evaluating the quality of a clustering,
+    e.g. to select k with the elbow method or the silhouette.
+    """
+
+    @classmethod
+    def calculate_inertia(cls, cluster_mapping, centroids, data):
+        """
+        Calculates the inertia of the clustering, i.e. the sum of the squared
+        euclidean distances of the data points to their assigned centroids.
+        """
+
+        cluster_mapping = np.asarray(cluster_mapping).astype(int)
+        return float(np.sum(np.square(data - centroids[cluster_mapping])))
+
+    @classmethod
+    def calculate_silhouette(cls, cluster_mapping, data, sample_size=0):
+        """
+        Calculates the mean silhouette coefficient of the clustering, optionally
+        on a random sample of sample_size data points. The silhouette is only
+        defined for 2 <= amount of clusters <= amount of data - 1, otherwise
+        we return None.
+        """
+
+        amount_of_clusters = np.unique(cluster_mapping).shape[0]
+        if amount_of_clusters < 2 or amount_of_clusters > data.shape[0] - 1:
+            return None
+
+        if 0 < sample_size < data.shape[0]:
+            return float(silhouette_score(data, cluster_mapping, sample_size=sample_size))
+        return float(silhouette_score(data, cluster_mapping))
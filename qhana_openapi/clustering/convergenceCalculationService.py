@@ -5,6 +5,8 @@ Email: daniel-fink@outlook.com
 
 from math import sqrt, pow
 
+import numpy as np
+
 
 class ConvergenceCalculationService:
     """
@@ -33,3 +35,12 @@ class ConvergenceCalculationService:
         for i in range(0, first.shape[0]):
             norm += pow(first[i] - second[i], 2)
         return sqrt(norm)
+
+    @classmethod
+    def calculate_angular_movements(cls, old_centroid_angles, new_centroid_angles):
+        """
+        Calculates how far each centroid moved between two iterations
+        in terms of its angle, i.e. |new angle - old angle| per centroid.
+        """
+
+        return np.abs(np.asarray(new_centroid_angles) - np.asarray(old_centroid_angles))
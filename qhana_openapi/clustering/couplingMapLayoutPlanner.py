@@ -0,0 +1,207 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+from quantumBackendFactory import QuantumBackendFactory
+
+
+class CouplingMapLayoutPlanner:
+    """
+    A class for planning the initial layout of the clustering circuits on the
+    physical qubits of a backend, i.e. which virtual qubit is placed on which
+    physical qubit before the transpilation.
+
+    The pairs of the negative rotation clustering occupy independent single
+    qubits, which can be placed on any physical qubits. The pairs of the
+    destructive interference and state preparation clustering occupy two qubits
+    (2s, 2s + 1) which are entangled by cx gates, i.e. they are placed on two
+    directly connected physical qubits each, such that the transpilation does
+    not need to add any swap. The pairs are chosen as a maximum set of
+    disjoint connected physical qubit pairs (a matching of the coupling map).
+    """
+
+    @classmethod
+    def get_coupling_map(cls, backend):
+        """
+        Returns the coupling map of the backend as list of directed edges [control, target]
+        or None if the backend has none, e.g. a simulator.
+        """
+
+        if QuantumBackendFactory.is_analytic_backend(backend):
+            return None
+
+        coupling_map = getattr(backend.configuration(), 'coupling_map', None)
+        if not coupling_map:
+            return None
+
+        return [list(edge) for edge in coupling_map]
+
+    @classmethod
+    def calculate_neighbours(cls, coupling_map):
+        """
+        Returns the undirected neighbours of every physical qubit of the coupling map.
+        """
+
+        neighbours = {}
+        for a, b in coupling_map:
+            if a != b:
+                neighbours.setdefault(a, set()).add(b)
+                neighbours.setdefault(b, set()).add(a)
+
+        return neighbours
+
+    @classmethod
+    def calculate_two_coloring(cls, neighbours):
+        """
+        Colors the physical qubits with 0 and 1 such that connected qubits have
+        different colors, or returns None if the coupling map is not bipartite.
+        Lines, rings of even length, grids and heavy hexagon lattices are bipartite.
+        """
+
+        colors = {}
+        for start in sorted(neighbours):
+            if start in colors:
+                continue
+            colors[start] = 0
+            queue = [start]
+            while queue:
+                qubit = queue.pop()
+                for neighbour in neighbours[qubit]:
+                    if neighbour not in colors:
+                        colors[neighbour] = 1 - colors[qubit]
+                        queue.append(neighbour)
+                    elif colors[neighbour] == colors[qubit]:
+                        return None
+
+        return colors
+
+    @classmethod
+    def find_disjoint_pairs(cls, coupling_map):
+        """
+        Finds as many disjoint pairs of directly connected physical qubits as possible.
+        The pairs are chosen greedily, preferring qubits with few neighbours, and are
+        extended by augmenting paths if the coupling map is bipartite, which results
+        in a maximum matching. Otherwise the greedy pairs are kept.
+
+        We return a sorted list of pairs (control, target) which are oriented like
+        an edge of the coupling map, i.e. the cx gates need no direction flip.
+        """
+
+        neighbours = cls.calculate_neighbours(coupling_map)
+
+        # greedy matching, the qubits with the fewest neighbours first
+        partners = {}
+        edges = sorted(set((min(a, b), max(a, b)) for a, b in coupling_map if a != b),
+                       key=lambda edge: (len(neighbours[edge[0]]) + len(neighbours[edge[1]]), edge))
+        for a, b in edges:
+            if a not in partners and b not in partners:
+                partners[a] = b
+                partners[b] = a
+
+        # augment the matching along alternating paths starting at unmatched qubits of color 0
+        colors = cls.calculate_two_coloring(neighbours)
+        if colors is not None:
+            matched_targets = {qubit: partner for qubit, partner in partners.items() if colors[qubit] == 1}
+
+            def augment(qubit, visited):
+                for neighbour in sorted(neighbours[qubit]):
+                    if neighbour in visited:
+                        continue
+                    visited.add(neighbour)
+                    if neighbour not in matched_targets or augment(matched_targets[neighbour], visited):
+                        matched_targets[neighbour] = qubit
+                        return True
+                return False
+
+            for qubit in sorted(neighbours):
+                if colors[qubit] == 0 and qubit not in partners:
+                    if augment(qubit, set()):
+                        partners = {}
+                        for target, control in matched_targets.items():
+                            partners[target] = control
+                            partners[control] = target
+
+        # orient the pairs like the edges of the coupling map
+        directed_edges = set((a, b) for a, b in coupling_map)
+        pairs = []
+        for qubit, partner in partners.items():
+            if qubit < partner:
+                pairs.append((qubit, partner) if (qubit, partner) in directed_edges else (partner, qubit))
+
+        return sorted(pairs)
+
+    @classmethod
+    def get_max_qubits(cls, algorithm, coupling_map):
+        """
+        Returns the maximum amount of qubits a circuit of the given algorithm can use
+        on the coupling map without any swap.
+        """
+
+        if algorithm == 'negative-rotation':
+            return len(cls.calculate_neighbours(coupling_map))
+        elif algorithm == 'destructive-interference' or algorithm == 'state-preparation':
+            return 2 * len(cls.find_disjoint_pairs(coupling_map))
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+    @classmethod
+    def plan_layout(cls, algorithm, coupling_map, qubits):
+        """
+        Plans the initial layout of a circuit of the given algorithm with the given amount
+        of qubits, i.e. we return a list with the physical qubit of every virtual qubit.
+        We return None if there is no coupling map or if the circuit is too wide to be
+        placed without swaps, i.e. the transpiler chooses the layout itself.
+        """
+
+        if not coupling_map:
+            return None
+
+        physical_qubits = sorted(cls.calculate_neighbours(coupling_map))
+
+        if algorithm == 'negative-rotation':
+            if qubits > len(physical_qubits):
+                return None
+            return physical_qubits[:qubits]
+
+        elif algorithm == 'destructive-interference' or algorithm == 'state-preparation':
+            pairs = cls.find_disjoint_pairs(coupling_map)
+            if qubits // 2 > len(pairs):
+                return None
+            layout = [qubit for pair in pairs[:qubits // 2] for qubit in pair]
+
+            # an odd last qubit is idle and can be placed anywhere
+            if qubits % 2 == 1:
+                unused_qubits = [qubit for qubit in physical_qubits if qubit not in layout]
+                if len(unused_qubits) == 0:
+                    return None
+                layout.append(unused_qubits[0])
+
+            return layout
+
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+    @classmethod
+    def plan_layouts(cls, algorithm, backend, circuits):
+        """
+        Plans the initial layouts of the given circuits on the backend, see plan_layout.
+        The layout only depends on the amount of qubits, i.e. it is planned once per
+        distinct width and shared by all the circuits of that width.
+        We return None if the backend has no coupling map or if any of the circuits
+        cannot be placed without swaps.
+        """
+
+        coupling_map = cls.get_coupling_map(backend)
+        if coupling_map is None:
+            return None
+
+        width_layouts = {}
+        for circuit in circuits:
+            if circuit.num_qubits not in width_layouts:
+                layout = cls.plan_layout(algorithm, coupling_map, circuit.num_qubits)
+                if layout is None:
+                    return None
+                width_layouts[circuit.num_qubits] = layout
+
+        return [width_layouts[circuit.num_qubits] for circuit in circuits]
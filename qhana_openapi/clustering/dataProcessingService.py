@@ -4,8 +4,6 @@ Email: daniel-fink@outlook.com
 """
 
 import numpy as np
-from math import acos, sqrt
-import random
 
 
 class DataProcessingService:
@@ -13,6 +11,9 @@ class DataProcessingService:
     A service class for all kind of data processing functions
     like angle calculation, centroid calculation, normalization,
     standardization, etc.
+
+    All functions work on whole np.arrays at once, i.e. there are
+    no python loops over the data points.
     """
 
     @classmethod
@@ -22,45 +23,107 @@ class DataProcessingService:
         it as np.array with shape = (amount, 2).
         """
 
-        data = np.zeros((amount, 2))
-
         # create random float numbers per coordinate
-        for i in range(0, amount):
-            data[i][0] = random.uniform(-1.0, 1.0)
-            data[i][1] = random.uniform(-1.0, 1.0)
+        return np.random.uniform(-1.0, 1.0, (amount, 2))
+
+    @classmethod
+    def sample_data(cls, data, sample_size):
+        """
+        Returns sample_size many random data points without replacement or
+        all the data points if sample_size is 0 or not less than the amount of data.
+        """
 
+        if 0 < sample_size < data.shape[0]:
+            return data[np.random.choice(data.shape[0], sample_size, replace=False)]
         return data
 
     @classmethod
-    def standardize(cls, data):
+    def initialize_centroids_kmeans_plus_plus(cls, data, k, sample_size=0):
+        """
+        Chooses k of the (sampled) data points as centroids with the k-means++ seeding,
+        i.e. the first centroid is chosen uniformly and every further one with a
+        probability proportional to the squared distance to its closest chosen centroid.
+        We return the centroids as np.array with shape = (k, 2).
+        """
+
+        data = cls.sample_data(data, sample_size)
+
+        centroids = np.empty((k, 2))
+        centroids[0] = data[np.random.randint(data.shape[0])]
+
+        # the squared distances of all points to their closest centroid so far
+        squared_distances = np.sum(np.square(data - centroids[0]), axis=1)
+
+        for i in range(1, k):
+            total = np.sum(squared_distances)
+            if total > 0:
+                index = np.random.choice(data.shape[0], p=squared_distances / total)
+            else:
+                index = np.random.randint(data.shape[0])
+            centroids[i] = data[index]
+            squared_distances = np.minimum(squared_distances, np.sum(np.square(data - centroids[i]), axis=1))
+
+        return centroids
+
+    @classmethod
+    def initialize_centroids_angle_quantiles(cls, data, k, base_vector, sample_size=0):
+        """
+        Chooses k of the (sampled) data points as centroids whose angles to the base
+        vector are the (i + 0.5) / k quantiles of all the angles, i.e. the centroids
+        are spread evenly over the angular distribution the clustering works on.
+        We return the centroids as np.array with shape = (k, 2).
+        """
+
+        data = cls.sample_data(data, sample_size)
+
+        order = np.argsort(cls.calculate_angles(data, base_vector))
+        quantile_indices = ((np.arange(k) + 0.5) / k * data.shape[0]).astype(int)
+
+        return data[order[quantile_indices]]
+
+    @classmethod
+    def initialize_centroids(cls, initialization, k, data=None, base_vector=None, sample_size=0):
+        """
+        Initializes k centroids with the given initialization, i.e. 'random' for k
+        random points (see generate_random_data), 'kmeans++' or 'angle-quantiles'
+        for data aware centroids chosen from the data mapped to the unit sphere.
+        """
+
+        if initialization == 'random':
+            return cls.generate_random_data(k)
+        elif initialization == 'kmeans++':
+            return cls.initialize_centroids_kmeans_plus_plus(data, k, sample_size)
+        elif initialization == 'angle-quantiles':
+            return cls.initialize_centroids_angle_quantiles(data, k, base_vector, sample_size)
+        else:
+            raise Exception('Unknown centroid initialization ' + str(initialization) + '.')
+
+    @classmethod
+    def calculate_standardization(cls, data):
+        """
+        Calculates the mean and the standard deviation per coordinate
+        of the 2D data, i.e. the parameters of the standardization.
+        """
+
+        return np.mean(data, axis=0), np.std(data, axis=0)
+
+    @classmethod
+    def standardize(cls, data, mean=None, std=None):
         """
         Standardize all the 2D points given in the data np.array,
         i.e. all the points will have zero mean and unit variance.
         We expect the np.array to represent a matrix with the
         coordinates of point i being data[i] = [x, y].
+        If mean and std are given, they are used instead of the ones of
+        the data, e.g. to map new points like the data of a fitted job.
         Note that a copy of the data points will be created.
         """
 
-        # create empty arrays
-        data_x = np.zeros(data.shape[0])
-        data_y = np.zeros(data.shape[0])
-        preprocessed_data = np.zeros_like(data)
-
-        # create x and y coordinate arrays
-        for i in range(0, len(data)):
-            data_x[i] = data[i][0]
-            data_y[i] = data[i][1]
-
-        # make zero mean and unit variance, i.e. standardize
-        temp_data_x = (data_x - np.mean(data_x)) / np.std(data_x)
-        temp_data_y = (data_y - np.mean(data_y)) / np.std(data_y)
-
-        # create tuples to return
-        for i in range(0, data.shape[0]):
-            preprocessed_data[i][0] = temp_data_x[i]
-            preprocessed_data[i][1] = temp_data_y[i]
+        if mean is None or std is None:
+            mean, std = cls.calculate_standardization(data)
 
-        return preprocessed_data
+        # make zero mean and unit variance per coordinate, i.e. standardize
+        return (data - mean) / std
 
     @classmethod
     def normalize(cls, data):
@@ -71,15 +134,8 @@ class DataProcessingService:
         Note that a copy of the data points will be created.
         """
 
-        preprocessed_data = np.zeros_like(data)
-
-        # create tuples and normalize
-        for i in range(0, data.shape[0]):
-            norm = sqrt(pow(data[i][0], 2) + pow(data[i][1], 2))
-            preprocessed_data[i][0] = data[i][0] / norm
-            preprocessed_data[i][1] = data[i][1] / norm
-
-        return preprocessed_data
+        norms = np.sqrt(np.sum(np.square(data), axis=1))
+        return data / norms[:, np.newaxis]
 
     @classmethod
     def calculate_angles(cls, cartesian_points, base_vector):
@@ -87,50 +143,148 @@ class DataProcessingService:
         Calculates the angles between the 2D vectors and the given 2D base vector.
         """
 
-        angles = np.zeros(cartesian_points.shape[0])
-        for i in range(0, angles.shape[0]):
-            # formula: alpha = acos( 1/(|a||b|) * a • b )
-            # here: |a| = |b| = 1
-            angles[i] = acos(
-                base_vector[0] * cartesian_points[i][0] + base_vector[1] * cartesian_points[i][1])
-
-        return angles
+        # formula: alpha = acos( 1/(|a||b|) * a • b )
+        # here: |a| = |b| = 1, we clip the dot products to
+        # [-1, 1] to get rid of rounding errors
+        dot_products = np.asarray(cartesian_points).dot(np.asarray(base_vector, dtype=float))
+        return np.arccos(np.clip(dot_products, -1.0, 1.0))
 
     @classmethod
-    def calculate_centroids(cls, cluster_mapping, old_centroids, data):
+    def calculate_centroids(cls, cluster_mapping, old_centroids, data, weights=None):
         """
         Calculates the new cartesian positions of the
         given centroids in the cluster mapping.
+        If weights are given, every data point counts as weights[i]
+        many points, e.g. the representatives of a coreset.
         Note that a copy of the data points will be created.
         """
 
-        # create empty arrays
-        centroids = np.zeros_like(old_centroids)
-        cluster_k = centroids.shape[0]
-
-        for i in range(0, cluster_k):
-            sum_x = 0
-            sum_y = 0
-            amount = 0
-            for j in range(0, cluster_mapping.shape[0]):
-                if cluster_mapping[j] == i:
-                    sum_x += data[j][0]
-                    sum_y += data[j][1]
-                    amount += 1
-
-            # if no points assigned to centroid, take old coordinates
-            if amount == 0:
-                averaged_x = old_centroids[i][0]
-                averaged_y = old_centroids[i][1]
-            else:
-                averaged_x = sum_x / amount
-                averaged_y = sum_y / amount
+        cluster_k = old_centroids.shape[0]
+        cluster_mapping = np.asarray(cluster_mapping).astype(int)
 
-            norm = sqrt(pow(averaged_x, 2) + pow(averaged_y, 2))
-            centroids[i][0] = averaged_x / norm
-            centroids[i][1] = averaged_y / norm
+        if weights is None:
+            weights = np.ones(data.shape[0])
 
-        return centroids
+        # sum up the weighted coordinates and the weights per centroid
+        amounts = np.bincount(cluster_mapping, weights=weights, minlength=cluster_k)[:cluster_k]
+        sum_x = np.bincount(cluster_mapping, weights=weights * data[:, 0], minlength=cluster_k)[:cluster_k]
+        sum_y = np.bincount(cluster_mapping, weights=weights * data[:, 1], minlength=cluster_k)[:cluster_k]
+
+        # if no points assigned to centroid, take old coordinates
+        centroids = np.array(old_centroids, dtype=float)
+        assigned = amounts > 0
+        centroids[assigned, 0] = sum_x[assigned] / amounts[assigned]
+        centroids[assigned, 1] = sum_y[assigned] / amounts[assigned]
+
+        return cls.normalize(centroids)
+
+    @classmethod
+    def calculate_centroids_incrementally(cls, cluster_mapping, old_centroids, data, counts):
+        """
+        Updates the given centroids with a mini batch of data points, i.e. every
+        centroid moves towards the points of the batch assigned to it with a
+        learning rate of 1 / (amount of points it has been assigned so far).
+        The counts are the amounts of points assigned to each centroid in the
+        previous batches.
+
+        We return the new centroids and the updated counts.
+        """
+
+        cluster_k = old_centroids.shape[0]
+        cluster_mapping = np.asarray(cluster_mapping).astype(int)
+
+        # sum up the coordinates and count the points per centroid within the batch
+        amounts = np.bincount(cluster_mapping, minlength=cluster_k)[:cluster_k]
+        sum_x = np.bincount(cluster_mapping, weights=data[:, 0], minlength=cluster_k)[:cluster_k]
+        sum_y = np.bincount(cluster_mapping, weights=data[:, 1], minlength=cluster_k)[:cluster_k]
+
+        # the running mean over all batches, which equals moving the
+        # centroid point by point with the learning rate 1 / count
+        new_counts = counts + amounts
+        centroids = np.array(old_centroids, dtype=float)
+        assigned = amounts > 0
+        centroids[assigned, 0] = (counts[assigned] * centroids[assigned, 0] + sum_x[assigned]) / new_counts[assigned]
+        centroids[assigned, 1] = (counts[assigned] * centroids[assigned, 1] + sum_y[assigned]) / new_counts[assigned]
+
+        return cls.normalize(centroids), new_counts
+
+    @classmethod
+    def calculate_angle_bin_coreset(cls, data, size):
+        """
+        Reduces the data on the unit sphere to at most size many weighted points by
+        binning the points by their polar angle into size many equally wide bins
+        on the whole circle. The representative of a bin is the normalized mean of
+        its points and its weight is the amount of its points, empty bins are dropped.
+
+        Note that the bins use the polar angle instead of the angle to the base
+        vector, which is the same for points mirrored at the base vector.
+        """
+
+        polar_angles = np.arctan2(data[:, 1], data[:, 0])
+        bins = np.minimum(((polar_angles + np.pi) / (2 * np.pi) * size).astype(int), size - 1)
+
+        # drop the empty bins, i.e. number the used bins consecutively
+        used_bins, membership = np.unique(bins, return_inverse=True)
+        weights = np.bincount(membership).astype(float)
+        sum_x = np.bincount(membership, weights=data[:, 0])
+        sum_y = np.bincount(membership, weights=data[:, 1])
+
+        return cls.normalize(np.column_stack((sum_x, sum_y))), weights, membership
+
+    @classmethod
+    def calculate_sensitivity_coreset(cls, data, size):
+        """
+        Reduces the data on the unit sphere to at most size many weighted points by
+        sensitivity sampling (lightweight coreset), i.e. the points are sampled with
+        replacement with the probability 1 / (2N) + d^2 / (2 * sum of d^2), d being
+        the distance of a point to the mean of the data, and weighted with
+        1 / (size * probability). Points sampled several times are merged.
+        Every data point is represented by the sampled point with the closest polar angle.
+        """
+
+        squared_distances = np.sum(np.square(data - np.mean(data, axis=0)), axis=1)
+        total = np.sum(squared_distances)
+        probabilities = np.full(data.shape[0], 1 / data.shape[0])
+        if total > 0:
+            probabilities = probabilities / 2 + squared_distances / (2 * total)
+
+        samples = np.random.choice(data.shape[0], size, replace=True, p=probabilities)
+        indices, counts = np.unique(samples, return_counts=True)
+        weights = counts / (size * probabilities[indices])
+
+        # map every data point to the sampled point with the closest polar angle, i.e. to
+        # one of its two neighbours in the sorted sampled angles (wrapping around the circle)
+        polar_angles = np.arctan2(data[:, 1], data[:, 0])
+        order = np.argsort(polar_angles[indices])
+        sorted_angles = polar_angles[indices][order]
+        upper = np.searchsorted(sorted_angles, polar_angles) % indices.shape[0]
+        lower = (upper - 1) % indices.shape[0]
+        upper_differences = np.abs(polar_angles - sorted_angles[upper])
+        lower_differences = np.abs(polar_angles - sorted_angles[lower])
+        upper_differences = np.minimum(upper_differences, 2 * np.pi - upper_differences)
+        lower_differences = np.minimum(lower_differences, 2 * np.pi - lower_differences)
+        membership = order[np.where(upper_differences <= lower_differences, upper, lower)]
+
+        return data[indices], weights, membership
+
+    @classmethod
+    def calculate_coreset(cls, method, data, size):
+        """
+        Reduces the data on the unit sphere to at most size many weighted points with
+        the given method, i.e. 'angle-bins' or 'sensitivity'.
+
+        We return the points of the coreset, their weights and the membership of every
+        data point, i.e. the index of the coreset point representing it. The cluster
+        mapping of the coreset can be expanded to all the data with
+        coreset_mapping[membership].
+        """
+
+        if method == 'angle-bins':
+            return cls.calculate_angle_bin_coreset(data, size)
+        elif method == 'sensitivity':
+            return cls.calculate_sensitivity_coreset(data, size)
+        else:
+            raise Exception('Unknown coreset method ' + str(method) + '.')
 
     @classmethod
     def calculate_cluster_mapping(cls, amount_of_data, k, distances):
@@ -150,16 +304,10 @@ class DataProcessingService:
         ...
         """
 
-        cluster_mapping = np.zeros(amount_of_data)
-        for i in range(0, amount_of_data):
-            lowest_distance = distances[i * k + 0]
-            lowest_distance_centroid_index = 0
-            for j in range(1, k):
-                if distances[i * k + j] < lowest_distance:
-                    lowest_distance_centroid_index = j
-            cluster_mapping[i] = lowest_distance_centroid_index
-
-        return cluster_mapping
+        # reshape into a (amount_of_data x k) distance matrix and
+        # take the centroid with the lowest distance per row
+        distance_matrix = np.asarray(distances)[:amount_of_data * k].reshape(amount_of_data, k)
+        return np.argmin(distance_matrix, axis=1).astype(float)
 
     @classmethod
     def calculate_relative_residual(cls, old_cluster_mapping, new_cluster_mapping):
@@ -173,12 +321,8 @@ class DataProcessingService:
             label, we still accept it as converged.
         """
 
-        count_of_different_labels = 0
         amount_of_data_points = new_cluster_mapping.shape[0]
-
-        for i in range(0, old_cluster_mapping.shape[0]):
-            if old_cluster_mapping[i] != new_cluster_mapping[i]:
-                count_of_different_labels += 1
+        count_of_different_labels = np.count_nonzero(old_cluster_mapping != new_cluster_mapping)
 
         relative_residual = (count_of_different_labels / amount_of_data_points) * 100
 
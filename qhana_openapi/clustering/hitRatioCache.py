@@ -0,0 +1,57 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import numpy as np
+
+from convergenceCalculationService import ConvergenceCalculationService
+
+
+class HitRatioCache:
+    """
+    Caches the hit ratios of all the pairs of data points and centroids of a
+    clustering job between its iterations, i.e. the ratio of the shots resp.
+    the probability of the outcome the executors count as hits.
+
+    The column of a centroid is only evaluated again if the centroid angle moved
+    more than the tolerance since its column has been evaluated. The movement is
+    measured against the angle of the last evaluation, i.e. slow drifts still
+    trigger a new evaluation once they add up to the tolerance.
+    """
+
+    def __init__(self, amount_of_data, k, tolerance):
+        self.hit_ratios = np.zeros((amount_of_data, k))
+        self.centroid_angles = np.full(k, np.nan)
+        self.tolerance = tolerance
+
+    def select_centroids(self, centroid_angles):
+        """
+        Returns the indices of the centroids whose columns have to be evaluated
+        for the given new centroid angles. In the first iteration, all the
+        centroids are selected.
+        """
+
+        movements = ConvergenceCalculationService.calculate_angular_movements(self.centroid_angles,
+                                                                               centroid_angles)
+
+        # nan movements of not yet evaluated centroids are selected as well
+        return np.nonzero(~(movements <= self.tolerance))[0]
+
+    def update(self, centroid_indices, centroid_angles, hit_ratios):
+        """
+        Stores the hit ratios of the given centroids, given as np.array with
+        shape = (amount of data, amount of centroids), together with the
+        centroid angles they have been evaluated for.
+        """
+
+        self.hit_ratios[:, centroid_indices] = np.asarray(hit_ratios, dtype=float).reshape(-1, len(centroid_indices))
+        self.centroid_angles[centroid_indices] = np.asarray(centroid_angles, dtype=float)
+
+    def get_hit_ratios(self):
+        """
+        Returns the cached hit ratios of all the pairs as np.array
+        with shape = (amount of data, k).
+        """
+
+        return self.hit_ratios
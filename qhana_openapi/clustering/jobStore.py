@@ -0,0 +1,61 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class JobStore:
+    """
+    A job scoped in memory store for the intermediate results of a clustering
+    job which do not change between the k-means iterations, e.g. the
+    preprocessed data and the data angles.
+
+    The entries of a job are a dictionary, e.g.
+    {'data_url': ..., 'data': ..., 'base_vector': ..., 'data_angles': ...}.
+    Only the max_jobs most recently used jobs are kept.
+    """
+
+    max_jobs = 16
+    jobs = OrderedDict()
+    lock = threading.Lock()
+
+    @classmethod
+    def get_job(cls, job_id):
+        """
+        Returns the entries of the given job or None if the job is not stored.
+        """
+
+        with cls.lock:
+            if job_id not in cls.jobs:
+                return None
+            cls.jobs.move_to_end(job_id)
+            return cls.jobs[job_id]
+
+    @classmethod
+    def update_job(cls, job_id, **entries):
+        """
+        Stores the given entries for the job, i.e. they replace
+        the existing entries with the same name. If too many jobs
+        are stored, the least recently used job is evicted.
+        """
+
+        with cls.lock:
+            job = cls.jobs.setdefault(job_id, {})
+            job.update(entries)
+            cls.jobs.move_to_end(job_id)
+            while len(cls.jobs) > cls.max_jobs:
+                cls.jobs.popitem(last=False)
+
+            return job
+
+    @classmethod
+    def delete_job(cls, job_id):
+        """
+        Deletes all the entries of the given job if it is stored.
+        """
+
+        with cls.lock:
+            cls.jobs.pop(job_id, None)
@@ -6,6 +6,18 @@ Email: daniel-fink@outlook.com
 from qiskit import *
 
 
+class AnalyticBackend:
+    """
+    A pseudo backend for the rotational clustering algorithms.
+    It does not build or simulate any quantum circuit, the
+    outcome probabilities are calculated analytically from the
+    data and centroid angles instead.
+    """
+
+    def name(self):
+        return 'analytic'
+
+
 class QuantumBackendFactory:
     """
     A factory to create quantum backends.
@@ -19,10 +31,13 @@ class QuantumBackendFactory:
         We expect the backend_name to follow the format
         provider_instance
         i.e. ibmq_santiago, ibmq_16_melbourne, aer_qasm_simulator.
+        The names aer_exact and analytic create an AnalyticBackend.
         """
 
         backend_name = backend_name.lower()
-        if 'aer' in backend_name:
+        if backend_name == 'analytic':
+            return AnalyticBackend()
+        elif 'aer' in backend_name:
             provider = 'aer'
             instance = backend_name[4:]
         elif 'ibmq' in backend_name:
@@ -42,6 +57,8 @@ class QuantumBackendFactory:
                 return Aer.get_backend('qasm_simulator')
             elif 'vector' in instance:
                 return Aer.get_backend('statevector_simulator')
+            elif 'exact' in instance:
+                return AnalyticBackend()
             else:
                 raise Exception('Backend provider '
                                 + provider
@@ -50,3 +67,34 @@ class QuantumBackendFactory:
                                 + '.')
         else:
             raise Exception('Unknown backend provider.')
+
+    @staticmethod
+    def is_analytic_backend(backend):
+        """
+        Checks whether the given backend is an AnalyticBackend,
+        i.e. whether the circuits do not need to be executed.
+        """
+
+        return isinstance(backend, AnalyticBackend)
+
+    @staticmethod
+    def is_statevector_backend(backend):
+        """
+        Checks whether the given backend is a statevector simulator,
+        i.e. whether the exact final states of the circuits can be read
+        instead of sampling histograms.
+        """
+
+        return not QuantumBackendFactory.is_analytic_backend(backend) \
+            and backend.name() == 'statevector_simulator'
+
+    @staticmethod
+    def is_qasm_simulator_backend(backend):
+        """
+        Checks whether the given backend is the local qasm simulator,
+        i.e. whether block separable circuits can be sampled block
+        by block instead of simulating their dense statevector.
+        """
+
+        return not QuantumBackendFactory.is_analytic_backend(backend) \
+            and backend.name() == 'qasm_simulator'
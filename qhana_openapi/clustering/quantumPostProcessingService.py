@@ -16,21 +16,71 @@ class QuantumPostProcessingService:
         """
         Maps the histogram (dictionary) to a 2D np.array with the format
         qubit_i = [#hits |0>, #hits |1>].
+
+        The histogram is converted only once into an array of integer basis
+        states and an array of counts. The |1> hits of all qubits are then
+        calculated in one vectorized pass over the bits of the basis states.
         """
 
-        # create array and store the hits per qubit, i.e. [#|0>, #|1>]
-        length = int(len(list(histogram.keys())[0]))
-        qubit_hits = np.zeros((length, 2))
+        # the basis states are bitstrings with qubit 0 being the rightmost bit
+        basis_states = [basis_state.replace(' ', '') for basis_state in histogram]
+        counts = np.fromiter(histogram.values(), dtype=float, count=len(basis_states))
+        length = len(basis_states[0])
+
+        if length < 64:
+            # bit i of the integer basis state is the state of qubit i
+            keys = np.array([int(basis_state, 2) for basis_state in basis_states], dtype=np.uint64)
+            bits = (keys[:, np.newaxis] >> np.arange(length, dtype=np.uint64)) & np.uint64(1)
+        else:
+            # too wide for integers, use the characters of the bitstrings directly
+            characters = np.frombuffer(''.join(basis_states).encode('ascii'), dtype=np.uint8)
+            bits = (characters.reshape(len(basis_states), length) - ord('0'))[:, ::-1]
 
-        for basis_state in histogram:
-            for i in range(0, length):
-                if basis_state[length - i - 1] == '0':
-                    qubit_hits[i][0] = qubit_hits[i][0] + histogram[basis_state]
-                else:
-                    qubit_hits[i][1] = qubit_hits[i][1] + histogram[basis_state]
+        # create array and store the hits per qubit, i.e. [#|0>, #|1>]
+        ones = counts.dot(bits.astype(float))
+        qubit_hits = np.column_stack((np.sum(counts) - ones, ones))
 
         return qubit_hits
 
+    @classmethod
+    def calculate_qubit_probabilities(cls, statevector):
+        """
+        Calculates the exact marginal probabilities of all qubits from the
+        statevector in the format qubit_i = [P(|0>), P(|1>)], i.e. the same
+        format as map_histogram_to_qubit_hits without sampling any shots.
+        """
+
+        probabilities = np.square(np.abs(np.asarray(statevector)))
+        amount_of_qubits = int(np.log2(probabilities.shape[0]))
+
+        # qubit i is the i-th least significant bit of the basis state index,
+        # i.e. the basis states of qubit i = 0 and qubit i = 1 alternate in
+        # blocks of 2 ** i amplitudes
+        qubit_probabilities = np.empty((amount_of_qubits, 2))
+        for i in range(0, amount_of_qubits):
+            blocks = probabilities.reshape(2 ** (amount_of_qubits - 1 - i), 2, 2 ** i)
+            qubit_probabilities[i] = np.sum(blocks, axis=(0, 2))
+
+        return qubit_probabilities
+
+    @classmethod
+    def select_even_qubits(cls, qubit_hits):
+        """
+        Selects the entries of the even qubits, i.e. qubit 0, 2, 4, ...
+        If we have odd many qubits, we have 1/2 + 1 even.
+        """
+
+        return qubit_hits[0::2]
+
+    @classmethod
+    def select_odd_qubits(cls, qubit_hits):
+        """
+        Selects the entries of the odd qubits, i.e. qubit 1, 3, 5, ...
+        If we have odd many qubits, we still have 1/2 odds.
+        """
+
+        return qubit_hits[1::2]
+
     @classmethod
     def calculate_qubits_0_hits(cls, histogram):
         """
@@ -38,16 +88,7 @@ class QuantumPostProcessingService:
         |0> state. We use the format qubit_i = #hits|0>.
         """
 
-        # the length can be read out from the
-        # string of any arbitrary (e.g. the 0th) bitstring
-        length = int(len(list(histogram.keys())[0]))
-        hits = np.zeros(length)
-
-        qubit_hits_map = cls.map_histogram_to_qubit_hits(histogram)
-        for i in range(0, int(qubit_hits_map.shape[0])):
-            hits[i] = int(qubit_hits_map[i][0])
-
-        return hits
+        return cls.map_histogram_to_qubit_hits(histogram)[:, 0]
 
     @classmethod
     def calculate_qubits_1_hits(cls, histogram):
@@ -56,16 +97,7 @@ class QuantumPostProcessingService:
         |1> state. We use the format qubit_i = #hits|1>.
         """
 
-        # the length can be read out from the
-        # string of any arbitrary (e.g. the 0th) bitstring
-        length = int(len(list(histogram.keys())[0]))
-        hits = np.zeros(length)
-
-        qubit_hits_map = cls.map_histogram_to_qubit_hits(histogram)
-        for i in range(0, int(qubit_hits_map.shape[0])):
-            hits[i] = int(qubit_hits_map[i][1])
-
-        return hits
+        return cls.map_histogram_to_qubit_hits(histogram)[:, 1]
 
     @classmethod
     def calculate_odd_qubits_0_hits(cls, histogram):
@@ -74,20 +106,7 @@ class QuantumPostProcessingService:
         |0> state. We use the format odd_qubit_i = #hits|0>.
         """
 
-        qubits_0_hits = cls.calculate_qubits_0_hits(histogram)
-        length = qubits_0_hits.shape[0]
-
-        # if we have even many qubits, we have 1/2 odds
-        # if we have odd many qubits, we still have 1/2 odds
-        length /= 2
-
-        length = int(length)
-        hits = np.zeros(length)
-
-        for i in range(0, length):
-            hits[i] = int(qubits_0_hits[i * 2 + 1])
-
-        return hits
+        return cls.select_odd_qubits(cls.calculate_qubits_0_hits(histogram))
 
     @classmethod
     def calculate_odd_qubits_1_hits(cls, histogram):
@@ -96,20 +115,7 @@ class QuantumPostProcessingService:
         |1> state. We use the format [odd_qubit_i, #hits|1>].
         """
 
-        qubits_1_hits = cls.calculate_qubits_1_hits(histogram)
-        length = qubits_1_hits.shape[0]
-
-        # if we have even many qubits, we have 1/2 odds
-        # if we have odd many qubits, we still have 1/2 odds
-        length /= 2
-
-        length = int(length)
-        hits = np.zeros(length)
-
-        for i in range(0, length):
-            hits[i] = int(qubits_1_hits[i * 2 + 1])
-
-        return hits
+        return cls.select_odd_qubits(cls.calculate_qubits_1_hits(histogram))
 
     @classmethod
     def calculate_even_qubits_0_hits(cls, histogram):
@@ -118,24 +124,7 @@ class QuantumPostProcessingService:
         |0> state. We use the format even_qubit_i = #hits|0>.
         """
 
-        qubits_0_hits = cls.calculate_qubits_0_hits(histogram)
-        length = qubits_0_hits.shape[0]
-
-        # if we have even many qubits, we have 1/2 even
-        # if we have odd many qubits, we have 1/2 + 1 even
-        if length % 2 == 1:
-            length /= 2
-            length += 1
-        else:
-            length /= 2
-
-        length = int(length)
-        hits = np.zeros(length)
-
-        for i in range(0, length):
-            hits[i] = int(qubits_0_hits[i * 2])
-
-        return hits
+        return cls.select_even_qubits(cls.calculate_qubits_0_hits(histogram))
 
     @classmethod
     def calculate_even_qubits_1_hits(cls, histogram):
@@ -144,21 +133,4 @@ class QuantumPostProcessingService:
         |1> state. We use the format even_qubit_i = #hits|1>.
         """
 
-        qubits_1_hits = cls.calculate_qubits_1_hits(histogram)
-        length = qubits_1_hits.shape[0]
-
-        # if we have even many qubits, we have 1/2 even
-        # if we have odd many qubits, we have 1/2 + 1 even
-        if length % 2 == 1:
-            length /= 2
-            length += 1
-        else:
-            length /= 2
-
-        length = int(length)
-        hits = np.zeros(length)
-
-        for i in range(0, length):
-            hits[i] = int(qubits_1_hits[i * 2])
-
-        return hits
+        return cls.select_even_qubits(cls.calculate_qubits_1_hits(histogram))
@@ -0,0 +1,77 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+
+class QubitPackingPlanner:
+    """
+    A class for planning how the pairs of data points and centroids
+    are packed into the qubits of the clustering circuits.
+
+    Each pair occupies a slot of one qubit (negative rotation) or two
+    qubits (destructive interference, state preparation). A slot can be
+    measured, reset and reused for further pairs within the same circuit,
+    i.e. a circuit executes up to max_rounds rounds of pairs on its slots.
+    The pair p of a circuit is placed into slot p % slots in round p // slots
+    and its qubits are measured into the classical bits
+    [qubits_per_pair * p, ..., qubits_per_pair * (p + 1) - 1], i.e. the
+    classical bits are ordered round by round and slot by slot.
+    """
+
+    @classmethod
+    def get_qubits_per_pair(cls, algorithm):
+        """
+        Returns the amount of qubits one pair of data point and
+        centroid occupies in the given clustering algorithm.
+        """
+
+        if algorithm == 'negative-rotation':
+            return 1
+        elif algorithm == 'destructive-interference' or algorithm == 'state-preparation':
+            return 2
+        else:
+            raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+    @classmethod
+    def plan(cls, algorithm, max_qubits, global_work_amount, max_rounds=1):
+        """
+        Plans the packing of global_work_amount many pairs into as few circuits
+        as possible with at most max_qubits qubits and max_rounds rounds each.
+        The pairs are then spread evenly over the circuits, i.e. the circuits
+        are not wider or deeper than needed.
+
+        If the algorithm needs two qubits per pair and max_qubits is odd, the
+        last qubit cannot hold a pair and is reported as idle qubit.
+
+        We return a dictionary with the amount of circuits, the slots and rounds
+        per circuit, the pairs per circuit (slots * rounds), the qubits per
+        circuit and the amount of idle qubits.
+        """
+
+        qubits_per_pair = cls.get_qubits_per_pair(algorithm)
+        max_slots = int(max_qubits / qubits_per_pair)
+
+        if max_slots < 1:
+            raise Exception('Not enough qubits to compare a data point with a centroid.')
+
+        if max_rounds < 1:
+            raise Exception('At least one round per circuit is needed.')
+
+        if global_work_amount < 1:
+            raise Exception('There are no pairs of data points and centroids to compare.')
+
+        # the minimal amount of circuits for the given width and depth
+        amount_of_circuits = -(-global_work_amount // (max_slots * max_rounds))
+
+        # spread the pairs evenly, preferring slots over rounds
+        pairs_per_circuit = -(-global_work_amount // amount_of_circuits)
+        slots = min(max_slots, pairs_per_circuit)
+        rounds = -(-pairs_per_circuit // slots)
+
+        return {'circuits': amount_of_circuits,
+                'slots': slots,
+                'rounds': rounds,
+                'pairs_per_circuit': slots * rounds,
+                'qubits': slots * qubits_per_pair,
+                'idle_qubits': max_qubits - max_slots * qubits_per_pair}
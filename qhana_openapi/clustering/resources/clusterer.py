@@ -4,40 +4,109 @@ Email: daniel-fink@outlook.com
 """
 
 import os
+import time
+import uuid
 
 import connexion
 import numpy as np
 from flask import request, jsonify
 from sklearn.cluster import KMeans
 
+from classicalClusteringService import ClassicalClusteringService
 from clusteringCircuitExecutor import ClusteringCircuitExecutor
 from clusteringCircuitGenerator import ClusteringCircuitGenerator
 from convergenceCalculationService import ConvergenceCalculationService
 from dataProcessingService import DataProcessingService
 from fileService import FileService
+from jobStore import JobStore
 from numpySerializer import NumpySerializer
 from qiskitSerializer import QiskitSerializer
 from quantumBackendFactory import QuantumBackendFactory
+from qubitPackingPlanner import QubitPackingPlanner
+from rotationalClusteringService import RotationalClusteringService
 
 
 def generate_url(url_root, route, file_name):
     return url_root + '/static/' + route + '/' + file_name + '.txt'
 
 
+def load_job_data(job_id, data_url, data_file_path):
+    """
+    Returns the entries of the job from the JobStore and whether they have been cached,
+    the entry 'data' holds the data mapped to the standardized unit sphere and the
+    entries 'mean' and 'std' hold the parameters of the standardization.
+
+    The data is only downloaded and preprocessed if the job has no data yet or
+    another data_url is given. If no data_url is given, the cached data is used.
+    The other entries of the job, e.g. its fitted centroids, are only dropped
+    if the data_url differs from the one of the job.
+    """
+
+    job = JobStore.get_job(job_id)
+
+    if job is not None and 'data' in job and (not data_url or data_url == job['data_url']):
+        return job, True
+
+    if not data_url:
+        raise Exception('No data has been cached for job ' + str(job_id) + ', a data_url is required.')
+
+    # download the data and store it locally
+    FileService.delete_if_exist(data_file_path)
+    FileService.download_to_file(data_url, data_file_path)
+    data = NumpySerializer.deserialize(data_file_path)
+
+    # map data to standardized unit sphere
+    mean, std = DataProcessingService.calculate_standardization(data)
+    data = DataProcessingService.normalize(DataProcessingService.standardize(data, mean, std))
+
+    # the data angles and fitted centroids of a previous data set are invalid now
+    if job is not None and job.get('data_url') != data_url:
+        JobStore.delete_job(job_id)
+
+    return JobStore.update_job(job_id, data_url=data_url, data=data, mean=mean, std=std), False
+
+
+def load_job_data_angles(job_id, data_url, data_file_path, base_vector):
+    """
+    Returns the entries of the job from the JobStore, see load_job_data, together with
+    the angles of the data. The angles are only calculated once per data and base vector.
+    """
+
+    job, data_cached = load_job_data(job_id, data_url, data_file_path)
+
+    if data_cached and 'data_angles' in job and np.array_equal(job['base_vector'], base_vector):
+        return job, job['data_angles']
+
+    data_angles = DataProcessingService.calculate_angles(job['data'], base_vector)
+    return JobStore.update_job(job_id, base_vector=base_vector, data_angles=data_angles), data_angles
+
+
 class Clusterer:
 
     @staticmethod
-    def initialize_centroids(job_id, k):
+    def initialize_centroids(job_id, k, initialization='random', data_url='', base_vector_x=-0.7071,
+                             base_vector_y=-0.7071, sample_size=0):
         """
-        Create k random centroids in the range [0, 1] x [0, 1].
+        Create k centroids, either random in the range [-1, 1] x [-1, 1] or data aware
+        with the k-means++ or the angle quantile seeding on the data mapped to the
+        unit sphere. The data aware initializations can be run on a sample of
+        sample_size data points and use the data of the job in the JobStore.
+        The data aware seeds lie in the standardized data space already, i.e. the
+        response reports standardized_centroids, which has to be passed on to the
+        angle and centroid calculations of the job.
         """
         centroids_file_path = './static/centroid-calculation/initialization/centroids' \
                               + str(job_id) + '.txt'
+        data_file_path = './static/centroid-calculation/initialization/data' \
+                         + str(job_id) + '.txt'
+
+        base_vector = np.array([base_vector_x, base_vector_y])
 
         # response parameters
         message = 'success'
         status_code = 200
         centroids_url = ''
+        standardized_centroids = False
 
         try:
             # create working folder if not exist
@@ -47,7 +116,10 @@ class Clusterer:
             FileService.delete_if_exist(centroids_file_path)
 
             # generate k centroids
-            centroids = DataProcessingService.generate_random_data(k)
+            data = None
+            if initialization != 'random':
+                data = load_job_data(job_id, data_url, data_file_path)[0]['data']
+            centroids = DataProcessingService.initialize_centroids(initialization, k, data, base_vector, sample_size)
 
             # serialize the data
             NumpySerializer.serialize(centroids, centroids_file_path)
@@ -57,6 +129,7 @@ class Clusterer:
             centroids_url = generate_url(url_root,
                                          'centroid-calculation/initialization',
                                          'centroids' + str(job_id))
+            standardized_centroids = initialization != 'random'
 
         except Exception as ex:
             message = str(ex)
@@ -64,15 +137,22 @@ class Clusterer:
 
         return jsonify(message=message,
                        status_code=status_code,
-                       centroids_url=centroids_url)
+                       centroids_url=centroids_url,
+                       standardized_centroids=standardized_centroids)
 
     @staticmethod
-    def calculate_angles(job_id, data_url, centroids_url, base_vector_x, base_vector_y):
+    def calculate_angles(job_id, centroids_url, base_vector_x, base_vector_y, data_url='',
+                         standardized_centroids=False):
         """
         Performs the pre processing of a general rotational clustering algorithm,
         i.e. the angle calculations.
 
         We take the data and centroids and calculate the centroid and data angles.
+        The data angles only change with the data, hence they are calculated once
+        per job and kept in the JobStore, i.e. later iterations of the job only
+        need to send the centroids and the data_url can be omitted.
+        If standardized_centroids, the centroids lie in the standardized data space
+        already, e.g. the data aware seeds, and are not standardized again.
         """
         data_file_path = './static/angle-calculation/rotational-clustering/data' \
                          + str(job_id) + '.txt'
@@ -90,35 +170,41 @@ class Clusterer:
         status_code = 200
         data_angles_url = ''
         centroid_angles_url = ''
+        data_angles_cached = False
 
         try:
             # create working folder if not exist
             FileService.create_folder_if_not_exist('./static/angle-calculation/rotational-clustering/')
 
             # delete old files if exist
-            FileService.delete_if_exist(data_file_path,
-                                        centroids_file_path,
-                                        centroid_angles_file_path,
-                                        data_angles_file_path)
+            FileService.delete_if_exist(centroids_file_path,
+                                        centroid_angles_file_path)
 
-            # download the data and store it locally
-            FileService.download_to_file(data_url, data_file_path)
-            FileService.download_to_file(centroids_url, centroids_file_path)
+            # load the preprocessed data of the job
+            job, data_cached = load_job_data(job_id, data_url, data_file_path)
 
-            # deserialize the data
-            data = NumpySerializer.deserialize(data_file_path)
-            centroids = NumpySerializer.deserialize(centroids_file_path)
+            # calculate the data angles only once per data and base vector
+            data_angles_cached = data_cached and 'data_angles' in job \
+                and np.array_equal(job['base_vector'], base_vector) \
+                and os.path.exists(data_angles_file_path)
+
+            if not data_angles_cached:
+                data_angles = DataProcessingService.calculate_angles(job['data'], base_vector)
+                JobStore.update_job(job_id, base_vector=base_vector, data_angles=data_angles)
+
+                FileService.delete_if_exist(data_angles_file_path)
+                NumpySerializer.serialize(data_angles, data_angles_file_path)
 
-            # map data and centroids to standardized unit sphere
-            data = DataProcessingService.normalize(DataProcessingService.standardize(data))
-            centroids = DataProcessingService.normalize(DataProcessingService.standardize(centroids))
+            # download the centroids and store it locally
+            FileService.download_to_file(centroids_url, centroids_file_path)
+            centroids = NumpySerializer.deserialize(centroids_file_path)
 
-            # calculate the angles
-            data_angles = DataProcessingService.calculate_angles(data, base_vector)
-            centroid_angles = DataProcessingService.calculate_angles(centroids, base_vector)
+            # map centroids to standardized unit sphere and calculate their angles
+            centroid_angles = RotationalClusteringService.calculate_centroid_angles(centroids,
+                                                                                    base_vector,
+                                                                                    standardized_centroids)[1]
 
             # serialize the data
-            NumpySerializer.serialize(data_angles, data_angles_file_path)
             NumpySerializer.serialize(centroid_angles, centroid_angles_file_path)
 
             # generate urls
@@ -137,15 +223,23 @@ class Clusterer:
         return jsonify(message=message,
                        status_code=status_code,
                        data_angles_url=data_angles_url,
-                       centroid_angles_url=centroid_angles_url)
+                       centroid_angles_url=centroid_angles_url,
+                       data_angles_cached=bool(data_angles_cached))
 
     @staticmethod
-    def generate_negative_rotation_circuits(job_id, data_angles_url, centroid_angles_url, max_qubits):
+    def generate_negative_rotation_circuits(job_id, data_angles_url, centroid_angles_url, max_qubits,
+                                            parameterized=False, max_rounds=1, simplify=False):
         """
         Generates the negative rotation clustering quantum circuits.
 
         We take the data and centroid angles and return a url to a file with the
-        quantum circuits as qasm strings.
+        quantum circuits as qasm strings. If parameterized, the file contains the
+        parameter table of the circuit template instead.
+        The qubits of a circuit are reset and reused for up to max_rounds rounds,
+        the rounds of the resulting packing plan have to be passed to the execution.
+        If simplify, the circuits are simplified before their serialization and the
+        gate count and depth reduction is returned, see
+        ClusteringCircuitGenerator.simplify_circuits.
         """
         data_angles_file_path = './static/circuit-generation/negative-rotation-clustering/data_angles' \
                                 + str(job_id) + '.txt'
@@ -158,6 +252,8 @@ class Clusterer:
         message = 'success'
         status_code = 200
         circuits_url = ''
+        packing_plan = {}
+        simplification = {}
 
         try:
             # create working folder if not exist
@@ -174,13 +270,35 @@ class Clusterer:
             data_angles = NumpySerializer.deserialize(data_angles_file_path)
             centroid_angles = NumpySerializer.deserialize(centroid_angles_file_path)
 
-            # perform circuit generation
-            circuits = ClusteringCircuitGenerator.generate_negative_rotation_clustering(max_qubits,
-                                                                                        data_angles,
-                                                                                        centroid_angles)
+            # plan the packing of the pairs into the circuits
+            packing_plan = QubitPackingPlanner.plan('negative-rotation',
+                                                    max_qubits,
+                                                    data_angles.shape[0] * centroid_angles.shape[0],
+                                                    max_rounds)
+
+            if parameterized:
+                # perform parameter generation for the circuit template
+                parameter_table = ClusteringCircuitGenerator.generate_clustering_parameters('negative-rotation',
+                                                                                             max_qubits,
+                                                                                             data_angles,
+                                                                                             centroid_angles,
+                                                                                             max_rounds)
+
+                # serialize the parameter table
+                NumpySerializer.serialize(parameter_table, circuits_file_path)
+            else:
+                # perform circuit generation
+                circuits = ClusteringCircuitGenerator.generate_negative_rotation_clustering(max_qubits,
+                                                                                            data_angles,
+                                                                                            centroid_angles,
+                                                                                            max_rounds)
+
+                # remove redundant gates
+                if simplify:
+                    circuits, simplification = ClusteringCircuitGenerator.simplify_circuits(circuits)
 
-            # serialize the quantum circuits
-            QiskitSerializer.serialize(circuits, circuits_file_path)
+                # serialize the quantum circuits
+                QiskitSerializer.serialize(circuits, circuits_file_path)
 
             # generate url
             url_root = connexion.request.host_url
@@ -192,15 +310,26 @@ class Clusterer:
             message = str(ex)
             status_code = 500
 
-        return jsonify(message=message, status_code=status_code, circuits_url=circuits_url)
+        return jsonify(message=message,
+                       status_code=status_code,
+                       circuits_url=circuits_url,
+                       packing_plan=packing_plan,
+                       simplification=simplification)
 
     @staticmethod
-    def generate_destructive_interference_circuits(job_id, data_angles_url, centroid_angles_url, max_qubits):
+    def generate_destructive_interference_circuits(job_id, data_angles_url, centroid_angles_url, max_qubits,
+                                                   parameterized=False, max_rounds=1, simplify=False):
         """
         Generates the destructive interference clustering quantum circuits.
 
         We take the data and centroid angles and return a url to a file with the
-        quantum circuits as qasm strings.
+        quantum circuits as qasm strings. If parameterized, the file contains the
+        parameter table of the circuit template instead.
+        The qubits of a circuit are reset and reused for up to max_rounds rounds,
+        the rounds of the resulting packing plan have to be passed to the execution.
+        If simplify, the circuits are simplified before their serialization and the
+        gate count and depth reduction is returned, see
+        ClusteringCircuitGenerator.simplify_circuits.
         """
 
         data_angles_file_path = './static/circuit-generation/destructive-interference-clustering/data_angles' \
@@ -214,6 +343,8 @@ class Clusterer:
         message = 'success'
         status_code = 200
         circuits_url = ''
+        packing_plan = {}
+        simplification = {}
 
         try:
             # create working folder if not exist
@@ -230,13 +361,35 @@ class Clusterer:
             data_angles = NumpySerializer.deserialize(data_angles_file_path)
             centroid_angles = NumpySerializer.deserialize(centroid_angles_file_path)
 
-            # perform circuit generation
-            circuits = ClusteringCircuitGenerator.generate_destructive_interference_clustering(max_qubits,
-                                                                                               data_angles,
-                                                                                               centroid_angles)
+            # plan the packing of the pairs into the circuits
+            packing_plan = QubitPackingPlanner.plan('destructive-interference',
+                                                    max_qubits,
+                                                    data_angles.shape[0] * centroid_angles.shape[0],
+                                                    max_rounds)
+
+            if parameterized:
+                # perform parameter generation for the circuit template
+                parameter_table = ClusteringCircuitGenerator.generate_clustering_parameters('destructive-interference',
+                                                                                             max_qubits,
+                                                                                             data_angles,
+                                                                                             centroid_angles,
+                                                                                             max_rounds)
+
+                # serialize the parameter table
+                NumpySerializer.serialize(parameter_table, circuits_file_path)
+            else:
+                # perform circuit generation
+                circuits = ClusteringCircuitGenerator.generate_destructive_interference_clustering(max_qubits,
+                                                                                                   data_angles,
+                                                                                                   centroid_angles,
+                                                                                                   max_rounds)
+
+                # remove redundant gates
+                if simplify:
+                    circuits, simplification = ClusteringCircuitGenerator.simplify_circuits(circuits)
 
-            # serialize the quantum circuits
-            QiskitSerializer.serialize(circuits, circuits_file_path)
+                # serialize the quantum circuits
+                QiskitSerializer.serialize(circuits, circuits_file_path)
 
             # generate url
             url_root = connexion.request.host_url
@@ -248,16 +401,27 @@ class Clusterer:
             message = str(ex)
             status_code = 500
 
-        return jsonify(message=message, status_code=status_code, circuits_url=circuits_url)
+        return jsonify(message=message,
+                       status_code=status_code,
+                       circuits_url=circuits_url,
+                       packing_plan=packing_plan,
+                       simplification=simplification)
 
     # @app.route('/api/circuit-generation/state-preparation-clustering/<int:job_id>', methods=['POST'])
     @staticmethod
-    def generate_state_preparation_circuits(job_id, data_angles_url, centroid_angles_url, max_qubits):
+    def generate_state_preparation_circuits(job_id, data_angles_url, centroid_angles_url, max_qubits,
+                                            parameterized=False, max_rounds=1, simplify=False):
         """
         Generates the state preparation clustering quantum circuits.
 
         We take the data and centroid angles and return a url to a file with the
-        quantum circuits as qasm strings.
+        quantum circuits as qasm strings. If parameterized, the file contains the
+        parameter table of the circuit template instead.
+        The qubits of a circuit are reset and reused for up to max_rounds rounds,
+        the rounds of the resulting packing plan have to be passed to the execution.
+        If simplify, the circuits are simplified before their serialization and the
+        gate count and depth reduction is returned, see
+        ClusteringCircuitGenerator.simplify_circuits.
         """
 
         # load the data from url
@@ -273,6 +437,8 @@ class Clusterer:
         message = 'success'
         status_code = 200
         circuits_url = ''
+        packing_plan = {}
+        simplification = {}
 
         try:
             # create working folder if not exist
@@ -289,13 +455,35 @@ class Clusterer:
             data_angles = NumpySerializer.deserialize(data_angles_file_path)
             centroid_angles = NumpySerializer.deserialize(centroid_angles_file_path)
 
-            # perform circuit generation
-            circuits = ClusteringCircuitGenerator.generate_state_preparation_clustering(max_qubits,
-                                                                                        data_angles,
-                                                                                        centroid_angles)
+            # plan the packing of the pairs into the circuits
+            packing_plan = QubitPackingPlanner.plan('state-preparation',
+                                                    max_qubits,
+                                                    data_angles.shape[0] * centroid_angles.shape[0],
+                                                    max_rounds)
+
+            if parameterized:
+                # perform parameter generation for the circuit template
+                parameter_table = ClusteringCircuitGenerator.generate_clustering_parameters('state-preparation',
+                                                                                             max_qubits,
+                                                                                             data_angles,
+                                                                                             centroid_angles,
+                                                                                             max_rounds)
+
+                # serialize the parameter table
+                NumpySerializer.serialize(parameter_table, circuits_file_path)
+            else:
+                # perform circuit generation
+                circuits = ClusteringCircuitGenerator.generate_state_preparation_clustering(max_qubits,
+                                                                                            data_angles,
+                                                                                            centroid_angles,
+                                                                                            max_rounds)
+
+                # remove redundant gates
+                if simplify:
+                    circuits, simplification = ClusteringCircuitGenerator.simplify_circuits(circuits)
 
-            # serialize the quantum circuits
-            QiskitSerializer.serialize(circuits, circuits_file_path)
+                # serialize the quantum circuits
+                QiskitSerializer.serialize(circuits, circuits_file_path)
 
             # generate url
             url_root = connexion.request.host_url
@@ -307,14 +495,20 @@ class Clusterer:
             message = str(ex)
             status_code = 500
 
-        return jsonify(message=message, status_code=status_code, circuits_url=circuits_url)
+        return jsonify(message=message,
+                       status_code=status_code,
+                       circuits_url=circuits_url,
+                       packing_plan=packing_plan,
+                       simplification=simplification)
 
     # @app.route('/api/circuit-execution/negative-rotation-clustering/<int:job_id>', methods=['POST'])
     @staticmethod
-    def execute_negative_rotation_circuits(job_id, circuits_url, k, backend_name, token, shots_per_circuit):
+    def execute_negative_rotation_circuits(job_id, circuits_url, k, backend_name, token, shots_per_circuit,
+                                           max_workers=1, parameterized=False, rounds=1):
         """
         Executes the negative rotation clustering algorithm given the generated
-        quantum circuits.
+        quantum circuits or, if parameterized, the parameter table of the circuit template.
+        The rounds are the ones of the packing plan the parameter table has been generated with.
         """
 
         # load the data from url
@@ -328,6 +522,7 @@ class Clusterer:
         message = 'success'
         status_code = 200
         cluster_mapping_url = ''
+        worker_timings = []
 
         try:
             # create working folder if not exist
@@ -339,17 +534,33 @@ class Clusterer:
             # download the circuits and store it locally
             FileService.download_to_file(circuits_url, circuits_file_path)
 
-            # deserialize the circuits
-            circuits = QiskitSerializer.deserialize(circuits_file_path)
-
             # create the quantum backend
             backend = QuantumBackendFactory.create_backend(backend_name, token)
 
-            # execute the circuits
-            cluster_mapping = ClusteringCircuitExecutor.execute_negative_rotation_clustering(circuits,
-                                                                                             k,
-                                                                                             backend,
-                                                                                             shots_per_circuit)
+            if parameterized:
+                # deserialize the parameter table of the circuit template
+                parameter_table = NumpySerializer.deserialize(circuits_file_path)
+
+                # execute the circuit template
+                cluster_mapping = ClusteringCircuitExecutor.execute_clustering_template('negative-rotation',
+                                                                                        parameter_table,
+                                                                                        k,
+                                                                                        backend,
+                                                                                        shots_per_circuit,
+                                                                                        max_workers,
+                                                                                        worker_timings,
+                                                                                        rounds)
+            else:
+                # deserialize the circuits
+                circuits = QiskitSerializer.deserialize(circuits_file_path)
+
+                # execute the circuits
+                cluster_mapping = ClusteringCircuitExecutor.execute_negative_rotation_clustering(circuits,
+                                                                                                 k,
+                                                                                                 backend,
+                                                                                                 shots_per_circuit,
+                                                                                                 max_workers,
+                                                                                                 worker_timings)
 
             # serialize the data
             NumpySerializer.serialize(cluster_mapping, cluster_mapping_file_path)
@@ -364,13 +575,18 @@ class Clusterer:
             message = str(ex)
             status_code = 500
 
-        return jsonify(message=message, status_code=status_code, cluster_mapping_url=cluster_mapping_url)
+        return jsonify(message=message,
+                       status_code=status_code,
+                       cluster_mapping_url=cluster_mapping_url,
+                       worker_timings=worker_timings)
 
     @staticmethod
-    def execute_destructive_interference_circuits(job_id, circuits_url, k, backend_name, token, shots_per_circuit):
+    def execute_destructive_interference_circuits(job_id, circuits_url, k, backend_name, token, shots_per_circuit,
+                                                  max_workers=1, parameterized=False, rounds=1):
         """
         Executes the destructive interference clustering algorithm given the generated
-        quantum circuits.
+        quantum circuits or, if parameterized, the parameter table of the circuit template.
+        The rounds are the ones of the packing plan the parameter table has been generated with.
         """
 
         # load the data from url
@@ -384,6 +600,7 @@ class Clusterer:
         message = 'success'
         status_code = 200
         cluster_mapping_url = ''
+        worker_timings = []
 
         try:
             # create working folder if not exist
@@ -395,18 +612,34 @@ class Clusterer:
             # download the circuits and store it locally
             FileService.download_to_file(circuits_url, circuits_file_path)
 
-            # deserialize the circuits
-            circuits = QiskitSerializer.deserialize(circuits_file_path)
-
             # create the quantum backend
             backend = QuantumBackendFactory.create_backend(backend_name, token)
 
-            # execute the circuits
-            cluster_mapping = ClusteringCircuitExecutor \
-                .execute_destructive_interference_clustering(circuits,
-                                                             k,
-                                                             backend,
-                                                             shots_per_circuit)
+            if parameterized:
+                # deserialize the parameter table of the circuit template
+                parameter_table = NumpySerializer.deserialize(circuits_file_path)
+
+                # execute the circuit template
+                cluster_mapping = ClusteringCircuitExecutor.execute_clustering_template('destructive-interference',
+                                                                                        parameter_table,
+                                                                                        k,
+                                                                                        backend,
+                                                                                        shots_per_circuit,
+                                                                                        max_workers,
+                                                                                        worker_timings,
+                                                                                        rounds)
+            else:
+                # deserialize the circuits
+                circuits = QiskitSerializer.deserialize(circuits_file_path)
+
+                # execute the circuits
+                cluster_mapping = ClusteringCircuitExecutor \
+                    .execute_destructive_interference_clustering(circuits,
+                                                                 k,
+                                                                 backend,
+                                                                 shots_per_circuit,
+                                                                 max_workers,
+                                                                 worker_timings)
 
             # serialize the data
             NumpySerializer.serialize(cluster_mapping, cluster_mapping_file_path)
@@ -421,13 +654,18 @@ class Clusterer:
             message = str(ex)
             status_code = 500
 
-        return jsonify(message=message, status_code=status_code, cluster_mapping_url=cluster_mapping_url)
+        return jsonify(message=message,
+                       status_code=status_code,
+                       cluster_mapping_url=cluster_mapping_url,
+                       worker_timings=worker_timings)
 
     @staticmethod
-    def execute_state_preparation_circuits(job_id, circuits_url, k, backend_name, token, shots_per_circuit):
+    def execute_state_preparation_circuits(job_id, circuits_url, k, backend_name, token, shots_per_circuit,
+                                           max_workers=1, parameterized=False, rounds=1):
         """
         Executes the state preparation clustering algorithm given the generated
-        quantum circuits.
+        quantum circuits or, if parameterized, the parameter table of the circuit template.
+        The rounds are the ones of the packing plan the parameter table has been generated with.
         """
 
         # load the data from url
@@ -441,6 +679,7 @@ class Clusterer:
         message = 'success'
         status_code = 200
         cluster_mapping_url = ''
+        worker_timings = []
 
         try:
             # create working folder if not exist
@@ -452,18 +691,34 @@ class Clusterer:
             # download the circuits and store it locally
             FileService.download_to_file(circuits_url, circuits_file_path)
 
-            # deserialize the circuits
-            circuits = QiskitSerializer.deserialize(circuits_file_path)
-
             # create the quantum backend
             backend = QuantumBackendFactory.create_backend(backend_name, token)
 
-            # execute the circuits
-            cluster_mapping = ClusteringCircuitExecutor \
-                .execute_state_preparation_clustering(circuits,
-                                                      k,
-                                                      backend,
-                                                      shots_per_circuit)
+            if parameterized:
+                # deserialize the parameter table of the circuit template
+                parameter_table = NumpySerializer.deserialize(circuits_file_path)
+
+                # execute the circuit template
+                cluster_mapping = ClusteringCircuitExecutor.execute_clustering_template('state-preparation',
+                                                                                        parameter_table,
+                                                                                        k,
+                                                                                        backend,
+                                                                                        shots_per_circuit,
+                                                                                        max_workers,
+                                                                                        worker_timings,
+                                                                                        rounds)
+            else:
+                # deserialize the circuits
+                circuits = QiskitSerializer.deserialize(circuits_file_path)
+
+                # execute the circuits
+                cluster_mapping = ClusteringCircuitExecutor \
+                    .execute_state_preparation_clustering(circuits,
+                                                          k,
+                                                          backend,
+                                                          shots_per_circuit,
+                                                          max_workers,
+                                                          worker_timings)
 
             # serialize the data
             NumpySerializer.serialize(cluster_mapping, cluster_mapping_file_path)
@@ -478,7 +733,10 @@ class Clusterer:
             message = str(ex)
             status_code = 500
 
-        return jsonify(message=message, status_code=status_code, cluster_mapping_url=cluster_mapping_url)
+        return jsonify(message=message,
+                       status_code=status_code,
+                       cluster_mapping_url=cluster_mapping_url,
+                       worker_timings=worker_timings)
 
     @staticmethod
     def perform_sklearn_clustering(job_id, data_url, centroids_url):
@@ -533,13 +791,105 @@ class Clusterer:
         return jsonify(message=message, status_code=status_code, cluster_mapping_url=cluster_mapping_url)
 
     @staticmethod
-    def calculate_centroids(job_id, data_url, cluster_mapping_url, old_centroids_url):
+    def perform_classical_clustering(job_id, data_url, k, max_iterations=300, eps=0.0001, centroids_url='',
+                                     mini_batch_threshold=0, batch_size=1024):
+        """
+        Executes a whole classical k-means clustering until convergence within one call,
+        starting from the given centroids or from k-means++ initialized ones.
+        Above mini_batch_threshold many data points, a MiniBatchKMeans is used.
+        """
+        data_file_path = './static/classical-clustering/kmeans-clustering/data' \
+                         + str(job_id) + '.txt'
+        initial_centroids_file_path = './static/classical-clustering/kmeans-clustering/initial_centroids' \
+                                      + str(job_id) + '.txt'
+        cluster_mapping_file_path = './static/classical-clustering/kmeans-clustering/cluster_mapping' \
+                                    + str(job_id) + '.txt'
+        centroids_file_path = './static/classical-clustering/kmeans-clustering/centroids' \
+                              + str(job_id) + '.txt'
+
+        # response parameters
+        message = 'success'
+        status_code = 200
+        cluster_mapping_url = ''
+        centroids_url_result = ''
+        iterations = 0
+        algorithm = ''
+        timings = {}
+
+        try:
+            start = time.perf_counter()
+
+            # create working folder if not exist
+            FileService.create_folder_if_not_exist('./static/classical-clustering/kmeans-clustering/')
+
+            # delete old files if exist
+            FileService.delete_if_exist(data_file_path,
+                                        initial_centroids_file_path,
+                                        cluster_mapping_file_path,
+                                        centroids_file_path)
+
+            # download the data and store it locally
+            FileService.download_to_file(data_url, data_file_path)
+            data = NumpySerializer.deserialize(data_file_path)
+
+            # use the given centroids or k-means++
+            centroids = None
+            if centroids_url:
+                FileService.download_to_file(centroids_url, initial_centroids_file_path)
+                centroids = NumpySerializer.deserialize(initial_centroids_file_path)
+                k = centroids.shape[0]
+
+            timings['load'] = time.perf_counter() - start
+
+            # execute the clustering until convergence
+            cluster_mapping, centroids, iterations, algorithm, timings['fit'] = \
+                ClassicalClusteringService.perform_clustering(data,
+                                                              k,
+                                                              centroids,
+                                                              max_iterations,
+                                                              eps,
+                                                              mini_batch_threshold,
+                                                              batch_size)
+
+            # serialize the results
+            NumpySerializer.serialize(cluster_mapping, cluster_mapping_file_path)
+            NumpySerializer.serialize(centroids, centroids_file_path)
+
+            # generate urls
+            url_root = connexion.request.host_url
+            cluster_mapping_url = generate_url(url_root,
+                                               'classical-clustering/kmeans-clustering',
+                                               'cluster_mapping' + str(job_id))
+            centroids_url_result = generate_url(url_root,
+                                                'classical-clustering/kmeans-clustering',
+                                                'centroids' + str(job_id))
+
+            timings['total'] = time.perf_counter() - start
+
+        except Exception as ex:
+            message = str(ex)
+            status_code = 500
+
+        return jsonify(message=message,
+                       status_code=status_code,
+                       cluster_mapping_url=cluster_mapping_url,
+                       centroids_url=centroids_url_result,
+                       iterations=iterations,
+                       algorithm=algorithm,
+                       timings=timings)
+
+    @staticmethod
+    def calculate_centroids(job_id, cluster_mapping_url, old_centroids_url, data_url='',
+                            standardized_centroids=False):
         """
         Performs the post processing of a general rotational clustering algorithm,
         i.e. the centroid calculations.
 
         We take the cluster mapping, data and old centroids and calculate the
-        new centroids.
+        new centroids. The preprocessed data is cached in the JobStore, i.e.
+        the data_url can be omitted once the job has data.
+        If standardized_centroids, the old centroids lie in the standardized
+        data space already and are not standardized again.
         """
 
         # load the data from url
@@ -563,22 +913,24 @@ class Clusterer:
             FileService.create_folder_if_not_exist('./static/centroid-calculation/rotational-clustering/')
 
             # delete old files if exist
-            FileService.delete_if_exist(data_file_path, cluster_mapping_file_path, old_centroids_file_path,
-                                        centroids_file_path)
+            FileService.delete_if_exist(cluster_mapping_file_path, old_centroids_file_path, centroids_file_path)
+
+            # load the preprocessed data of the job
+            job, data_cached = load_job_data(job_id, data_url, data_file_path)
+            data = job['data']
 
             # download the data and store it locally
-            FileService.download_to_file(data_url, data_file_path)
             FileService.download_to_file(cluster_mapping_url, cluster_mapping_file_path)
             FileService.download_to_file(old_centroids_url, old_centroids_file_path)
 
             # deserialize the data
-            data = NumpySerializer.deserialize(data_file_path)
             cluster_mapping = NumpySerializer.deserialize(cluster_mapping_file_path)
             old_centroids = NumpySerializer.deserialize(old_centroids_file_path)
 
-            # map data and centroids to standardized unit sphere
-            data = DataProcessingService.normalize(DataProcessingService.standardize(data))
-            old_centroids = DataProcessingService.normalize(DataProcessingService.standardize(old_centroids))
+            # map centroids to standardized unit sphere
+            if not standardized_centroids:
+                old_centroids = DataProcessingService.standardize(old_centroids)
+            old_centroids = DataProcessingService.normalize(old_centroids)
 
             # calculate new centroids
             centroids = DataProcessingService.calculate_centroids(cluster_mapping, old_centroids, data)
@@ -646,6 +998,493 @@ class Clusterer:
 
         return jsonify(message=message, status_code=status_code, convergence=convergence, distance=distance)
 
+    @staticmethod
+    def perform_rotational_clustering(job_id, data_url, algorithm, k, backend_name, token, shots_per_circuit,
+                                      max_qubits, eps, max_iterations, base_vector_x, base_vector_y,
+                                      centroids_url='', max_workers=1, max_rounds=1, batch_size=0, shot_budget=0,
+                                      prune=False, initialization='random', sample_size=0, batch_window=0,
+                                      reuse_tolerance=0, coreset_size=0, coreset_method='angle-bins'):
+        """
+        Performs a whole rotational clustering, i.e. all the iterations of angle calculation,
+        circuit generation, circuit execution, centroid calculation and convergence check
+        within one call.
+
+        The intermediate results are kept in memory, only the final cluster mapping,
+        the final centroids and the trace of the iterations are stored.
+        If no centroids are given, k centroids are initialized with the given
+        initialization, see DataProcessingService.initialize_centroids. The data
+        aware seeds are not standardized again in the iterations, see
+        RotationalClusteringService.perform_clustering.
+        Local simulations are distributed over max_workers many processes.
+        The qubits of a circuit are reset and reused for up to max_rounds rounds.
+        If a batch_size is given, every iteration only assigns a random mini batch
+        of the data and all the data is assigned once to the final centroids.
+        If a shot_budget is given, every assignment executes shots_per_circuit shots
+        first and re-executes only the undecided pairs until the budget is used up.
+        If prune, only the data points whose assignment could change according to
+        their angular bounds are compared with the centroids in each iteration.
+        If a batch_window is given, the circuits are shared with the concurrent
+        clustering jobs joining within batch_window seconds.
+        If a reuse_tolerance is given, the hit ratios of the centroids whose angle
+        moved less than reuse_tolerance are reused from the previous iteration.
+        If a coreset_size is given, the iterations run on at most coreset_size weighted
+        representatives of the data built with the coreset_method ('angle-bins' or
+        'sensitivity') and their assignments are expanded to all the data points.
+        """
+
+        data_file_path = './static/iterative-clustering/rotational-clustering/data' \
+                         + str(job_id) + '.txt'
+        initial_centroids_file_path = './static/iterative-clustering/rotational-clustering/initial_centroids' \
+                                      + str(job_id) + '.txt'
+        cluster_mapping_file_path = './static/iterative-clustering/rotational-clustering/cluster_mapping' \
+                                    + str(job_id) + '.txt'
+        centroids_file_path = './static/iterative-clustering/rotational-clustering/centroids' \
+                              + str(job_id) + '.txt'
+        trace_file_path = './static/iterative-clustering/rotational-clustering/trace' \
+                          + str(job_id) + '.txt'
+
+        base_vector = np.array([base_vector_x, base_vector_y])
+
+        # response parameters
+        message = 'success'
+        status_code = 200
+        cluster_mapping_url = ''
+        centroids_url_result = ''
+        trace_url = ''
+        iterations = 0
+        convergence = False
+        worker_timings = []
+        packing_plan = {}
+        shot_rounds = []
+        circuit_batches = []
+
+        try:
+            if algorithm not in RotationalClusteringService.algorithms:
+                raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+            # create working folder if not exist
+            FileService.create_folder_if_not_exist('./static/iterative-clustering/rotational-clustering/')
+
+            # delete old files if exist
+            FileService.delete_if_exist(data_file_path,
+                                        initial_centroids_file_path,
+                                        cluster_mapping_file_path,
+                                        centroids_file_path,
+                                        trace_file_path)
+
+            # download the data and store it locally
+            FileService.download_to_file(data_url, data_file_path)
+            data = NumpySerializer.deserialize(data_file_path)
+
+            # use the given centroids or initialize k centroids
+            if centroids_url:
+                FileService.download_to_file(centroids_url, initial_centroids_file_path)
+                centroids = NumpySerializer.deserialize(initial_centroids_file_path)
+            elif initialization == 'random':
+                centroids = DataProcessingService.generate_random_data(k)
+            else:
+                # the seeds are chosen in the standardized data space and kept there
+                unit_data = DataProcessingService.normalize(DataProcessingService.standardize(data))
+                centroids = DataProcessingService.initialize_centroids(initialization,
+                                                                       k,
+                                                                       unit_data,
+                                                                       base_vector,
+                                                                       sample_size)
+
+            standardized_centroids = not centroids_url and initialization != 'random'
+
+            # create the quantum backend
+            backend = QuantumBackendFactory.create_backend(backend_name, token)
+
+            # the packing of the pairs into the circuits of each iteration
+            amount_of_data = data.shape[0]
+            if 0 < coreset_size < amount_of_data:
+                amount_of_data = coreset_size
+            if 0 < batch_size < amount_of_data:
+                amount_of_data = batch_size
+            packing_plan = QubitPackingPlanner.plan(algorithm, max_qubits, amount_of_data * k, max_rounds)
+
+            # perform all the iterations
+            cluster_mapping, centroids, trace = RotationalClusteringService.perform_clustering(algorithm,
+                                                                                             data,
+                                                                                             centroids,
+                                                                                             backend,
+                                                                                             max_qubits,
+                                                                                             shots_per_circuit,
+                                                                                             eps,
+                                                                                             max_iterations,
+                                                                                             base_vector,
+                                                                                             max_workers,
+                                                                                             worker_timings,
+                                                                                             max_rounds,
+                                                                                             batch_size,
+                                                                                             shot_budget,
+                                                                                             shot_rounds,
+                                                                                             prune,
+                                                                                             batch_window,
+                                                                                             circuit_batches,
+                                                                                             reuse_tolerance,
+                                                                                             coreset_size=coreset_size,
+                                                                                             coreset_method=coreset_method,
+                                                                                             standardized_centroids=standardized_centroids)
+            iterations = trace.shape[0]
+            convergence = bool(trace[-1][1] < eps)
+
+            # keep the fitted job for the assignment of new points
+            job = JobStore.get_job(job_id)
+            if job is not None and job.get('data_url') != data_url:
+                JobStore.delete_job(job_id)
+            mean, std = DataProcessingService.calculate_standardization(data)
+            JobStore.update_job(job_id,
+                                data_url=data_url,
+                                mean=mean,
+                                std=std,
+                                fitted_base_vector=base_vector,
+                                fitted_algorithm=algorithm,
+                                fitted_centroids=centroids,
+                                fitted_standardized_centroids=standardized_centroids)
+
+            # serialize the results
+            NumpySerializer.serialize(cluster_mapping, cluster_mapping_file_path)
+            NumpySerializer.serialize(centroids, centroids_file_path)
+            NumpySerializer.serialize(trace, trace_file_path)
+
+            # generate urls
+            url_root = connexion.request.host_url
+            cluster_mapping_url = generate_url(url_root,
+                                               'iterative-clustering/rotational-clustering',
+                                               'cluster_mapping' + str(job_id))
+            centroids_url_result = generate_url(url_root,
+                                                'iterative-clustering/rotational-clustering',
+                                                'centroids' + str(job_id))
+            trace_url = generate_url(url_root,
+                                     'iterative-clustering/rotational-clustering',
+                                     'trace' + str(job_id))
+
+        except Exception as ex:
+            message = str(ex)
+            status_code = 500
+
+        return jsonify(message=message,
+                       status_code=status_code,
+                       cluster_mapping_url=cluster_mapping_url,
+                       centroids_url=centroids_url_result,
+                       trace_url=trace_url,
+                       iterations=iterations,
+                       convergence=convergence,
+                       worker_timings=worker_timings,
+                       packing_plan=packing_plan,
+                       shot_rounds=shot_rounds,
+                       circuit_batches=circuit_batches,
+                       transpiled_circuit_cache=ClusteringCircuitExecutor.transpiled_circuit_cache.get_statistics())
+
+    @staticmethod
+    def perform_rotational_clustering_sweep(job_id, algorithm, k_min, k_max, backend_name, token,
+                                            shots_per_circuit, max_qubits, eps, max_iterations, base_vector_x,
+                                            base_vector_y, data_url='', k_step=1, max_parallel=1, max_workers=1,
+                                            max_rounds=1, initialization='random', sample_size=0,
+                                            silhouette_sample_size=2000):
+        """
+        Performs one whole rotational clustering per k in range(k_min, k_max + 1, k_step)
+        on the same data, e.g. to select k with the elbow method or the silhouette.
+
+        The data is downloaded, preprocessed and mapped to angles only once and shared
+        by all the clusterings, which run in max_parallel many threads. The preprocessed
+        data and the angles are cached in the JobStore like in the angle calculation.
+        Per k, we return the inertia, the silhouette (on a sample of at most
+        silhouette_sample_size data points, 0 uses all of them), the relative residual
+        of the last iteration, the amount of iterations and the urls of the cluster
+        mapping and the centroids. The silhouette needs at least 2 clusters, i.e. a
+        sweep starting at k_min < 2 is rejected.
+        """
+
+        data_file_path = './static/iterative-clustering/rotational-clustering-sweep/data' \
+                         + str(job_id) + '.txt'
+
+        base_vector = np.array([base_vector_x, base_vector_y])
+
+        # response parameters
+        message = 'success'
+        status_code = 200
+        sweep = []
+
+        if k_min < 2 or k_max < k_min or k_step < 1:
+            return jsonify(message='The range of k has to start at k_min >= 2 and must not be empty.',
+                           status_code=400,
+                           sweep=sweep)
+
+        try:
+            if algorithm not in RotationalClusteringService.algorithms:
+                raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+            k_values = list(range(k_min, k_max + 1, k_step))
+
+            # create working folder if not exist
+            FileService.create_folder_if_not_exist('./static/iterative-clustering/rotational-clustering-sweep/')
+
+            # load the preprocessed data and the data angles of the job
+            job, data_angles = load_job_data_angles(job_id, data_url, data_file_path, base_vector)
+
+            # create the quantum backend
+            backend = QuantumBackendFactory.create_backend(backend_name, token)
+
+            # perform all the clusterings
+            results = RotationalClusteringService.perform_sweep(algorithm,
+                                                                job['data'],
+                                                                data_angles,
+                                                                k_values,
+                                                                backend,
+                                                                max_qubits,
+                                                                shots_per_circuit,
+                                                                eps,
+                                                                max_iterations,
+                                                                base_vector,
+                                                                max_parallel,
+                                                                max_workers,
+                                                                max_rounds,
+                                                                initialization,
+                                                                sample_size,
+                                                                silhouette_sample_size)
+
+            # serialize the results and generate urls
+            url_root = connexion.request.host_url
+            for result in results:
+                file_suffix = str(job_id) + '_k' + str(result['k'])
+                cluster_mapping_file_path = './static/iterative-clustering/rotational-clustering-sweep/' \
+                                            'cluster_mapping' + file_suffix + '.txt'
+                centroids_file_path = './static/iterative-clustering/rotational-clustering-sweep/' \
+                                      'centroids' + file_suffix + '.txt'
+
+                FileService.delete_if_exist(cluster_mapping_file_path, centroids_file_path)
+                NumpySerializer.serialize(result.pop('cluster_mapping'), cluster_mapping_file_path)
+                NumpySerializer.serialize(result.pop('centroids'), centroids_file_path)
+
+                result['cluster_mapping_url'] = generate_url(url_root,
+                                                             'iterative-clustering/rotational-clustering-sweep',
+                                                             'cluster_mapping' + file_suffix)
+                result['centroids_url'] = generate_url(url_root,
+                                                       'iterative-clustering/rotational-clustering-sweep',
+                                                       'centroids' + file_suffix)
+                sweep.append(result)
+
+        except Exception as ex:
+            message = str(ex)
+            status_code = 500
+
+        return jsonify(message=message,
+                       status_code=status_code,
+                       sweep=sweep)
+
+    @staticmethod
+    def perform_rotational_clustering_restarts(job_id, algorithm, k, restarts, backend_name, token,
+                                               shots_per_circuit, max_qubits, eps, max_iterations, base_vector_x,
+                                               base_vector_y, data_url='', max_parallel=1, max_workers=1,
+                                               max_rounds=1, initialization='random', sample_size=0,
+                                               early_stop_margin=0, min_iterations=3):
+        """
+        Performs restarts many whole rotational clusterings with independently initialized
+        centroids on the same data and returns the one with the lowest inertia.
+
+        Like in the sweep, the data is preprocessed and mapped to angles only once and the
+        restarts run in max_parallel many threads sharing the data. If an early_stop_margin
+        is given, restarts whose inertia is more than early_stop_margin worse than the lowest
+        inertia of the other restarts at the same iteration are stopped after min_iterations
+        iterations.
+        The silhouette is only calculated for the returned restart.
+        """
+
+        data_file_path = './static/iterative-clustering/rotational-clustering-restarts/data' \
+                         + str(job_id) + '.txt'
+        cluster_mapping_file_path = './static/iterative-clustering/rotational-clustering-restarts/cluster_mapping' \
+                                    + str(job_id) + '.txt'
+        centroids_file_path = './static/iterative-clustering/rotational-clustering-restarts/centroids' \
+                              + str(job_id) + '.txt'
+
+        base_vector = np.array([base_vector_x, base_vector_y])
+
+        # response parameters
+        message = 'success'
+        status_code = 200
+        cluster_mapping_url = ''
+        centroids_url = ''
+        best_restart = -1
+        inertia = 0.0
+        silhouette = None
+        summaries = []
+
+        try:
+            if algorithm not in RotationalClusteringService.algorithms:
+                raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+            if restarts < 1:
+                raise Exception('At least one restart is needed.')
+
+            # create working folder if not exist
+            FileService.create_folder_if_not_exist('./static/iterative-clustering/rotational-clustering-restarts/')
+
+            # delete old files if exist
+            FileService.delete_if_exist(cluster_mapping_file_path, centroids_file_path)
+
+            # load the preprocessed data and the data angles of the job
+            job, data_angles = load_job_data_angles(job_id, data_url, data_file_path, base_vector)
+
+            # create the quantum backend
+            backend = QuantumBackendFactory.create_backend(backend_name, token)
+
+            # perform all the restarts
+            best_restart, result, summaries = RotationalClusteringService.perform_restarts(algorithm,
+                                                                                          job['data'],
+                                                                                          data_angles,
+                                                                                          k,
+                                                                                          restarts,
+                                                                                          backend,
+                                                                                          max_qubits,
+                                                                                          shots_per_circuit,
+                                                                                          eps,
+                                                                                          max_iterations,
+                                                                                          base_vector,
+                                                                                          max_parallel,
+                                                                                          max_workers,
+                                                                                          max_rounds,
+                                                                                          initialization,
+                                                                                          sample_size,
+                                                                                          early_stop_margin,
+                                                                                          min_iterations)
+            inertia = result['inertia']
+            silhouette = result['silhouette']
+
+            # serialize the best result
+            NumpySerializer.serialize(result['cluster_mapping'], cluster_mapping_file_path)
+            NumpySerializer.serialize(result['centroids'], centroids_file_path)
+
+            # generate urls
+            url_root = connexion.request.host_url
+            cluster_mapping_url = generate_url(url_root,
+                                               'iterative-clustering/rotational-clustering-restarts',
+                                               'cluster_mapping' + str(job_id))
+            centroids_url = generate_url(url_root,
+                                         'iterative-clustering/rotational-clustering-restarts',
+                                         'centroids' + str(job_id))
+
+        except Exception as ex:
+            message = str(ex)
+            status_code = 500
+
+        return jsonify(message=message,
+                       status_code=status_code,
+                       cluster_mapping_url=cluster_mapping_url,
+                       centroids_url=centroids_url,
+                       best_restart=best_restart,
+                       inertia=inertia,
+                       silhouette=silhouette,
+                       restarts=summaries)
+
+    @staticmethod
+    def assign_points(job_id, points_url, path='analytic', algorithm='', centroids_url='', data_url='',
+                      backend_name='aer_qasm_simulator', token='', shots_per_circuit=8192, max_qubits=5,
+                      max_workers=1, batch_window=0, base_vector_x=-0.7071, base_vector_y=-0.7071):
+        """
+        Assigns new points to the fitted centroids of a job, either with the 'analytic',
+        the 'classical-angle' or the 'quantum' path, see
+        RotationalClusteringService.assign_points.
+
+        The centroids, the algorithm and the base vector of a rotational clustering of
+        the job are used unless centroids_url, algorithm resp. data_url are given. The
+        points are standardized like the data of the job, i.e. a data_url is needed if
+        the job has not been fitted or its data has not been cached. If a batch_window
+        is given, the circuits of the quantum path are shared with concurrent calls.
+        """
+        assignment_id = str(job_id) + '_' + uuid.uuid4().hex
+        points_file_path = './static/assignment/points' + assignment_id + '.txt'
+        centroids_file_path = './static/assignment/centroids' + assignment_id + '.txt'
+        data_file_path = './static/assignment/data' + str(job_id) + '.txt'
+        cluster_mapping_file_path = './static/assignment/cluster_mapping' + assignment_id + '.txt'
+
+        # response parameters
+        message = 'success'
+        status_code = 200
+        cluster_mapping_url = ''
+        cluster_mapping = []
+        circuit_batches = []
+
+        try:
+            if path not in RotationalClusteringService.assignment_paths:
+                raise Exception('Unknown assignment path ' + str(path) + '.')
+
+            # create working folder if not exist
+            FileService.create_folder_if_not_exist('./static/assignment/')
+
+            # the standardization of the fitted data
+            job = JobStore.get_job(job_id)
+            if data_url or job is None or 'mean' not in job:
+                job = load_job_data(job_id, data_url, data_file_path)[0]
+
+            # use the given centroids or the fitted ones
+            standardized_centroids = False
+            if centroids_url:
+                FileService.download_to_file(centroids_url, centroids_file_path)
+                centroids = NumpySerializer.deserialize(centroids_file_path)
+                FileService.delete_if_exist(centroids_file_path)
+            elif 'fitted_centroids' in job:
+                centroids = job['fitted_centroids']
+                standardized_centroids = job.get('fitted_standardized_centroids', False)
+            else:
+                raise Exception('Job ' + str(job_id) + ' has no fitted centroids, a centroids_url is required.')
+
+            if 'fitted_base_vector' in job and not centroids_url:
+                base_vector = job['fitted_base_vector']
+            else:
+                base_vector = np.array([base_vector_x, base_vector_y])
+
+            if not algorithm:
+                algorithm = job.get('fitted_algorithm', 'negative-rotation')
+            if algorithm not in RotationalClusteringService.algorithms:
+                raise Exception('Unknown clustering algorithm ' + str(algorithm) + '.')
+
+            # download the new points
+            FileService.download_to_file(points_url, points_file_path)
+            points = NumpySerializer.deserialize(points_file_path)
+            FileService.delete_if_exist(points_file_path)
+
+            backend = None
+            if path == 'quantum':
+                backend = QuantumBackendFactory.create_backend(backend_name, token)
+
+            mapping = RotationalClusteringService.assign_points(path,
+                                                               algorithm,
+                                                               points,
+                                                               centroids,
+                                                               job['mean'],
+                                                               job['std'],
+                                                               base_vector,
+                                                               backend,
+                                                               max_qubits,
+                                                               shots_per_circuit,
+                                                               max_workers,
+                                                               batch_window,
+                                                               circuit_batches,
+                                                               standardized_centroids)
+            cluster_mapping = mapping.astype(int).tolist()
+
+            # serialize the cluster mapping
+            NumpySerializer.serialize(mapping, cluster_mapping_file_path)
+
+            # generate url
+            url_root = connexion.request.host_url
+            cluster_mapping_url = generate_url(url_root,
+                                               'assignment',
+                                               'cluster_mapping' + assignment_id)
+
+        except Exception as ex:
+            message = str(ex)
+            status_code = 500
+
+        return jsonify(message=message,
+                       status_code=status_code,
+                       cluster_mapping_url=cluster_mapping_url,
+                       cluster_mapping=cluster_mapping,
+                       circuit_batches=circuit_batches)
+
     @staticmethod
     def get_negative_rotation_circuits(job_id):
         """
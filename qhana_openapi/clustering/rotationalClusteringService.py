@@ -0,0 +1,624 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from angularBoundTracker import AngularBoundTracker
+from clusteringCircuitBatcher import ClusteringCircuitBatcher
+from clusteringCircuitExecutor import ClusteringCircuitExecutor
+from clusteringCircuitGenerator import ClusteringCircuitGenerator
+from clusteringEvaluationService import ClusteringEvaluationService
+from convergenceCalculationService import ConvergenceCalculationService
+from dataProcessingService import DataProcessingService
+from hitRatioCache import HitRatioCache
+from quantumBackendFactory import QuantumBackendFactory
+from qubitPackingPlanner import QubitPackingPlanner
+
+
+class RotationalClusteringService:
+    """
+    A service class for running a whole rotational clustering,
+    i.e. all the k-means iterations, within one process.
+
+    All the intermediate results (data angles, centroids, cluster mappings)
+    are kept as np.arrays in memory between the iterations instead of
+    being written to files and downloaded again by the next stage.
+    The circuits are executed as parameterized templates which are
+    bound in bulk with the angles of each iteration.
+    """
+
+    algorithms = ['negative-rotation', 'destructive-interference', 'state-preparation']
+    assignment_paths = ['analytic', 'classical-angle', 'quantum']
+
+    @classmethod
+    def calculate_centroid_angles(cls, centroids, base_vector, standardized=False):
+        """
+        Maps the centroids to the standardized unit sphere and calculates
+        their angles, exactly like the angle calculation stage does.
+        If standardized, the centroids lie in the standardized data space
+        already, e.g. seeds chosen from the data, and are only normalized.
+        Returns the mapped centroids and their angles.
+        """
+
+        if standardized:
+            unit_centroids = DataProcessingService.normalize(centroids)
+        else:
+            unit_centroids = DataProcessingService.normalize(DataProcessingService.standardize(centroids))
+        centroid_angles = DataProcessingService.calculate_angles(unit_centroids, base_vector)
+
+        return unit_centroids, centroid_angles
+
+    @classmethod
+    def calculate_cluster_mapping(cls, algorithm, data_angles, centroid_angles, backend, max_qubits,
+                                  shots_per_circuit, max_workers=1, worker_timings=None, max_rounds=1,
+                                  shot_budget=0, shot_rounds=None, batch_window=0, circuit_batches=None):
+        """
+        Assigns the data points of the given angles to the centroids of the given
+        angles, either from the exact outcome probabilities if the backend is
+        analytic or by executing the bound circuit templates on the backend.
+        If a shot_budget is given, the shots are allocated adaptively, see
+        ClusteringCircuitExecutor.execute_adaptive_clustering.
+        On a statevector simulator, the exact probabilities are read from the final
+        states, i.e. there are no shots to allocate and every circuit executes one round.
+        If batch_window > 0, the pairs share their circuits with the pairs of the
+        concurrent jobs joining within batch_window seconds, see ClusteringCircuitBatcher.
+        """
+
+        if QuantumBackendFactory.is_analytic_backend(backend):
+            return ClusteringCircuitExecutor.execute_analytic_clustering(algorithm, data_angles, centroid_angles)
+
+        if QuantumBackendFactory.is_statevector_backend(backend):
+            max_rounds = 1
+        elif shot_budget > 0:
+            return ClusteringCircuitExecutor.execute_adaptive_clustering(algorithm,
+                                                                         data_angles,
+                                                                         centroid_angles,
+                                                                         backend,
+                                                                         max_qubits,
+                                                                         shots_per_circuit,
+                                                                         shot_budget,
+                                                                         max_workers,
+                                                                         worker_timings,
+                                                                         max_rounds,
+                                                                         shot_rounds)
+        elif batch_window > 0:
+            pair_data_angles = np.repeat(data_angles, centroid_angles.shape[0])
+            pair_centroid_angles = np.tile(centroid_angles, data_angles.shape[0])
+            hits = ClusteringCircuitBatcher.execute_pair_hits(algorithm,
+                                                              pair_data_angles,
+                                                              pair_centroid_angles,
+                                                              backend,
+                                                              max_qubits,
+                                                              shots_per_circuit,
+                                                              batch_window,
+                                                              max_workers,
+                                                              worker_timings,
+                                                              max_rounds,
+                                                              circuit_batches)
+            distances = ClusteringCircuitExecutor.calculate_distances(algorithm, hits)
+            return DataProcessingService.calculate_cluster_mapping(data_angles.shape[0],
+                                                                   centroid_angles.shape[0],
+                                                                   distances)
+
+        k = centroid_angles.shape[0]
+        plan = QubitPackingPlanner.plan(algorithm, max_qubits, data_angles.shape[0] * k, max_rounds)
+        parameter_table = ClusteringCircuitGenerator.generate_clustering_parameters(algorithm,
+                                                                                     max_qubits,
+                                                                                     data_angles,
+                                                                                     centroid_angles,
+                                                                                     max_rounds)
+
+        return ClusteringCircuitExecutor.execute_clustering_template(algorithm,
+                                                                     parameter_table,
+                                                                     k,
+                                                                     backend,
+                                                                     shots_per_circuit,
+                                                                     max_workers,
+                                                                     worker_timings,
+                                                                     plan['rounds'])
+
+    @classmethod
+    def assign_points(cls, path, algorithm, points, centroids, mean, std, base_vector, backend=None, max_qubits=5,
+                      shots_per_circuit=8192, max_workers=1, batch_window=0, circuit_batches=None,
+                      standardized_centroids=False):
+        """
+        Assigns new points to fitted centroids without running any iteration. The points
+        are mapped to the unit sphere with the standardization (mean, std) of the fitted
+        data, the centroids are mapped like in the iterations of perform_clustering,
+        i.e. standardized_centroids has to be the one of the fitted clustering.
+
+        The path 'analytic' assigns the points from the exact outcome probabilities of
+        the algorithm, 'classical-angle' assigns them to the centroid with the closest
+        angle and 'quantum' executes the circuits on the backend, see
+        calculate_cluster_mapping. If batch_window > 0, the circuits are shared with
+        the concurrent assignments and clusterings, see ClusteringCircuitBatcher.
+        """
+
+        unit_points = DataProcessingService.normalize(DataProcessingService.standardize(np.atleast_2d(points),
+                                                                                        mean,
+                                                                                        std))
+        point_angles = DataProcessingService.calculate_angles(unit_points, base_vector)
+        unit_centroids, centroid_angles = cls.calculate_centroid_angles(np.atleast_2d(centroids), base_vector,
+                                                                        standardized_centroids)
+
+        if path == 'analytic':
+            return ClusteringCircuitExecutor.execute_analytic_clustering(algorithm, point_angles, centroid_angles)
+        elif path == 'classical-angle':
+            angular_distances = np.abs(point_angles[:, np.newaxis] - centroid_angles[np.newaxis, :])
+            return np.argmin(angular_distances, axis=1).astype(float)
+        elif path == 'quantum':
+            return cls.calculate_cluster_mapping(algorithm,
+                                                 point_angles,
+                                                 centroid_angles,
+                                                 backend,
+                                                 max_qubits,
+                                                 shots_per_circuit,
+                                                 max_workers,
+                                                 batch_window=batch_window,
+                                                 circuit_batches=circuit_batches)
+        else:
+            raise Exception('Unknown assignment path ' + str(path) + '.')
+
+    @classmethod
+    def calculate_hit_ratios(cls, algorithm, data_angles, centroid_angles, backend, max_qubits, shots_per_circuit,
+                             max_workers=1, worker_timings=None, max_rounds=1, batch_window=0, circuit_batches=None):
+        """
+        Calculates the hit ratios of all the pairs of the given data points and
+        centroids, i.e. the exact probabilities of the hit outcomes on the analytic
+        backend and on a statevector simulator and the hits per shot otherwise.
+        We return an np.array with shape = (amount of data, k).
+        """
+
+        if QuantumBackendFactory.is_analytic_backend(backend):
+            return ClusteringCircuitExecutor.calculate_analytic_hit_probabilities(algorithm,
+                                                                                 data_angles,
+                                                                                 centroid_angles)
+
+        pair_data_angles = np.repeat(data_angles, centroid_angles.shape[0])
+        pair_centroid_angles = np.tile(centroid_angles, data_angles.shape[0])
+
+        if QuantumBackendFactory.is_statevector_backend(backend):
+            parameter_table = ClusteringCircuitGenerator.generate_pair_parameters(algorithm,
+                                                                                   max_qubits,
+                                                                                   pair_data_angles,
+                                                                                   pair_centroid_angles)
+            hit_ratios = ClusteringCircuitExecutor.execute_clustering_template_probabilities(algorithm,
+                                                                                            parameter_table,
+                                                                                            backend,
+                                                                                            max_workers,
+                                                                                            worker_timings)
+        elif batch_window > 0:
+            hits = ClusteringCircuitBatcher.execute_pair_hits(algorithm,
+                                                              pair_data_angles,
+                                                              pair_centroid_angles,
+                                                              backend,
+                                                              max_qubits,
+                                                              shots_per_circuit,
+                                                              batch_window,
+                                                              max_workers,
+                                                              worker_timings,
+                                                              max_rounds,
+                                                              circuit_batches)
+            hit_ratios = hits / shots_per_circuit
+        else:
+            plan = QubitPackingPlanner.plan(algorithm, max_qubits, pair_data_angles.shape[0], max_rounds)
+            parameter_table = ClusteringCircuitGenerator.generate_pair_parameters(algorithm,
+                                                                                   max_qubits,
+                                                                                   pair_data_angles,
+                                                                                   pair_centroid_angles,
+                                                                                   max_rounds)
+            hits = ClusteringCircuitExecutor.execute_clustering_template_hits(algorithm,
+                                                                              parameter_table,
+                                                                              backend,
+                                                                              shots_per_circuit,
+                                                                              max_workers,
+                                                                              worker_timings,
+                                                                              plan['rounds'])
+            hit_ratios = hits / shots_per_circuit
+
+        return np.asarray(hit_ratios).reshape(data_angles.shape[0], centroid_angles.shape[0])
+
+    @classmethod
+    def perform_clustering(cls, algorithm, data, centroids, backend, max_qubits, shots_per_circuit,
+                           eps, max_iterations, base_vector, max_workers=1, worker_timings=None, max_rounds=1,
+                           batch_size=0, shot_budget=0, shot_rounds=None, prune=False, batch_window=0,
+                           circuit_batches=None, reuse_tolerance=0, data_angles=None, stop_condition=None,
+                           weights=None, coreset_size=0, coreset_method='angle-bins', standardized_centroids=False):
+        """
+        Performs the rotational clustering until the averaged centroid movement
+        is less than eps or max_iterations many iterations have been executed.
+        The circuits are simulated by max_workers many processes if the backend
+        is a local simulator, their timings are appended to worker_timings.
+        The qubits of a circuit are reset and reused for up to max_rounds rounds
+        of pairs, see QubitPackingPlanner.
+
+        If 0 < batch_size < amount of data, every iteration only assigns a random
+        mini batch of batch_size data points and moves the centroids incrementally
+        with the per centroid counts, see
+        DataProcessingService.calculate_centroids_incrementally.
+        All the data points are assigned once to the final centroids afterwards.
+
+        If shot_budget > 0, every assignment allocates up to shot_budget shots
+        adaptively and appends its rounds of shots to shot_rounds.
+
+        If prune, only the data points whose assignment could change according to
+        the bounds of an AngularBoundTracker are compared with the centroids, i.e.
+        the amount of circuits shrinks while the clustering converges. Pruning can
+        neither be combined with mini batches nor with adaptive shots.
+
+        If batch_window > 0, the assignments share their circuits with concurrent
+        jobs and append the batches to circuit_batches, see ClusteringCircuitBatcher.
+
+        If reuse_tolerance > 0, the hit ratios of a centroid are kept between the
+        iterations and only evaluated again if its angle moved more than
+        reuse_tolerance, see HitRatioCache. The reuse can neither be combined with
+        mini batches nor with adaptive shots nor with pruning.
+
+        If data_angles are given, the data is expected to be mapped to the
+        standardized unit sphere already, i.e. the preprocessing is skipped and
+        can be shared by several clusterings of the same data.
+
+        If a stop_condition is given, it is called with the cluster mapping and the
+        new centroids after every iteration and the iterations stop as soon as it
+        returns True, e.g. to stop restarts early, see perform_restarts.
+
+        If weights are given, every data point counts as weights[i] many points in
+        the centroid calculation. If 0 < coreset_size < amount of data, the iterations
+        run on a weighted coreset of at most coreset_size points instead of the data,
+        see DataProcessingService.calculate_coreset, and the final cluster mapping of
+        the coreset is expanded to all the data points. Weights can neither be combined
+        with mini batches nor with a coreset.
+
+        By default, the centroids are standardized by their own mean and variance in
+        every iteration, like the angle calculation stage does. If standardized_centroids,
+        the initial centroids lie in the standardized data space already, e.g. seeds of
+        DataProcessingService.initialize_centroids chosen from the data mapped to the
+        unit sphere, and all the centroids are only normalized, i.e. the seeds are kept.
+
+        We return the final cluster mapping, the final centroids and a trace
+        np.array with one row per iteration in the format
+        [iteration, centroid distance, relative residual, duration in seconds,
+        amount of assigned data points, amount of evaluated centroids].
+        The relative residual of a mini batch iteration only covers the batch.
+        """
+
+        k = centroids.shape[0]
+
+        # the data angles do not change between the iterations
+        if data_angles is None:
+            data = DataProcessingService.normalize(DataProcessingService.standardize(data))
+            data_angles = DataProcessingService.calculate_angles(data, base_vector)
+
+        if 0 < coreset_size < data.shape[0]:
+            if weights is not None:
+                raise Exception('Weighted data can not be reduced to a coreset.')
+
+            # cluster the weighted coreset and expand its cluster mapping to all the data points
+            coreset, coreset_weights, membership = DataProcessingService.calculate_coreset(coreset_method,
+                                                                                          data,
+                                                                                          coreset_size)
+            coreset_angles = DataProcessingService.calculate_angles(coreset, base_vector)
+            cluster_mapping, centroids, trace = cls.perform_clustering(algorithm,
+                                                                       coreset,
+                                                                       centroids,
+                                                                       backend,
+                                                                       max_qubits,
+                                                                       shots_per_circuit,
+                                                                       eps,
+                                                                       max_iterations,
+                                                                       base_vector,
+                                                                       max_workers,
+                                                                       worker_timings,
+                                                                       max_rounds,
+                                                                       batch_size,
+                                                                       shot_budget,
+                                                                       shot_rounds,
+                                                                       prune,
+                                                                       batch_window,
+                                                                       circuit_batches,
+                                                                       reuse_tolerance,
+                                                                       coreset_angles,
+                                                                       stop_condition,
+                                                                       coreset_weights,
+                                                                       standardized_centroids=standardized_centroids)
+            return cluster_mapping[membership], centroids, trace
+
+        mini_batch = 0 < batch_size < data.shape[0]
+        counts = np.zeros(k)
+
+        if weights is not None and mini_batch:
+            raise Exception('Weighted data can not be clustered in mini batches.')
+
+        if prune and (mini_batch or shot_budget > 0):
+            raise Exception('Pruning can not be combined with mini batches or adaptive shots.')
+
+        # the bounds are only kept if pruning, i.e. the other iterations do not allocate them
+        bound_tracker = AngularBoundTracker(data.shape[0], k) if prune else None
+
+        reuse = reuse_tolerance > 0
+        if reuse and (mini_batch or shot_budget > 0 or prune):
+            raise Exception('Reusing hit ratios can not be combined with mini batches, adaptive shots or pruning.')
+        hit_ratio_cache = HitRatioCache(data.shape[0], k, reuse_tolerance) if reuse else None
+
+        cluster_mapping = np.full(data.shape[0], -1.0)
+        trace = []
+
+        for iteration in range(1, max_iterations + 1):
+            start = time.perf_counter()
+
+            unit_centroids, centroid_angles = cls.calculate_centroid_angles(centroids, base_vector,
+                                                                            standardized_centroids)
+            evaluated_centroids = k
+
+            if mini_batch:
+                batch = np.random.choice(data.shape[0], batch_size, replace=False)
+            elif prune:
+                batch = bound_tracker.select_points(centroid_angles)
+            else:
+                batch = np.arange(data.shape[0])
+
+            if prune:
+                if batch.shape[0] > 0:
+                    distances = ClusteringCircuitExecutor.execute_angular_distances(algorithm,
+                                                                                    data_angles[batch],
+                                                                                    centroid_angles,
+                                                                                    backend,
+                                                                                    max_qubits,
+                                                                                    shots_per_circuit,
+                                                                                    max_workers,
+                                                                                    worker_timings,
+                                                                                    max_rounds)
+                    bound_tracker.update(batch, distances)
+                new_cluster_mapping = bound_tracker.get_cluster_mapping()[batch]
+            elif reuse:
+                # only the columns of the moved centroids are evaluated again
+                moved = hit_ratio_cache.select_centroids(centroid_angles)
+                evaluated_centroids = moved.shape[0]
+                if evaluated_centroids > 0:
+                    hit_ratios = cls.calculate_hit_ratios(algorithm,
+                                                          data_angles,
+                                                          centroid_angles[moved],
+                                                          backend,
+                                                          max_qubits,
+                                                          shots_per_circuit,
+                                                          max_workers,
+                                                          worker_timings,
+                                                          max_rounds,
+                                                          batch_window,
+                                                          circuit_batches)
+                    hit_ratio_cache.update(moved, centroid_angles[moved], hit_ratios)
+                distances = ClusteringCircuitExecutor.calculate_probability_distances(algorithm,
+                                                                                      hit_ratio_cache.get_hit_ratios())
+                new_cluster_mapping = DataProcessingService.calculate_cluster_mapping(data.shape[0],
+                                                                                      k,
+                                                                                      distances.flatten())
+            else:
+                new_cluster_mapping = cls.calculate_cluster_mapping(algorithm,
+                                                                    data_angles[batch],
+                                                                    centroid_angles,
+                                                                    backend,
+                                                                    max_qubits,
+                                                                    shots_per_circuit,
+                                                                    max_workers,
+                                                                    worker_timings,
+                                                                    max_rounds,
+                                                                    shot_budget,
+                                                                    shot_rounds,
+                                                                    batch_window,
+                                                                    circuit_batches)
+
+            old_cluster_mapping = cluster_mapping.copy()
+            cluster_mapping[batch] = new_cluster_mapping
+
+            if mini_batch:
+                new_centroids, counts = DataProcessingService.calculate_centroids_incrementally(new_cluster_mapping,
+                                                                                                unit_centroids,
+                                                                                                data[batch],
+                                                                                                counts)
+                relative_residual = DataProcessingService.calculate_relative_residual(old_cluster_mapping[batch],
+                                                                                      new_cluster_mapping)
+            else:
+                new_centroids = DataProcessingService.calculate_centroids(cluster_mapping, unit_centroids, data,
+                                                                          weights)
+                relative_residual = DataProcessingService.calculate_relative_residual(old_cluster_mapping,
+                                                                                      cluster_mapping)
+
+            distance = ConvergenceCalculationService.calculate_averaged_euclidean_distance(centroids,
+                                                                                           new_centroids)
+            centroids = new_centroids
+
+            trace.append([iteration, distance, relative_residual, time.perf_counter() - start, batch.shape[0],
+                          evaluated_centroids])
+
+            if distance < eps:
+                break
+
+            if stop_condition is not None and stop_condition(cluster_mapping, centroids):
+                break
+
+        if mini_batch:
+            # the final assignment pass over all the data points
+            unit_centroids, centroid_angles = cls.calculate_centroid_angles(centroids, base_vector,
+                                                                            standardized_centroids)
+            cluster_mapping = cls.calculate_cluster_mapping(algorithm,
+                                                            data_angles,
+                                                            centroid_angles,
+                                                            backend,
+                                                            max_qubits,
+                                                            shots_per_circuit,
+                                                            max_workers,
+                                                            worker_timings,
+                                                            max_rounds,
+                                                            shot_budget,
+                                                            shot_rounds,
+                                                            batch_window,
+                                                            circuit_batches)
+
+        return cluster_mapping, centroids, np.array(trace)
+
+    @classmethod
+    def perform_evaluated_clustering(cls, algorithm, data, data_angles, k, backend, max_qubits, shots_per_circuit,
+                                     eps, max_iterations, base_vector, max_workers=1, max_rounds=1,
+                                     initialization='random', sample_size=0, silhouette_sample_size=2000,
+                                     stop_condition=None, silhouette=True):
+        """
+        Performs one clustering of a sweep or of the restarts, see perform_sweep and
+        perform_restarts, with freshly initialized centroids and evaluates it.
+        We return a dictionary with k, the inertia, the silhouette (None if not
+        silhouette, as it is O(N^2) without sampling), the relative residual of the
+        last iteration, the amount of iterations, whether the clustering converged,
+        the duration in seconds, the cluster mapping and the centroids.
+        """
+
+        start = time.perf_counter()
+
+        if initialization == 'random':
+            centroids = DataProcessingService.generate_random_data(k)
+        else:
+            centroids = DataProcessingService.initialize_centroids(initialization, k, data, base_vector, sample_size)
+
+        cluster_mapping, centroids, trace = cls.perform_clustering(algorithm,
+                                                                   data,
+                                                                   centroids,
+                                                                   backend,
+                                                                   max_qubits,
+                                                                   shots_per_circuit,
+                                                                   eps,
+                                                                   max_iterations,
+                                                                   base_vector,
+                                                                   max_workers,
+                                                                   max_rounds=max_rounds,
+                                                                   data_angles=data_angles,
+                                                                   stop_condition=stop_condition,
+                                                                   standardized_centroids=initialization != 'random')
+
+        return {'k': k,
+                'inertia': ClusteringEvaluationService.calculate_inertia(cluster_mapping, centroids, data),
+                'silhouette': ClusteringEvaluationService.calculate_silhouette(cluster_mapping,
+                                                                               data,
+                                                                               silhouette_sample_size)
+                if silhouette else None,
+                'relative_residual': float(trace[-1][2]),
+                'iterations': int(trace.shape[0]),
+                'convergence': bool(trace[-1][1] < eps),
+                'seconds': time.perf_counter() - start,
+                'cluster_mapping': cluster_mapping,
+                'centroids': centroids}
+
+    @classmethod
+    def perform_sweep(cls, algorithm, data, data_angles, k_values, backend, max_qubits, shots_per_circuit,
+                      eps, max_iterations, base_vector, max_parallel=1, max_workers=1, max_rounds=1,
+                      initialization='random', sample_size=0, silhouette_sample_size=2000):
+        """
+        Performs one rotational clustering per k of k_values on the same data, e.g. to
+        select k with the elbow method or the silhouette. The data has to be mapped to
+        the standardized unit sphere already and its angles are shared by all the
+        clusterings, i.e. the preprocessing is done once per sweep.
+
+        The clusterings run in max_parallel many threads which share the data, their
+        circuits are simulated by max_workers many processes each.
+        We return one result per k in the order of k_values, see perform_evaluated_clustering.
+        """
+
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as executor:
+            futures = [executor.submit(cls.perform_evaluated_clustering,
+                                       algorithm,
+                                       data,
+                                       data_angles,
+                                       k,
+                                       backend,
+                                       max_qubits,
+                                       shots_per_circuit,
+                                       eps,
+                                       max_iterations,
+                                       base_vector,
+                                       max_workers,
+                                       max_rounds,
+                                       initialization,
+                                       sample_size,
+                                       silhouette_sample_size) for k in k_values]
+
+            return [future.result() for future in futures]
+
+    @classmethod
+    def perform_restarts(cls, algorithm, data, data_angles, k, restarts, backend, max_qubits, shots_per_circuit,
+                         eps, max_iterations, base_vector, max_parallel=1, max_workers=1, max_rounds=1,
+                         initialization='random', sample_size=0, early_stop_margin=0, min_iterations=3,
+                         silhouette_sample_size=2000):
+        """
+        Performs restarts many rotational clusterings with independently initialized
+        centroids on the same data and selects the one with the lowest inertia. Like
+        in perform_sweep, the data has to be mapped to the standardized unit sphere
+        already and the clusterings run in max_parallel many threads sharing the data.
+
+        If early_stop_margin > 0, a restart is stopped after min_iterations iterations
+        as soon as its inertia exceeds the lowest inertia the other restarts had at the
+        same iteration by more than early_stop_margin (e.g. 0.1 = 10%), i.e. when it is
+        clearly worse, i.e. the restarts running in parallel stop each other. A finished
+        restart keeps its final inertia for the later iterations. The inertia is not
+        monotonic, as the centroids are standardized again in every iteration, hence
+        the restarts are only compared at the same iteration.
+
+        The restarts are selected by their inertia only, i.e. the silhouette is only
+        calculated for the best restart, on at most silhouette_sample_size data points.
+        We return the index of the best restart, its result (see
+        perform_evaluated_clustering) and a list with a summary of every restart.
+        """
+
+        # the inertias of the restarts per iteration and the final inertias of the finished restarts
+        iteration_inertias = {}
+        final_inertias = []
+        lock = threading.Lock()
+
+        def perform_restart(restart):
+            iterations = [0]
+
+            def stop_condition(cluster_mapping, centroids):
+                iterations[0] += 1
+                if early_stop_margin <= 0 or iterations[0] < min_iterations:
+                    return False
+                inertia = ClusteringEvaluationService.calculate_inertia(cluster_mapping, centroids, data)
+                with lock:
+                    inertias = iteration_inertias.setdefault(iterations[0], [])
+                    other_inertias = inertias + [final_inertia for final_iteration, final_inertia in final_inertias
+                                                 if final_iteration < iterations[0]]
+                    inertias.append(inertia)
+                    return len(other_inertias) > 0 and inertia > min(other_inertias) * (1 + early_stop_margin)
+
+            result = cls.perform_evaluated_clustering(algorithm, data, data_angles, k, backend, max_qubits,
+                                                      shots_per_circuit, eps, max_iterations, base_vector,
+                                                      max_workers, max_rounds, initialization, sample_size,
+                                                      stop_condition=stop_condition, silhouette=False)
+            result['restart'] = restart
+            result['stopped'] = not result['convergence'] and result['iterations'] < max_iterations
+
+            if not result['stopped']:
+                with lock:
+                    final_inertias.append((result['iterations'], result['inertia']))
+
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, max_parallel)) as executor:
+            results = list(executor.map(perform_restart, range(0, restarts)))
+
+        # stopped restarts are only chosen if all the restarts have been stopped
+        candidates = [result for result in results if not result['stopped']] or results
+        best_result = min(candidates, key=lambda result: result['inertia'])
+        best_result['silhouette'] = ClusteringEvaluationService.calculate_silhouette(best_result['cluster_mapping'],
+                                                                                     data,
+                                                                                     silhouette_sample_size)
+
+        summaries = [{'restart': result['restart'],
+                      'inertia': result['inertia'],
+                      'iterations': result['iterations'],
+                      'convergence': result['convergence'],
+                      'stopped': result['stopped'],
+                      'seconds': result['seconds']} for result in results]
+
+        return best_result['restart'], best_result, summaries
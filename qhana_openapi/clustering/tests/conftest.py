@@ -0,0 +1,10 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import os
+import sys
+
+# the services import each other as top level modules, i.e. like app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
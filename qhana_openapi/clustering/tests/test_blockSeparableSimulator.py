@@ -0,0 +1,88 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import numpy as np
+import pytest
+from qiskit import ClassicalRegister, QuantumCircuit, QuantumRegister
+
+from blockSeparableSimulator import BlockSeparableSimulator
+from clusteringCircuitExecutor import ClusteringCircuitExecutor
+from clusteringCircuitGenerator import ClusteringCircuitGenerator
+from quantumBackendFactory import QuantumBackendFactory
+from qubitPackingPlanner import QubitPackingPlanner
+
+
+@pytest.fixture
+def backend():
+    return QuantumBackendFactory.create_backend('aer_qasm_simulator')
+
+
+@pytest.mark.parametrize('algorithm', ['negative-rotation', 'destructive-interference', 'state-preparation'])
+@pytest.mark.parametrize('max_qubits, max_rounds', [(6, 1), (6, 3), (40, 2)])
+def test_template_hits_match_the_analytic_probabilities(backend, algorithm, max_qubits, max_rounds):
+    rng = np.random.RandomState(3)
+    data_angles = rng.uniform(0, np.pi, 50)
+    centroid_angles = rng.uniform(0, np.pi, 50)
+    shots = 20000
+
+    plan = QubitPackingPlanner.plan(algorithm, max_qubits, data_angles.shape[0], max_rounds)
+    parameter_table = ClusteringCircuitGenerator.generate_pair_parameters(algorithm, max_qubits, data_angles,
+                                                                          centroid_angles, max_rounds)
+
+    np.random.seed(5)
+    hits = ClusteringCircuitExecutor.execute_clustering_template_hits(algorithm, parameter_table, backend, shots,
+                                                                      rounds=plan['rounds'])
+
+    probabilities = np.diag(ClusteringCircuitExecutor.calculate_analytic_hit_probabilities(algorithm, data_angles,
+                                                                                            centroid_angles))
+    # 5 standard deviations of a hit ratio with the largest variance
+    assert hits.shape == (50,)
+    assert np.max(np.abs(hits / shots - probabilities)) < 5 * np.sqrt(0.25 / shots)
+
+
+def test_entangled_blocks_are_not_separable():
+    qc = QuantumCircuit(3, 3)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.cx(1, 2)
+    qc.measure(range(3), range(3))
+
+    assert BlockSeparableSimulator.decompose(qc) is None
+    assert BlockSeparableSimulator.execute_circuits([qc], 100) is None
+
+
+def test_gates_after_a_measurement_are_not_separable():
+    qc = QuantumCircuit(1, 1)
+    qc.h(0)
+    qc.measure(0, 0)
+    qc.h(0)
+
+    assert BlockSeparableSimulator.decompose(qc) is None
+
+
+def test_reset_qubits_start_a_new_block():
+    qc = QuantumCircuit(2, 4)
+    qc.x(0)
+    qc.cx(0, 1)
+    qc.measure(1, 0)
+    qc.reset(1)
+    qc.measure(1, 1)
+    qc.measure(0, 2)
+
+    blocks = BlockSeparableSimulator.decompose(qc)
+
+    assert [block['qubits'] for block in blocks] == [2, 1]
+    assert BlockSeparableSimulator.execute_circuits([qc], 100) == [{'0101': 100}]
+
+
+def test_histogram_has_the_register_format_of_aer():
+    qc = QuantumCircuit(QuantumRegister(3), ClassicalRegister(1), ClassicalRegister(2))
+    qc.x(0)
+    qc.x(2)
+    qc.measure(range(3), range(3))
+
+    histograms = BlockSeparableSimulator.execute_circuits([qc], 100)
+
+    assert histograms == [{'10 1': 100}]
@@ -0,0 +1,94 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from clusteringCircuitExecutor import ClusteringCircuitExecutor
+from dataProcessingService import DataProcessingService
+from jobStore import JobStore
+from numpySerializer import NumpySerializer
+from resources.clusterer import Clusterer
+
+
+@pytest.fixture(autouse=True)
+def request_context(tmp_path, monkeypatch):
+    # the resources write their files relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(JobStore, 'jobs', OrderedDict())
+    with Flask(__name__).test_request_context('/'):
+        yield
+
+
+@pytest.fixture
+def data_url(tmp_path):
+    rng = np.random.RandomState(2)
+    data = np.concatenate([rng.normal(center, 0.3, (30, 2)) for center in [(-3, 2), (3, 3), (0, -3)]])
+    return serialize(tmp_path, 'data.txt', data)
+
+
+def serialize(tmp_path, file_name, array):
+    NumpySerializer.serialize(array, str(tmp_path / file_name))
+    return (tmp_path / file_name).as_uri()
+
+
+def test_staged_iterations_keep_the_data_aware_seeds_standardized(tmp_path, data_url):
+    initialization = Clusterer.initialize_centroids(1, 2, 'angle-quantiles', data_url, -0.7071, 0.7071).get_json()
+    assert initialization['standardized_centroids']
+
+    seeds = NumpySerializer.deserialize('static/centroid-calculation/initialization/centroids1.txt')
+    seed_angles = DataProcessingService.calculate_angles(DataProcessingService.normalize(seeds), [-0.7071, 0.7071])
+
+    centroids = seeds
+    for iteration in range(10):
+        # the client keeps the centroids of the previous iteration
+        centroids_url = serialize(tmp_path, 'centroids.txt', centroids)
+
+        angles = Clusterer.calculate_angles(1, centroids_url, -0.7071, 0.7071, standardized_centroids=True)
+        assert angles.get_json()['status_code'] == 200
+        data_angles = NumpySerializer.deserialize('static/angle-calculation/rotational-clustering/data_angles1.txt')
+        centroid_angles = NumpySerializer.deserialize('static/angle-calculation/rotational-clustering'
+                                                      '/centroid_angles1.txt')
+        if iteration == 0:
+            assert np.allclose(centroid_angles, seed_angles)
+
+        # the circuit stages on the analytic backend
+        cluster_mapping = ClusteringCircuitExecutor.execute_analytic_clustering('negative-rotation', data_angles,
+                                                                                centroid_angles)
+        cluster_mapping_url = serialize(tmp_path, 'cluster_mapping.txt', cluster_mapping)
+
+        new_centroids = Clusterer.calculate_centroids(1, cluster_mapping_url, centroids_url,
+                                                      standardized_centroids=True)
+        assert new_centroids.get_json()['status_code'] == 200
+        centroids = NumpySerializer.deserialize('static/centroid-calculation/rotational-clustering/centroids1.txt')
+
+    # the in process clustering does not standardize its seeds again either
+    fitted = Clusterer.perform_rotational_clustering(2, data_url, 'negative-rotation', 2, 'analytic', '', 100, 5,
+                                                     0, 10, -0.7071, 0.7071,
+                                                     initialization='angle-quantiles').get_json()
+    fitted_centroids = NumpySerializer.deserialize('static/iterative-clustering/rotational-clustering'
+                                                   '/centroids2.txt')
+
+    assert fitted['iterations'] == 10
+    assert np.allclose(centroids, fitted_centroids)
+
+
+def test_assign_points_with_the_data_url_of_the_fitted_job(tmp_path, data_url):
+    points_url = serialize(tmp_path, 'points.txt', np.array([[-3, 2], [3, 3], [0, -3]]))
+
+    fit = Clusterer.perform_rotational_clustering(1, data_url, 'negative-rotation', 3, 'analytic', '', 100, 5,
+                                                  1e-4, 20, -0.7071, 0.7071,
+                                                  initialization='angle-quantiles').get_json()
+    assert fit['status_code'] == 200
+
+    assignment = Clusterer.assign_points(1, points_url, data_url=data_url).get_json()
+    fitted_assignment = Clusterer.assign_points(1, points_url).get_json()
+
+    assert assignment['status_code'] == 200, assignment['message']
+    assert assignment['cluster_mapping'] == fitted_assignment['cluster_mapping']
+    assert 'fitted_centroids' in JobStore.get_job(1)
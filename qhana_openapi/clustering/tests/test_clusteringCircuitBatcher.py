@@ -0,0 +1,112 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from clusteringCircuitBatcher import ClusteringCircuitBatcher
+from clusteringCircuitExecutor import ClusteringCircuitExecutor
+
+
+class NamedBackend:
+
+    def __init__(self, name):
+        self.backend_name = name
+
+    def name(self):
+        return self.backend_name
+
+
+class Credentials:
+
+    def __init__(self, token, hub='ibm-q', group='open', project='main'):
+        self.token = token
+        self.hub = hub
+        self.group = group
+        self.project = project
+
+
+class Provider:
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+
+
+class RemoteBackend(NamedBackend):
+    """
+    A backend of an IBMQ provider, which is enabled with the given credentials.
+    """
+
+    def __init__(self, name, credentials):
+        super().__init__(name)
+        self.account_provider = Provider(credentials)
+
+    def provider(self):
+        return self.account_provider
+
+
+@pytest.fixture(autouse=True)
+def pair_hits(monkeypatch):
+    # every pair hits as often as its index within the batch, i.e. the routing can be checked
+    def execute_clustering_template_hits(algorithm, parameter_table, backend, shots_per_circuit,
+                                         max_workers=1, worker_timings=None, rounds=1):
+        pairs = np.count_nonzero(~np.isnan(parameter_table[:, 0::2]))
+        return np.arange(pairs, dtype=float)
+
+    monkeypatch.setattr(ClusteringCircuitExecutor, 'execute_clustering_template_hits',
+                        execute_clustering_template_hits)
+
+
+def execute_concurrently(backends, pairs=3):
+    results = [None] * len(backends)
+
+    def execute(i):
+        circuit_batches = []
+        hits = ClusteringCircuitBatcher.execute_pair_hits('negative-rotation', np.zeros(pairs), np.zeros(pairs),
+                                                          backends[i], 5, 100, 0.3,
+                                                          circuit_batches=circuit_batches)
+        results[i] = (hits, circuit_batches[0])
+
+    threads = [threading.Thread(target=execute, args=(i,)) for i in range(len(backends))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results
+
+
+def test_jobs_on_a_local_simulator_share_a_batch():
+    results = execute_concurrently([NamedBackend('qasm_simulator')] * 3)
+
+    assert all(batch == {'jobs': 3, 'pairs': 9, 'circuits': 2} for hits, batch in results)
+    # every job gets its own slice of the hits back
+    assert sorted(np.concatenate([hits for hits, batch in results]).tolist()) == list(range(9))
+
+
+def test_jobs_of_the_same_account_share_a_batch_on_a_remote_backend():
+    results = execute_concurrently([RemoteBackend('ibmq_santiago', Credentials('token'))] * 3)
+
+    assert all(batch == {'jobs': 3, 'pairs': 9, 'circuits': 2} for hits, batch in results)
+
+
+@pytest.mark.parametrize('credentials', [
+    [Credentials('token a'), Credentials('token b'), Credentials('token c')],
+    [Credentials('token', project='a'), Credentials('token', project='b'), Credentials('token', project='c')]
+])
+def test_jobs_of_different_accounts_are_never_batched(credentials):
+    results = execute_concurrently([RemoteBackend('ibmq_santiago', account) for account in credentials])
+
+    assert all(batch == {'jobs': 1, 'pairs': 3, 'circuits': 1} for hits, batch in results)
+    assert all(hits.tolist() == [0, 1, 2] for hits, batch in results)
+
+
+def test_jobs_of_unknown_accounts_are_not_batched():
+    results = execute_concurrently([NamedBackend('ibmq_santiago')] * 3)
+
+    assert all(batch == {'jobs': 1, 'pairs': 3, 'circuits': 1} for hits, batch in results)
+    assert all(hits.tolist() == [0, 1, 2] for hits, batch in results)
@@ -0,0 +1,44 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import numpy as np
+import pytest
+
+from clusteringCircuitExecutor import ClusteringCircuitExecutor
+from quantumBackendFactory import QuantumBackendFactory
+
+
+@pytest.fixture
+def backend():
+    return QuantumBackendFactory.create_backend('aer_qasm_simulator')
+
+
+@pytest.fixture
+def angles():
+    rng = np.random.RandomState(7)
+    return rng.uniform(0, np.pi, 60), rng.uniform(0, np.pi, 3)
+
+
+@pytest.mark.parametrize('extra_budget', [500, 200000])
+def test_adaptive_rounds_have_at_least_the_initial_shots(backend, angles, extra_budget):
+    data_angles, centroid_angles = angles
+    # the first round executes 180 pairs in 36 circuits of 5 qubits with 256 shots each
+    shot_budget = 36 * 256 + extra_budget
+    shot_rounds = []
+
+    np.random.seed(1)
+    cluster_mapping = ClusteringCircuitExecutor.execute_adaptive_clustering('negative-rotation', data_angles,
+                                                                            centroid_angles, backend, 5, 256,
+                                                                            shot_budget, shot_rounds=shot_rounds)
+
+    assert shot_rounds[0] == {'pairs': 180, 'circuits': 36, 'shots': 256}
+    assert all(shot_round['shots'] >= 256 for shot_round in shot_rounds)
+    assert sum(shot_round['circuits'] * shot_round['shots'] for shot_round in shot_rounds) <= shot_budget
+    if extra_budget < 256:
+        assert len(shot_rounds) == 1
+
+    analytic_mapping = ClusteringCircuitExecutor.execute_analytic_clustering('negative-rotation', data_angles,
+                                                                             centroid_angles)
+    assert np.mean(cluster_mapping == analytic_mapping) > 0.9
@@ -0,0 +1,53 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+from types import SimpleNamespace
+
+from qiskit import QuantumCircuit
+
+from couplingMapLayoutPlanner import CouplingMapLayoutPlanner
+
+# a 2 x 4 grid of physical qubits
+coupling_map = [[0, 1], [1, 2], [2, 3], [4, 5], [5, 6], [6, 7], [0, 4], [1, 5], [2, 6], [3, 7]]
+
+
+class GridBackend:
+
+    def configuration(self):
+        return SimpleNamespace(coupling_map=coupling_map)
+
+
+def test_pairs_are_disjoint_edges_of_the_coupling_map():
+    pairs = CouplingMapLayoutPlanner.find_disjoint_pairs(coupling_map)
+
+    assert len(pairs) == 4
+    assert all(list(pair) in coupling_map for pair in pairs)
+    assert len(set(qubit for pair in pairs for qubit in pair)) == 8
+
+
+def test_layouts_are_planned_once_per_width(monkeypatch):
+    widths = []
+    plan_layout = CouplingMapLayoutPlanner.plan_layout
+
+    def count_plan_layout(algorithm, coupling_map, qubits):
+        widths.append(qubits)
+        return plan_layout(algorithm, coupling_map, qubits)
+
+    monkeypatch.setattr(CouplingMapLayoutPlanner, 'plan_layout', count_plan_layout)
+
+    circuits = [QuantumCircuit(6, 6)] * 5 + [QuantumCircuit(2, 2)]
+    layouts = CouplingMapLayoutPlanner.plan_layouts('state-preparation', GridBackend(), circuits)
+
+    assert widths == [6, 2]
+    assert all(layout == layouts[0] for layout in layouts[:5])
+    assert layouts[5] == layouts[0][:2]
+    # every pair of qubits (2s, 2s + 1) is placed on connected physical qubits
+    assert all([layouts[0][2 * s], layouts[0][2 * s + 1]] in coupling_map for s in range(3))
+
+
+def test_too_wide_circuits_keep_the_layout_of_the_transpiler():
+    circuits = [QuantumCircuit(4, 4), QuantumCircuit(10, 10)]
+
+    assert CouplingMapLayoutPlanner.plan_layouts('destructive-interference', GridBackend(), circuits) is None
@@ -0,0 +1,150 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+from math import acos, sqrt
+
+import numpy as np
+import pytest
+
+from dataProcessingService import DataProcessingService
+
+
+# the loop implementations the vectorized DataProcessingService replaced
+
+def standardize_loop(data):
+    data_x = np.zeros(data.shape[0])
+    data_y = np.zeros(data.shape[0])
+    preprocessed_data = np.zeros_like(data)
+    for i in range(0, len(data)):
+        data_x[i] = data[i][0]
+        data_y[i] = data[i][1]
+    temp_data_x = (data_x - np.mean(data_x)) / np.std(data_x)
+    temp_data_y = (data_y - np.mean(data_y)) / np.std(data_y)
+    for i in range(0, data.shape[0]):
+        preprocessed_data[i][0] = temp_data_x[i]
+        preprocessed_data[i][1] = temp_data_y[i]
+    return preprocessed_data
+
+
+def normalize_loop(data):
+    preprocessed_data = np.zeros_like(data)
+    for i in range(0, data.shape[0]):
+        norm = sqrt(pow(data[i][0], 2) + pow(data[i][1], 2))
+        preprocessed_data[i][0] = data[i][0] / norm
+        preprocessed_data[i][1] = data[i][1] / norm
+    return preprocessed_data
+
+
+def calculate_angles_loop(cartesian_points, base_vector):
+    angles = np.zeros(cartesian_points.shape[0])
+    for i in range(0, angles.shape[0]):
+        angles[i] = acos(base_vector[0] * cartesian_points[i][0] + base_vector[1] * cartesian_points[i][1])
+    return angles
+
+
+def calculate_centroids_loop(cluster_mapping, old_centroids, data):
+    centroids = np.zeros_like(old_centroids)
+    for i in range(0, centroids.shape[0]):
+        sum_x = 0
+        sum_y = 0
+        amount = 0
+        for j in range(0, cluster_mapping.shape[0]):
+            if cluster_mapping[j] == i:
+                sum_x += data[j][0]
+                sum_y += data[j][1]
+                amount += 1
+        if amount == 0:
+            averaged_x = old_centroids[i][0]
+            averaged_y = old_centroids[i][1]
+        else:
+            averaged_x = sum_x / amount
+            averaged_y = sum_y / amount
+        norm = sqrt(pow(averaged_x, 2) + pow(averaged_y, 2))
+        centroids[i][0] = averaged_x / norm
+        centroids[i][1] = averaged_y / norm
+    return centroids
+
+
+def calculate_cluster_mapping_loop(amount_of_data, k, distances):
+    # the original loop never updated its running minimum for k > 2,
+    # the reference keeps its structure but fixes that
+    cluster_mapping = np.zeros(amount_of_data)
+    for i in range(0, amount_of_data):
+        lowest_distance = distances[i * k + 0]
+        lowest_distance_centroid_index = 0
+        for j in range(1, k):
+            if distances[i * k + j] < lowest_distance:
+                lowest_distance = distances[i * k + j]
+                lowest_distance_centroid_index = j
+        cluster_mapping[i] = lowest_distance_centroid_index
+    return cluster_mapping
+
+
+def calculate_relative_residual_loop(old_cluster_mapping, new_cluster_mapping):
+    count_of_different_labels = 0
+    for i in range(0, old_cluster_mapping.shape[0]):
+        if old_cluster_mapping[i] != new_cluster_mapping[i]:
+            count_of_different_labels += 1
+    return (count_of_different_labels / new_cluster_mapping.shape[0]) * 100
+
+
+@pytest.fixture
+def rng():
+    return np.random.RandomState(42)
+
+
+@pytest.mark.parametrize('amount', [1, 7, 500])
+def test_standardize_and_normalize_match_loops(rng, amount):
+    data = rng.normal(3.0, 2.0, (amount, 2))
+
+    if amount > 1:
+        assert np.allclose(DataProcessingService.standardize(data), standardize_loop(data))
+    assert np.allclose(DataProcessingService.normalize(data), normalize_loop(data))
+
+
+@pytest.mark.parametrize('amount', [1, 13, 1000])
+def test_calculate_angles_matches_loop(rng, amount):
+    points = normalize_loop(rng.uniform(-1.0, 1.0, (amount, 2)))
+    base_vector = normalize_loop(rng.uniform(-1.0, 1.0, (1, 2)))[0]
+
+    assert np.allclose(DataProcessingService.calculate_angles(points, base_vector),
+                       calculate_angles_loop(points, base_vector))
+
+
+def test_calculate_angles_clips_rounding_errors():
+    points = np.array([[1.0 + 1e-15, 0.0], [-1.0 - 1e-15, 0.0]])
+
+    angles = DataProcessingService.calculate_angles(points, np.array([1.0, 0.0]))
+
+    assert np.allclose(angles, [0.0, np.pi])
+
+
+@pytest.mark.parametrize('k', [1, 2, 5, 9])
+def test_calculate_centroids_matches_loop(rng, k):
+    data = rng.uniform(-1.0, 1.0, (300, 2))
+    old_centroids = normalize_loop(rng.uniform(-1.0, 1.0, (k, 2)))
+    # leave the last centroid empty to cover the fallback to its old position
+    cluster_mapping = rng.randint(0, max(k - 1, 1), 300).astype(float)
+
+    assert np.allclose(DataProcessingService.calculate_centroids(cluster_mapping, old_centroids, data),
+                       calculate_centroids_loop(cluster_mapping, old_centroids, data))
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 8])
+def test_calculate_cluster_mapping_matches_loop(rng, k):
+    distances = rng.uniform(0.0, 1.0, 200 * k)
+
+    assert np.array_equal(DataProcessingService.calculate_cluster_mapping(200, k, distances),
+                          calculate_cluster_mapping_loop(200, k, distances))
+
+
+def test_check_convergence_matches_loop(rng):
+    old_cluster_mapping = rng.randint(0, 4, 250).astype(float)
+    new_cluster_mapping = old_cluster_mapping.copy()
+    new_cluster_mapping[rng.choice(250, 17, replace=False)] += 1
+
+    assert DataProcessingService.calculate_relative_residual(old_cluster_mapping, new_cluster_mapping) \
+        == pytest.approx(calculate_relative_residual_loop(old_cluster_mapping, new_cluster_mapping))
+    assert DataProcessingService.calculate_relative_residual(old_cluster_mapping, old_cluster_mapping) == 0
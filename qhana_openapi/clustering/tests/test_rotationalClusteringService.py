@@ -0,0 +1,141 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from clusteringEvaluationService import ClusteringEvaluationService
+from dataProcessingService import DataProcessingService
+from quantumBackendFactory import QuantumBackendFactory
+from rotationalClusteringService import RotationalClusteringService
+
+
+@pytest.fixture
+def data():
+    rng = np.random.RandomState(3)
+    means = [(1.0, 1.0), (-1.0, 1.0), (0.0, -1.0), (1.5, -0.5)]
+    return np.concatenate([rng.normal(mean, 0.3, (150, 2)) for mean in means])
+
+
+@pytest.fixture
+def centroids():
+    return np.random.RandomState(5).uniform(-1.0, 1.0, (4, 2))
+
+
+base_vector = np.array([-0.7071, 0.7071])
+
+
+def perform_clustering(algorithm, data, centroids, **kwargs):
+    backend = QuantumBackendFactory.create_backend('analytic')
+    return RotationalClusteringService.perform_clustering(algorithm, data, centroids, backend, 5, 1024, 1e-6, 50,
+                                                          base_vector, **kwargs)
+
+
+@pytest.mark.parametrize('algorithm', ['negative-rotation', 'destructive-interference', 'state-preparation'])
+def test_pruning_matches_the_full_assignment(data, centroids, algorithm):
+    cluster_mapping, final_centroids, trace = perform_clustering(algorithm, data, centroids)
+    pruned_mapping, pruned_centroids, pruned_trace = perform_clustering(algorithm, data, centroids, prune=True)
+
+    assert np.array_equal(pruned_mapping, cluster_mapping)
+    assert np.allclose(pruned_centroids, final_centroids)
+    assert pruned_trace.shape[0] == trace.shape[0]
+    # the assigned data points of the iterations, i.e. at least one iteration skipped points
+    assert np.sum(pruned_trace[:, 4]) < np.sum(trace[:, 4])
+
+
+@pytest.mark.parametrize('algorithm', ['negative-rotation', 'destructive-interference', 'state-preparation'])
+def test_reusing_unmoved_centroids_matches_the_full_assignment(data, centroids, algorithm):
+    cluster_mapping, final_centroids, trace = perform_clustering(algorithm, data, centroids)
+    reused_mapping, reused_centroids, reused_trace = perform_clustering(algorithm, data, centroids,
+                                                                        reuse_tolerance=1e-3)
+
+    assert np.array_equal(reused_mapping, cluster_mapping)
+    assert np.allclose(reused_centroids, final_centroids)
+    # the evaluated centroids of the iterations, i.e. the first one evaluates all of them
+    # and the stationary centroids of the later ones are reused
+    assert reused_trace[0, 5] == 4
+    assert np.sum(reused_trace[:, 5]) < 4 * reused_trace.shape[0]
+
+
+@pytest.mark.parametrize('initialization', ['kmeans++', 'angle-quantiles'])
+def test_data_aware_seeds_are_kept_in_the_standardized_data_space(data, initialization):
+    unit_data = DataProcessingService.normalize(DataProcessingService.standardize(data))
+    np.random.seed(11)
+    seeds = DataProcessingService.initialize_centroids(initialization, 4, unit_data, base_vector)
+
+    unit_seeds, seed_angles = RotationalClusteringService.calculate_centroid_angles(seeds, base_vector,
+                                                                                    standardized=True)
+
+    assert np.allclose(unit_seeds, seeds)
+    assert np.allclose(seed_angles, DataProcessingService.calculate_angles(seeds, base_vector))
+
+    trace = perform_clustering('negative-rotation', data, seeds, standardized_centroids=True)[2]
+    assert trace[-1, 1] < 1e-6
+
+
+def test_restarts_only_calculate_the_silhouette_of_the_best_restart(data, monkeypatch):
+    silhouettes = []
+    calculate_silhouette = ClusteringEvaluationService.calculate_silhouette
+
+    def count_silhouette(cluster_mapping, data, sample_size=0):
+        silhouettes.append(sample_size)
+        return calculate_silhouette(cluster_mapping, data, sample_size)
+
+    monkeypatch.setattr(ClusteringEvaluationService, 'calculate_silhouette', count_silhouette)
+
+    unit_data = DataProcessingService.normalize(DataProcessingService.standardize(data))
+    data_angles = DataProcessingService.calculate_angles(unit_data, base_vector)
+    backend = QuantumBackendFactory.create_backend('analytic')
+    np.random.seed(2)
+    best_restart, best_result, summaries = RotationalClusteringService.perform_restarts('negative-rotation',
+                                                                                       unit_data, data_angles, 4, 5,
+                                                                                       backend, 5, 1024, 1e-4, 20,
+                                                                                       base_vector)
+
+    assert silhouettes == [2000]
+    assert best_result['silhouette'] is not None
+    assert best_result['inertia'] == min(summary['inertia'] for summary in summaries)
+    assert summaries[best_restart]['restart'] == best_restart
+
+
+def test_restarts_running_in_parallel_stop_each_other_early(data, monkeypatch):
+    restarts, min_iterations = 6, 3
+
+    # all the restarts run their first iterations together, i.e. none of them finishes before
+    # the others could be stopped
+    barrier = threading.Barrier(restarts)
+    assignments = threading.local()
+    calculate_cluster_mapping = RotationalClusteringService.calculate_cluster_mapping
+
+    def synchronized_cluster_mapping(*args, **kwargs):
+        assignments.amount = getattr(assignments, 'amount', 0) + 1
+        if assignments.amount <= min_iterations:
+            try:
+                barrier.wait(timeout=10)
+            except threading.BrokenBarrierError:
+                pass
+        return calculate_cluster_mapping(*args, **kwargs)
+
+    monkeypatch.setattr(RotationalClusteringService, 'calculate_cluster_mapping', synchronized_cluster_mapping)
+
+    unit_data = DataProcessingService.normalize(DataProcessingService.standardize(data))
+    data_angles = DataProcessingService.calculate_angles(unit_data, base_vector)
+    backend = QuantumBackendFactory.create_backend('analytic')
+    np.random.seed(2)
+    best_restart, best_result, summaries = RotationalClusteringService.perform_restarts('negative-rotation',
+                                                                                       unit_data, data_angles, 4,
+                                                                                       restarts, backend, 5, 1024,
+                                                                                       1e-6, 50, base_vector,
+                                                                                       max_parallel=restarts,
+                                                                                       early_stop_margin=0.05,
+                                                                                       min_iterations=min_iterations)
+
+    assert not barrier.broken
+    # stopped as soon as possible, i.e. while all the other restarts were still running
+    assert any(summary['stopped'] and summary['iterations'] == min_iterations for summary in summaries)
+    assert all(summary['iterations'] >= min_iterations for summary in summaries if summary['stopped'])
+    assert not summaries[best_restart]['stopped']
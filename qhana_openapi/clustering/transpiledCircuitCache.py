@@ -0,0 +1,84 @@
+"""
+Author: Daniel Fink
+Email: daniel-fink@outlook.com
+"""
+
+import threading
+from collections import OrderedDict
+
+from qiskit import transpile
+
+from couplingMapLayoutPlanner import CouplingMapLayoutPlanner
+
+
+class TranspiledCircuitCache:
+    """
+    A least recently used cache for transpiled circuit templates.
+
+    The clustering templates only depend on the algorithm and the amount of
+    qubits and classical bits (i.e. rounds of reused qubits), hence they have
+    to be transpiled only once per backend and coupling map instead of once
+    per execution.
+    """
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.circuits = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def create_key(backend, algorithm, qubits, clbits):
+        """
+        Creates the cache key (backend name, algorithm, qubits, clbits, coupling map).
+        """
+
+        coupling_map = getattr(backend.configuration(), 'coupling_map', None)
+        if coupling_map is not None:
+            coupling_map = tuple(tuple(edge) for edge in coupling_map)
+
+        return backend.name(), algorithm, qubits, clbits, coupling_map
+
+    def get_transpiled_circuit(self, backend, algorithm, template, parameters):
+        """
+        Returns the transpiled template for the given backend together with its
+        parameters. Note that the parameters of a cached template are the ones of
+        the template that has been transpiled first, i.e. the bindings have to use
+        the returned parameters.
+
+        The template is transpiled and stored if it is not in the cache yet.
+        Its qubits are placed on the backend by CouplingMapLayoutPlanner, i.e.
+        the pairs of qubits are placed on connected physical qubits if possible.
+        If the cache is full, the least recently used template is evicted.
+        """
+
+        key = self.create_key(backend, algorithm, template.num_qubits, template.num_clbits)
+
+        with self.lock:
+            if key in self.circuits:
+                self.hits += 1
+                self.circuits.move_to_end(key)
+                return self.circuits[key]
+            self.misses += 1
+
+        initial_layout = CouplingMapLayoutPlanner.plan_layout(algorithm,
+                                                              CouplingMapLayoutPlanner.get_coupling_map(backend),
+                                                              template.num_qubits)
+        transpiled_circuit = transpile(template, backend, initial_layout=initial_layout)
+
+        with self.lock:
+            self.circuits[key] = (transpiled_circuit, parameters)
+            self.circuits.move_to_end(key)
+            while len(self.circuits) > self.max_size:
+                self.circuits.popitem(last=False)
+
+        return transpiled_circuit, parameters
+
+    def get_statistics(self):
+        """
+        Returns the amount of hits, misses and cached templates.
+        """
+
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.circuits)}